@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: building the time-filtered agenda ("next")
+
+Runs get_relevant_habits_now() (a lookup in the weekday/time-of-day habit
+index, judged against one clock snapshot) under a FakeClock, so results
+don't depend on the time of day the benchmark happens to run at, and
+compares it with the previous full scan that read the system clock for
+every habit. Also times a repeated get_agenda() call, which is served
+from the manager's cached agenda.
+
+Usage: python3 benchmarks/bench_agenda.py [sizes...]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.clock import FakeClock
+from src.manager import TodoManager
+from src.models import is_time_relevant
+from src.storage import MemoryStorage
+
+TIMES = ('morning', 'afternoon', 'evening', 'anytime')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+REPEATS = 5
+
+
+def make_habits(n):
+    habits = []
+    for i in range(1, n + 1):
+        weekly = i % 3 == 0
+        habits.append({
+            'id': i, 'description': f'Habit {i}',
+            'frequency': 'weekly' if weekly else 'daily',
+            'days': [WEEKDAYS[i % 7], WEEKDAYS[(i + 3) % 7]] if weekly else [],
+            'time_of_day': TIMES[i % 4],
+            'created_at': '2024-01-01T00:00:00',
+            'completions': ['2024-01-01'] if i % 5 == 0 else []
+        })
+    return habits
+
+
+def per_call_clock(manager):
+    """The agenda filter as it was: scan every habit, reading the system
+    clock per habit"""
+    today = datetime.now().date().isoformat()
+    today_weekday = datetime.now().strftime('%A').lower()
+    relevant = []
+    for habit in manager.habits.values():
+        if not habit.is_due_today(today_weekday) or habit.is_completed_today(today):
+            continue
+        if not is_time_relevant(habit.time_of_day):
+            continue
+        relevant.append(habit)
+    return relevant
+
+
+def best_of(fn):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    clock = FakeClock(datetime(2024, 1, 1, 12, 0))
+    print(f"clock fixed at {clock.now():%A %H:%M}, best of {REPEATS}")
+    for n in sizes:
+        manager = TodoManager(storage=MemoryStorage(habits=make_habits(n)), clock=clock)
+        found = len(manager.get_relevant_habits_now())
+        indexed = best_of(lambda: manager.get_relevant_habits_now(clock.snapshot()))
+        scan = best_of(lambda: per_call_clock(manager))
+        now = clock.snapshot()
+        manager.get_agenda(now, relevant_only=True)
+        cached = best_of(lambda: manager.get_agenda(now, relevant_only=True))
+        print(f"{n:>9,} habits ({found:,} shown): indexed {indexed:8.2f} ms   "
+              f"scan {scan:8.2f} ms   ({scan / indexed:.1f}x)   "
+              f"cached agenda {cached:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: habit completion history as ISO strings vs day ordinals
+
+For habits with years of daily history, compares the previous list of ISO
+date strings with Completions (sorted array of day ordinals) on memory,
+JSON size, "done today?" membership, and the current streak.
+
+Usage: python3 benchmarks/bench_completions.py [years...]
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.completions import Completions, json_default
+
+HABITS = 100
+LOOKUPS = 10_000
+
+
+def history(years):
+    start = date(2000, 1, 1)
+    # Every day except each 10th, so streaks stay short
+    return [(start + timedelta(days=d)).isoformat()
+            for d in range(int(years * 365)) if d % 10 != 9]
+
+
+def measure(build):
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def per_call(fn):
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        fn()
+    return (time.perf_counter() - start) / LOOKUPS * 1e6
+
+
+def list_streak(dates, today):
+    """Streak over a list of ISO strings, the straightforward way"""
+    days = set(dates)
+    streak = 0
+    day = date.fromisoformat(today)
+    while day.isoformat() in days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+
+def main():
+    for years in [float(y) for y in sys.argv[1:]] or [1, 5, 20]:
+        dates = history(years)
+        today = dates[-1]
+        # Parsed from JSON, as loading did, so every date is its own string
+        encoded = json.dumps(dates)
+        lists, list_mem = measure(lambda: [json.loads(encoded) for _ in range(HABITS)])
+        packed, packed_mem = measure(lambda: [Completions(dates) for _ in range(HABITS)])
+        list_json = len(json.dumps(lists[0]))
+        packed_json = len(json.dumps(packed[0], default=json_default))
+
+        print(f"{years:g} year(s), {len(dates):,} completions per habit, {HABITS} habits")
+        print(f"  memory   list {list_mem / 1e6:7.2f} MB   ordinals {packed_mem / 1e6:7.2f} MB")
+        print(f"  json     list {list_json / 1e3:7.1f} kB   ordinals {packed_json / 1e3:7.1f} kB"
+              f"   (per habit)")
+        print(f"  today?   list {per_call(lambda: today in lists[0]):7.2f} us   "
+              f"ordinals {per_call(lambda: today in packed[0]):7.2f} us")
+        print(f"  streak   list {per_call(lambda: list_streak(lists[0], today)):7.2f} us   "
+              f"ordinals {per_call(lambda: packed[0].streak(today)):7.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-item operations by id
+
+Compares the id-indexed TodoManager against the previous linear scan over a
+list (reimplemented here) at 10k, 100k and 1M items.
+
+Usage: python3 benchmarks/bench_index.py [sizes...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.manager import TodoManager
+from src.storage import MemoryStorage
+
+LOOKUPS = 1000
+
+
+def make_tasks(n):
+    return [{'id': i, 'description': f'Task {i}', 'completed': False,
+             'created_at': '2025-01-01T00:00:00'} for i in range(1, n + 1)]
+
+
+def scan_get(tasks, task_id):
+    for task in tasks:
+        if task['id'] == task_id:
+            return task
+    return None
+
+
+def scan_remove(tasks, task_id):
+    for i, task in enumerate(tasks):
+        if task['id'] == task_id:
+            tasks.pop(i)
+            return True
+    return False
+
+
+def timed(fn, ids):
+    start = time.perf_counter()
+    for i in ids:
+        fn(i)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def run(n):
+    # Spread lookups across the whole range so scans pay their average cost
+    ids = [1 + (i * n) // LOOKUPS for i in range(LOOKUPS)]
+    scan_ids = ids[::max(1, n // 10_000)]
+
+    tasks = make_tasks(n)
+    scan_get_us = timed(lambda i: scan_get(tasks, i), scan_ids)
+    scan_remove_us = timed(lambda i: scan_remove(tasks, i), sorted(set(scan_ids), reverse=True))
+
+    manager = TodoManager(storage=MemoryStorage(make_tasks(n)))
+    get_us = timed(manager.get_task, ids)
+    complete_us = timed(manager.complete_task, ids)
+    remove_us = timed(manager.remove_task, sorted(set(ids), reverse=True))
+
+    print(f"{n:>9,} items | get: scan {scan_get_us:10.2f}us  index {get_us:6.2f}us"
+          f" | remove: scan {scan_remove_us:10.2f}us  index {remove_us:6.2f}us"
+          f" | complete: index {complete_us:6.2f}us")
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for n in sizes:
+        run(n)
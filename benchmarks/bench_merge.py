@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: merging two diverged copies of the store
+
+Builds a store of N tasks and N/10 habits with a year of completions each,
+copies it, then changes 1% of the records differently on each side
+(edits, completions, check-offs, removals, additions). Reports the time to
+merge one copy into the other (`src/sync.py`), per record, so linear
+scaling shows up as a flat column, and the size of the delta a `sync`
+would exchange instead of the whole store.
+
+Usage: python3 benchmarks/bench_merge.py [sizes...]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import sync
+from src.completions import Completions, json_default
+
+START = datetime(2025, 1, 1)
+DAYS = 365
+
+
+def build(n):
+    created = START.isoformat()
+    first = date(2025, 1, 1).toordinal()
+    tasks = [{'id': i, 'description': f'Task {i}', 'completed': False, 'created_at': created}
+             for i in range(1, n + 1)]
+    habits = [{'id': i, 'description': f'Habit {i}', 'frequency': 'daily', 'days': [],
+               'time_of_day': 'anytime', 'created_at': created,
+               'completions': Completions(range(first, first + DAYS - 1))}
+              for i in range(1, n // 10 + 1)]
+    return tasks, habits
+
+
+def diverge(tasks, habits, seed, when):
+    """One side's changes since the copies split; returns the changed copy"""
+    rng = random.Random(seed)
+    stamp = when.isoformat()
+    tasks = list(tasks)
+    habits = list(habits)
+    for i in rng.sample(range(len(tasks)), len(tasks) // 100):
+        task = dict(tasks[i])
+        choice = rng.random()
+        if choice < 0.4:
+            task['description'] += f' (edited {seed})'
+            task['versions'] = sync.stamped(task.get('versions'), 'task', ('description',), stamp)
+        elif choice < 0.8:
+            task.update(completed=True, completed_at=stamp,
+                        versions=sync.stamped(task.get('versions'), 'task', ('completed',), stamp))
+        else:
+            task['deleted'] = stamp
+        tasks[i] = task
+    for i in rng.sample(range(len(habits)), max(1, len(habits) // 100)):
+        habit = dict(habits[i])
+        habit['completions'] = Completions(habit['completions'])
+        habit['completions'].add(when.date())
+        habit['versions'] = sync.stamped(habit.get('versions'), 'habit', ('completions',), stamp)
+        habits[i] = habit
+    next_id = len(tasks) + 1
+    tasks += [{'id': next_id + k, 'description': f'New on {seed}', 'completed': False,
+               'created_at': (when + timedelta(seconds=k)).isoformat()}
+              for k in range(len(tasks) // 100)]
+    return tasks, habits
+
+
+def run(n):
+    tasks, habits = build(n)
+    ours = diverge(tasks, habits, 1, START + timedelta(days=DAYS))
+    theirs = diverge(tasks, habits, 2, START + timedelta(days=DAYS, hours=1))
+    records = len(ours[0]) + len(ours[1]) + len(theirs[0]) + len(theirs[1])
+
+    counts = dict.fromkeys(('added', 'updated', 'removed'), 0)
+    stamp = datetime.now().isoformat()
+    start = time.perf_counter()
+    sync.merge('task', ours[0], theirs[0], counts, stamp)
+    sync.merge('habit', ours[1], theirs[1], counts, stamp)
+    elapsed = time.perf_counter() - start
+
+    since = (START + timedelta(days=1)).isoformat()
+    full = sum(len(json.dumps(r, default=json_default)) for rs in theirs for r in rs)
+    delta = sum(len(json.dumps(r, default=json_default))
+                for rs in theirs for r in sync.changed_since(rs, since))
+    print(f"{n:>9,} tasks | merge {elapsed * 1000:8.1f} ms  {elapsed / records * 1e6:5.2f} µs/record"
+          f" | {counts['added']:,} added, {counts['updated']:,} updated, {counts['removed']:,} removed"
+          f" | delta {delta / 1e6:6.2f} MB of {full / 1e6:6.1f} MB")
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-memory task records as dicts vs slotted Task objects
+
+Builds N tasks both ways and compares memory (tracemalloc), the time to
+load them from the dicts storage returns, a filter over every record
+(what `today` does for open tasks), and converting back to dicts for a
+save. Loading times the record conversion alone: the previous manager
+indexed the stored dicts directly, the current one builds a Task from
+each, which makes loading slower.
+
+Usage: python3 benchmarks/bench_records.py [n]
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import Task
+
+
+def stored(n):
+    return [{'id': i, 'description': f'Task {i}', 'completed': i % 3 == 0,
+             'created_at': '2025-01-01T09:00:00.000000'} for i in range(1, n + 1)]
+
+
+def timed(fn):
+    gc.collect()
+    start = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def memory(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = stored(n)
+
+    # What was kept in memory before: one dict per task (copied from storage)
+    dicts, dict_mem = memory(lambda: {row['id']: dict(row) for row in rows})
+    objects, object_mem = memory(lambda: {row['id']: Task.from_dict(row) for row in rows})
+
+    _, dict_build = timed(lambda: {row['id']: row for row in rows})
+    _, object_build = timed(lambda: {task.id: task for task in map(Task.from_dict, rows)})
+    _, dict_filter = timed(lambda: [t for t in dicts.values() if not t['completed']])
+    _, object_filter = timed(lambda: [t for t in objects.values() if not t.completed])
+    _, dict_save = timed(lambda: list(dicts.values()))
+    _, object_save = timed(lambda: [t.to_dict() for t in objects.values()])
+
+    print(f"{n:,} tasks")
+    print(f"  memory        dicts {dict_mem / 1e6:8.1f} MB   slots {object_mem / 1e6:8.1f} MB"
+          f"   ({dict_mem / object_mem:.1f}x less)")
+    print(f"  load          dicts {dict_build:8.1f} ms   slots {object_build:8.1f} ms"
+          f"   ({object_build / dict_build:.0f}x slower)")
+    print(f"  filter open   dicts {dict_filter:8.1f} ms   slots {object_filter:8.1f} ms")
+    print(f"  to dicts      dicts {dict_save:8.1f} ms   slots {object_save:8.1f} ms"
+          f"   (only when saving or exporting)")
+
+
+if __name__ == '__main__':
+    main()
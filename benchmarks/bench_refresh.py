@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: noticing and loading another process's change
+
+A long-running session calls `refresh()` before every command. Measures,
+for a journaled store of N tasks:
+
+  - an idle refresh (nothing changed) with the inotify watcher, the stat
+    polling fallback, and the previous check (shared lock + generation read)
+  - catching up after another process completed one task: applying the
+    journal tail vs the previous full reload
+
+Usage: python3 benchmarks/bench_refresh.py [n]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import watch as watch_module
+from src.manager import TodoManager
+
+
+def seed(path, n, journal):
+    manager = TodoManager(path, journal=journal)
+    with manager.batch():
+        for i in range(n):
+            manager.add_task(f'Task {i}')
+    manager.compact()
+
+
+def per_call(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def generation_check(manager):
+    # What refresh() did before: lock the store and read the counter
+    with manager.storage.lock.shared():
+        return manager.storage.lock.generation() != manager._generation
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'todo_data.json')
+        seed(path, n, journal=True)
+
+        watched = TodoManager(path, journal=True)
+        watch_module.sys = type('Platform', (), {'platform': 'none'})
+        polled = TodoManager(path, journal=True)
+        watch_module.sys = sys
+        print(f"{n:,} tasks, journaled store")
+        print(f"  idle refresh      inotify {per_call(watched.refresh, 10000):8.1f} µs   "
+              f"stat {per_call(polled.refresh, 10000):8.1f} µs   "
+              f"lock+generation {per_call(lambda: generation_check(watched), 10000):8.1f} µs")
+
+        writer = TodoManager(path, journal=True)
+        timings = []
+        for i in range(1, 6):
+            writer.complete_task(i)
+            start = time.perf_counter()
+            watched.refresh()
+            timings.append(time.perf_counter() - start)
+        tail = min(timings) * 1000
+        start = time.perf_counter()
+        watched.load_data()
+        full = (time.perf_counter() - start) * 1000
+        print(f"  one change        journal tail {tail:8.2f} ms   full reload {full:8.1f} ms"
+              f"   ({full / tail:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
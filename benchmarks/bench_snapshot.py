@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold load of the JSON snapshot vs the binary snapshot
+
+Writes the same synthetic store in both formats and times JsonStorage.load().
+
+Usage: python3 benchmarks/bench_snapshot.py [tasks] [habits] [days_of_history]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.completions import Completions
+from src.storage import JsonStorage
+
+RUNS = 5
+
+
+def make_data(n_tasks, n_habits, days):
+    start = date(2020, 1, 1)
+    history = [(start + timedelta(days=d)).isoformat() for d in range(days)]
+    tasks = [{'id': i, 'description': f'Task {i}', 'completed': i % 3 == 0,
+              'created_at': '2025-01-01T09:00:00.000000'} for i in range(1, n_tasks + 1)]
+    habits = [{'id': i, 'description': f'Habit {i}', 'frequency': 'weekly',
+               'days': ['Monday', 'Friday'], 'time_of_day': 'morning',
+               'created_at': '2020-01-01T09:00:00.000000', 'completions': Completions(history)}
+              for i in range(1, n_habits + 1)]
+    return tasks, habits
+
+
+def time_load(storage):
+    best = float('inf')
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        storage.load()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    n_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_habits = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 1500
+    tasks, habits = make_data(n_tasks, n_habits, days)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, binary in (('json', False), ('binary', True)):
+            path = os.path.join(tmp, f'data.{name}')
+            # No parsed-state cache, so the JSON case really parses JSON
+            storage = JsonStorage(path, binary=binary, cache=False)
+            storage.save(tasks, habits)
+            results[name] = (time_load(storage), os.path.getsize(path))
+
+    print(f"{n_tasks:,} tasks, {n_habits:,} habits x {days:,} completions")
+    for name, (ms, size) in results.items():
+        print(f"  {name:<7} load {ms:8.1f} ms   size {size / 1e6:7.2f} MB")
+    json_ms, json_size = results['json']
+    bin_ms, bin_size = results['binary']
+    print(f"  binary is {json_ms / bin_ms:.1f}x faster to load and "
+          f"{json_size / bin_size:.1f}x smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: wall-clock startup of the todo entry points
+
+Runs each command as a fresh process against a seeded data file and reports
+the median and best wall-clock time, next to a bare interpreter start, plus
+the slowest imports of each entry point from `python -X importtime`.
+
+With --budget MS the script exits non-zero if any todo entry point takes
+more than MS milliseconds longer than a bare interpreter start. With
+--daemon the one-shot commands are timed again with `todo serve` running,
+so they go through the thin socket client.
+
+Usage: python3 benchmarks/bench_startup.py [--runs N] [--tasks N] [--habits N]
+                                           [--top N] [--budget MS] [--daemon]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.manager import TodoManager
+
+TODO = os.path.join(ROOT, 'todo.py')
+
+SCENARIOS = [
+    ('python -c pass', [sys.executable, '-c', 'pass'], None),
+    ('todo today', [sys.executable, TODO, 'today'], None),
+    ('todo next', [sys.executable, TODO, 'next'], None),
+    ('todo help', [sys.executable, TODO, 'help'], None),
+    ('interactive today+quit', [sys.executable, TODO], b'today\nquit\n'),
+]
+
+DAEMON_SCENARIOS = [
+    ('todo today (daemon)', [sys.executable, TODO, 'today'], None),
+    ('todo next (daemon)', [sys.executable, TODO, 'next'], None),
+]
+
+
+def seed(data_file, n_tasks, n_habits):
+    manager = TodoManager(data_file)
+    with manager.batch():
+        for i in range(n_tasks):
+            manager.add_task(f'Task {i}')
+        for i in range(n_habits):
+            manager.add_habit(f'Habit {i}', 'daily', time_of_day='anytime')
+
+
+def time_command(argv, stdin, cwd, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, input=stdin, cwd=cwd, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def import_times(argv, stdin, cwd):
+    """Self and cumulative import time (us) per module from -X importtime"""
+    result = subprocess.run([argv[0], '-X', 'importtime'] + argv[1:], input=stdin,
+                            cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            check=False)
+    times = []
+    for line in result.stderr.decode(errors='replace').splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return times
+
+
+def start_daemon(cwd):
+    daemon = subprocess.Popen([sys.executable, TODO, 'serve'], cwd=cwd,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    sock = os.path.join(cwd, 'todo_data.json.sock')
+    for _ in range(100):
+        if os.path.exists(sock):
+            break
+        time.sleep(0.05)
+    return daemon
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--habits', type=int, default=20)
+    parser.add_argument('--top', type=int, default=5, help="slowest imports to show")
+    parser.add_argument('--budget', type=float, default=None,
+                        help="max ms over a bare interpreter start")
+    parser.add_argument('--daemon', action='store_true',
+                        help="also time one-shot commands sent to `todo serve`")
+    args = parser.parse_args()
+
+    over_budget = []
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, 'todo_data.json'), args.tasks, args.habits)
+        print(f"{args.runs} runs each, {args.tasks} tasks / {args.habits} habits")
+        if os.environ.get('PYTHONDONTWRITEBYTECODE'):
+            print("  note: PYTHONDONTWRITEBYTECODE is set, so every run recompiles src/")
+        baseline = None
+        daemon = None
+        for label, argv, stdin in SCENARIOS + (DAEMON_SCENARIOS if args.daemon else []):
+            if label.endswith('(daemon)') and daemon is None:
+                daemon = start_daemon(tmp)
+            median, best = time_command(argv, stdin, tmp, args.runs)
+            if baseline is None:
+                baseline = median
+                print(f"  {label:<24} median {median:7.1f} ms   best {best:7.1f} ms")
+                continue
+            print(f"  {label:<24} median {median:7.1f} ms   best {best:7.1f} ms"
+                  f"   (+{median - baseline:.1f} ms)")
+            if args.budget is not None and median - baseline > args.budget:
+                over_budget.append(label)
+            if args.top:
+                times = import_times(argv, stdin, tmp)
+                total = sum(self_us for _, self_us, _ in times)
+                print(f"      imports {total / 1000:.1f} ms total; slowest:")
+                for cumulative_us, _, module in sorted(times, reverse=True)[:args.top]:
+                    print(f"        {cumulative_us / 1000:6.1f} ms  {module.strip()}")
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+
+    if over_budget:
+        print(f"Over the {args.budget:g} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
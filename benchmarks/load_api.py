@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Load test: the HTTP API (`todo api`) under many concurrent clients
+
+Seeds a data file, starts `todo api` on a free port in a separate process,
+then opens --clients keep-alive connections that issue requests back to
+back for --seconds. The mix is mostly reads (`/today`, `/next`, `/tasks`)
+with --writes percent `POST /tasks`. Reports requests/s and the p50, p99
+and max latency, overall and per route.
+
+Usage: python3 benchmarks/load_api.py [--clients N] [--seconds S] [--writes PCT]
+                                      [--tasks N] [--habits N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.manager import TodoManager
+
+TODO = os.path.join(ROOT, 'todo.py')
+
+READS = ['/today', '/next', '/tasks', '/habits']
+
+
+def seed(data_file, n_tasks, n_habits):
+    manager = TodoManager(data_file)
+    with manager.batch():
+        for i in range(n_tasks):
+            manager.add_task(f'Task {i}')
+        for i in range(n_habits):
+            manager.add_habit(f'Habit {i}', 'daily', time_of_day='anytime')
+
+
+def start_api(cwd):
+    """Start `todo api` on a free port; returns (process, port)"""
+    process = subprocess.Popen([sys.executable, TODO, 'api', '--port', '0'], cwd=cwd,
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    # "🌐 Todo API on http://127.0.0.1:PORT (Ctrl+C to stop)"
+    port = int(line.split('http://', 1)[1].split()[0].rsplit(':', 1)[1])
+    return process, port
+
+
+async def http(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, deadline, writes, samples, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() * 100 < writes:
+                route, method, body = 'POST /tasks', 'POST', {'description': 'load test'}
+                path = '/tasks'
+            else:
+                path = rng.choice(READS)
+                route, method, body = f'GET {path}', 'GET', None
+            start = time.perf_counter()
+            status = await http(reader, writer, method, path, body)
+            samples.setdefault(route, []).append(time.perf_counter() - start)
+            if status >= 400:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+def percentile(sorted_samples, p):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * p))]
+
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    print(f"  {name:<14} {len(latencies) / elapsed:9.0f} req/s   "
+          f"p50 {percentile(latencies, 0.50) * 1000:7.2f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms   "
+          f"max {latencies[-1] * 1000:7.2f} ms")
+
+
+async def load(port, clients, seconds, writes):
+    samples, errors = {}, [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, start + seconds, writes, samples, errors)
+                           for _ in range(clients)))
+    return samples, errors[0], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--writes', type=float, default=5.0, help='percent of requests that add a task')
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--habits', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        seed(os.path.join(cwd, 'todo_data.json'), args.tasks, args.habits)
+        process, port = start_api(cwd)
+        try:
+            samples, errors, elapsed = asyncio.run(
+                load(port, args.clients, args.seconds, args.writes))
+        finally:
+            process.terminate()
+            process.wait()
+
+    total = [s for route in samples.values() for s in route]
+    print(f"{args.clients} clients, {elapsed:.1f}s, {args.writes:g}% writes, "
+          f"{args.tasks} tasks, {args.habits} habits")
+    report('all', total, elapsed)
+    for route in sorted(samples):
+        report(route, samples[route], elapsed)
+    if errors:
+        print(f"  {errors} error responses")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Stress test: many processes writing to one store at once
+
+Each worker process opens its own TodoManager before any writes happen (so
+all copies go stale immediately), then adds tasks and checks off a shared
+habit. Afterwards every task must be present exactly once with a unique id.
+
+Usage: python3 benchmarks/stress_locking.py [workers] [tasks_per_worker]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.manager import TodoManager
+
+
+def worker(data_file, journal, worker_id, count, start_event):
+    manager = TodoManager(data_file, journal=journal, compact_every=50)
+    start_event.wait()
+    for i in range(count):
+        manager.add_task(f'worker {worker_id} task {i}')
+        if i % 10 == 0:
+            manager.update_habit(1, new_description=f'touched by {worker_id}')
+
+
+def check(data_file, journal, workers, count):
+    manager = TodoManager(data_file, journal=journal)
+    descriptions = [t.description for t in manager.tasks.values()]
+    expected = {f'worker {w} task {i}' for w in range(workers) for i in range(count)}
+    missing = expected - set(descriptions)
+    duplicates = len(descriptions) - len(set(descriptions))
+    return len(descriptions), missing, duplicates
+
+
+def run(label, data_file, journal, workers, count):
+    TodoManager(data_file, journal=journal).add_habit('Shared habit', 'daily')
+    start_event = multiprocessing.Event()
+    procs = [multiprocessing.Process(target=worker,
+                                     args=(data_file, journal, w, count, start_event))
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+    time.sleep(0.5)
+    started = time.perf_counter()
+    start_event.set()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    total, missing, duplicates = check(data_file, journal, workers, count)
+    ok = not missing and not duplicates and total == workers * count
+    print(f"{label:<8} {workers} workers x {count} adds: {total} tasks, "
+          f"{len(missing)} lost, {duplicates} duplicated, {elapsed:.2f}s "
+          f"-> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results.append(run('json', os.path.join(tmp, 'a.json'), False, workers, count))
+        results.append(run('journal', os.path.join(tmp, 'b.json'), True, workers, count))
+        results.append(run('sqlite', os.path.join(tmp, 'c.db'), False, workers, count))
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,7 @@
 Todo List Manager - A CLI tool for managing tasks and habits
 """
 
-from .models import Task, Habit, TimeOfDay, get_current_time_of_day, format_time_of_day
-from .manager import TodoManager
+import importlib
 
 __all__ = [
     'Task',
@@ -11,5 +10,32 @@ __all__ = [
     'TimeOfDay',
     'get_current_time_of_day',
     'format_time_of_day',
+    'Clock',
+    'FakeClock',
     'TodoManager'
 ]
+
+# Exports are imported on first use so that entry points which never touch
+# storage (e.g. `todo help`) don't pay for loading it
+_EXPORTS = {
+    'Task': '.models',
+    'Habit': '.models',
+    'TimeOfDay': '.models',
+    'get_current_time_of_day': '.models',
+    'format_time_of_day': '.models',
+    'Clock': '.clock',
+    'FakeClock': '.clock',
+    'TodoManager': '.manager',
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,118 @@
+"""
+Today's agenda (open tasks and due habits), kept up to date as data changes
+"""
+
+from typing import Dict, List, Optional
+
+from .models import Habit, Task
+
+
+def task_item(task: Task) -> Dict:
+    return {
+        'type': 'task',
+        'id': task.id,
+        'description': task.description,
+        'created_at': task.created_at
+    }
+
+
+def habit_item(habit: Habit) -> Dict:
+    return {
+        'type': 'habit',
+        'id': habit.id,
+        'description': habit.description,
+        'frequency': habit.frequency,
+        'days': habit.days,
+        'time_of_day': habit.time_of_day
+    }
+
+
+class Agenda:
+    """Cached agenda items for one day
+
+    Holds an item for every open task and every habit due on ``day`` and
+    not yet completed. The manager reports each change through
+    ``task_changed``/``task_removed``/``habit_changed``/``habit_removed``,
+    which update just that item. Item lists are cached per time-of-day
+    period, so asking again within the same period and with no changes in
+    between returns the cached list. A new day, or ``reset()``, rebuilds
+    from scratch on the next ``build()``.
+    """
+
+    def __init__(self):
+        self.day: Optional[int] = None
+        self.weekday: Optional[str] = None
+        self._tasks: Dict[int, Dict] = {}
+        self._habits: Dict[int, Dict] = {}
+        self._habits_sorted = True
+        # (relevant times or None) -> items, valid until the next change
+        self._lists: Dict[Optional[frozenset], List[Dict]] = {}
+
+    def reset(self):
+        """Forget everything; the next ``build()`` starts over"""
+        self.day = None
+        self.weekday = None
+        self._tasks.clear()
+        self._habits.clear()
+        self._lists.clear()
+
+    def build(self, day: int, weekday: str, tasks, habits):
+        """Start a new day from the open ``tasks`` and due ``habits``"""
+        self.day = day
+        self.weekday = weekday
+        self._tasks = {task.id: task_item(task) for task in tasks}
+        self._habits = {habit.id: habit_item(habit) for habit in habits}
+        self._habits_sorted = True
+        self._lists.clear()
+
+    def items(self, relevant_times: Optional[frozenset] = None) -> List[Dict]:
+        """Tasks then habits, limited to habits whose time of day is in
+        ``relevant_times`` unless it is None"""
+        items = self._lists.get(relevant_times)
+        if items is not None:
+            return items
+        if not self._habits_sorted:
+            self._habits = dict(sorted(self._habits.items()))
+            self._habits_sorted = True
+        items = list(self._tasks.values())
+        if relevant_times is None:
+            items.extend(self._habits.values())
+        else:
+            items.extend(item for item in self._habits.values()
+                         if item['time_of_day'] in relevant_times)
+        self._lists[relevant_times] = items
+        return items
+
+    # Incremental updates
+    def task_changed(self, task: Task):
+        if self.day is None:
+            return
+        self._lists.clear()
+        if task.completed:
+            self._tasks.pop(task.id, None)
+        else:
+            self._tasks[task.id] = task_item(task)
+
+    def task_removed(self, task_id: int):
+        if self.day is None:
+            return
+        self._lists.clear()
+        self._tasks.pop(task_id, None)
+
+    def habit_changed(self, habit: Habit):
+        if self.day is None:
+            return
+        self._lists.clear()
+        if habit.is_due_today(self.weekday) and self.day not in habit.completions:
+            if (self._habits_sorted and habit.id not in self._habits and self._habits
+                    and habit.id < next(reversed(self._habits))):
+                self._habits_sorted = False
+            self._habits[habit.id] = habit_item(habit)
+        else:
+            self._habits.pop(habit.id, None)
+
+    def habit_removed(self, habit_id: int):
+        if self.day is None:
+            return
+        self._lists.clear()
+        self._habits.pop(habit_id, None)
@@ -0,0 +1,450 @@
+"""
+Local HTTP/JSON API over TodoManager, built on asyncio (stdlib only)
+
+Routes:
+    GET    /tasks[?all=1]          open tasks (or all tasks)
+    POST   /tasks                  {"description"} -> {"id"}
+    GET    /tasks/<id>
+    PATCH  /tasks/<id>             {"description"} and/or {"completed": true}
+    DELETE /tasks/<id>
+    GET    /habits
+    POST   /habits                 {"description", "frequency", "days", "time_of_day"}
+    GET    /habits/<id>
+    PATCH  /habits/<id>            any of description, frequency, days, time_of_day
+    DELETE /habits/<id>
+    POST   /habits/<id>/done       check the habit off for today
+    GET    /today                  today's agenda items
+    GET    /next[?n=3]             the next n items relevant now
+
+Requests must name this machine in their Host header (localhost,
+127.0.0.1 or [::1]) and changes must be sent as application/json, so a
+web page can neither reach the API through DNS rebinding nor change data
+with a form or text/plain POST.
+
+Reads are answered on the event loop from memory. Mutations, which write
+to storage, run in a single worker thread so a slow disk never stalls the
+loop; those that queue up while a save is running are saved together.
+Reads wait only while the worker changes memory, not for the save.
+"""
+
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .models import TimeOfDay
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIMES_OF_DAY = [t.value for t in TimeOfDay]
+
+MAX_BODY = 1 << 20
+
+# Host header names (without the port) that mean this machine
+LOCAL_HOSTS = frozenset(('localhost', '127.0.0.1', '[::1]'))
+
+REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request',
+           403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 415: 'Unsupported Media Type',
+           500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def task_json(task) -> Dict:
+    return task.to_dict()
+
+
+def habit_json(habit) -> Dict:
+    record = habit.to_dict()
+    record['completions'] = list(habit.completions)
+    return record
+
+
+def _validate_habit(body: Dict, partial: bool = False) -> Dict:
+    """Check habit fields from a request body; returns the ones given"""
+    fields = {}
+    if 'description' in body or not partial:
+        description = body.get('description')
+        if not isinstance(description, str) or not description.strip():
+            raise HTTPError(400, "description is required")
+        fields['description'] = description.strip()
+    if 'frequency' in body or not partial:
+        frequency = body.get('frequency', 'daily')
+        if frequency not in ('daily', 'weekly'):
+            raise HTTPError(400, "frequency must be daily or weekly")
+        fields['frequency'] = frequency
+    if 'days' in body:
+        days = body['days']
+        if not isinstance(days, list) or not all(isinstance(d, str) for d in days):
+            raise HTTPError(400, "days must be a list of weekday names")
+        days = [d.strip().capitalize() for d in days]
+        invalid = [d for d in days if d not in WEEKDAYS]
+        if invalid:
+            raise HTTPError(400, f"invalid days: {', '.join(invalid)}")
+        fields['days'] = days
+    if fields.get('frequency') == 'weekly' and not fields.get('days') and not partial:
+        raise HTTPError(400, "weekly habits need days")
+    if 'time_of_day' in body or not partial:
+        time_of_day = body.get('time_of_day', TimeOfDay.ANYTIME.value)
+        if time_of_day not in TIMES_OF_DAY:
+            raise HTTPError(400, f"time_of_day must be one of {', '.join(TIMES_OF_DAY)}")
+        fields['time_of_day'] = time_of_day
+    return fields
+
+
+def host_name(host: str) -> str:
+    """The name in a Host header, without the port"""
+    host = host.strip().lower()
+    if host.startswith('['):
+        return host[:host.find(']') + 1]
+    return host.rsplit(':', 1)[0] if host.count(':') == 1 else host
+
+
+def _unlocked(method):
+    """A manager method that skips its mutex (see ``TodoAPI``)"""
+    return partial(method.__wrapped__, method.__self__)
+
+
+class TodoAPI:
+    """Routes HTTP requests to a TodoManager
+    
+    Only the worker thread changes the manager. Reads wait (``_settled``)
+    while it changes memory, then run while it saves: the save holds the
+    manager's mutex but only reads memory, under the store lock taken
+    when its batch began, so reads skip the mutex rather than wait on it.
+    """
+
+    def __init__(self, manager, refresh_interval: float = 1.0,
+                 hosts: Iterable[str] = LOCAL_HOSTS):
+        self.manager = manager
+        self.hosts = frozenset(hosts)
+        self.refresh_interval = refresh_interval
+        self._last_refresh = time.monotonic()
+        # One worker: mutations are applied and saved strictly in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='todo-io')
+        self._queue: List[Tuple] = []
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._settled = asyncio.Event()
+        self._settled.set()
+        self._clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    def _enqueue(self, fn, args) -> asyncio.Future:
+        """Queue a mutation for the worker thread; returns its future"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((fn, args, future))
+        if self._idle.is_set():
+            self._idle.clear()
+            self._settled.clear()
+            asyncio.ensure_future(self._drain())
+        return future
+
+    async def _mutate(self, fn, *args):
+        """Queue a mutation for the worker thread and wait for its result
+        
+        Mutations that arrive while the worker is busy are applied together
+        as one batch, so a burst of writes costs one save rather than one
+        per request.
+        """
+        return await self._enqueue(fn, args)
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._queue:
+                group, self._queue = self._queue, []
+                self._settled.clear()
+                try:
+                    outcomes = await loop.run_in_executor(
+                        self._executor, self._apply, group,
+                        partial(loop.call_soon_threadsafe, self._settled.set))
+                except Exception as e:
+                    outcomes = [(None, e)] * len(group)
+                self._settled.set()
+                for (_, _, future), (result, error) in zip(group, outcomes):
+                    if future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+        finally:
+            self._settled.set()
+            self._idle.set()
+
+    def _apply(self, group, settled):
+        """Run queued mutations in the worker thread with a single save;
+        ``settled()`` lets reads in once memory is final"""
+        manager = self.manager
+        manager.refresh()
+        outcomes = []
+        # Each mutation checks its input before changing anything, so one
+        # failing request need not roll back the others
+        with manager.batch(rollback=False):
+            for fn, args, _ in group:
+                try:
+                    outcomes.append((fn(*args) if fn else None, None))
+                except Exception as e:
+                    outcomes.append((None, e))
+            settled()
+        return outcomes
+
+    async def _before_read(self):
+        """Wait while the worker changes memory; have it pick up other
+        processes' writes at most once per ``refresh_interval``"""
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self._last_refresh = time.monotonic()
+            # An empty mutation: the worker refreshes before each group
+            self._enqueue(None, ())
+        await self._settled.wait()
+
+    async def handle(self, method: str, target: str, body: Optional[Dict]) -> Tuple[int, object]:
+        """Dispatch one request; returns (status, JSON-able payload)"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split('/') if p]
+        if not parts:
+            raise HTTPError(404, "not found")
+        resource = parts[0]
+        item_id = None
+        if len(parts) > 1:
+            try:
+                item_id = int(parts[1])
+            except ValueError:
+                raise HTTPError(404, "not found")
+        action = parts[2] if len(parts) > 2 else None
+        if len(parts) > 3 or (action and action != 'done'):
+            raise HTTPError(404, "not found")
+
+        if method == 'GET':
+            await self._before_read()
+            return 200, self._read(resource, item_id, action, query)
+        if method in ('POST', 'PATCH', 'DELETE'):
+            return await self._write(method, resource, item_id, action, body or {})
+        raise HTTPError(405, f"method {method} not allowed")
+
+    def _read(self, resource, item_id, action, query):
+        manager = self.manager
+        if action:
+            raise HTTPError(405, "use POST")
+        if resource == 'tasks':
+            if item_id is None:
+                show_all = query.get('all', ['0'])[0] not in ('0', 'false', '')
+                tasks = _unlocked(manager.get_tasks)(show_completed=show_all)
+                return [task_json(t) for t in tasks]
+            task = manager.get_task(item_id)
+            if task is None:
+                raise HTTPError(404, f"task {item_id} not found")
+            return task_json(task)
+        if resource == 'habits':
+            if item_id is None:
+                return [habit_json(h) for h in _unlocked(manager.get_habits)()]
+            habit = manager.get_habit(item_id)
+            if habit is None:
+                raise HTTPError(404, f"habit {item_id} not found")
+            return habit_json(habit)
+        if resource in ('today', 'next') and item_id is None:
+            now = manager.clock.snapshot()
+            agenda = _unlocked(manager.get_agenda)
+            if resource == 'today':
+                return agenda(now)
+            try:
+                count = int(query.get('n', ['3'])[0])
+            except ValueError:
+                raise HTTPError(400, "n must be a number")
+            return agenda(now, relevant_only=True)[:max(1, count)]
+        raise HTTPError(404, "not found")
+
+    async def _write(self, method, resource, item_id, action, body):
+        manager = self.manager
+        if resource == 'tasks':
+            if method == 'POST' and item_id is None:
+                description = body.get('description')
+                if not isinstance(description, str) or not description.strip():
+                    raise HTTPError(400, "description is required")
+                task_id = await self._mutate(manager.add_task, description.strip())
+                return 201, {'id': task_id}
+            if item_id is not None and not action:
+                if method == 'DELETE':
+                    if not await self._mutate(manager.remove_task, item_id):
+                        raise HTTPError(404, f"task {item_id} not found")
+                    return 204, None
+                if method == 'PATCH':
+                    return 200, await self._mutate(self._patch_task, item_id, body)
+        elif resource == 'habits':
+            if method == 'POST' and item_id is None:
+                fields = _validate_habit(body)
+                habit_id = await self._mutate(
+                    manager.add_habit, fields['description'], fields['frequency'],
+                    fields.get('days'), fields['time_of_day'])
+                return 201, {'id': habit_id}
+            if item_id is not None and action == 'done' and method == 'POST':
+                return 200, await self._mutate(self._check_habit, item_id)
+            if item_id is not None and not action:
+                if method == 'DELETE':
+                    if not await self._mutate(manager.remove_habit, item_id):
+                        raise HTTPError(404, f"habit {item_id} not found")
+                    return 204, None
+                if method == 'PATCH':
+                    fields = _validate_habit(body, partial=True)
+                    return 200, await self._mutate(self._patch_habit, item_id, fields)
+        else:
+            raise HTTPError(404, "not found")
+        raise HTTPError(405, f"method {method} not allowed here")
+
+    # Run in the worker thread
+    def _patch_task(self, task_id, body):
+        manager = self.manager
+        if manager.get_task(task_id) is None:
+            raise HTTPError(404, f"task {task_id} not found")
+        with manager.batch():
+            if isinstance(body.get('description'), str) and body['description'].strip():
+                manager.update_task(task_id, body['description'].strip())
+            if body.get('completed') is True:
+                manager.complete_task(task_id)
+        return task_json(manager.get_task(task_id))
+
+    def _check_habit(self, habit_id):
+        if self.manager.get_habit(habit_id) is None:
+            raise HTTPError(404, f"habit {habit_id} not found")
+        checked = self.manager.complete_habit_today(habit_id)
+        return {'id': habit_id, 'checked': checked}
+
+    def _patch_habit(self, habit_id, fields):
+        manager = self.manager
+        if manager.get_habit(habit_id) is None:
+            raise HTTPError(404, f"habit {habit_id} not found")
+        manager.update_habit(habit_id, fields.get('description'), fields.get('frequency'),
+                             fields.get('days'), fields.get('time_of_day'))
+        return habit_json(manager.get_habit(habit_id))
+
+    # HTTP/1.1 with keep-alive
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "bad request line"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+
+                status, payload = await self._dispatch(reader, method, target, headers)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive or status == 413:
+                    break
+        except ConnectionError:
+            pass  # the client went away mid-response
+        finally:
+            del self._clients[writer]
+            writer.close()
+
+    def _check_origin(self, method, headers):
+        """Refuse requests a web page could make: ones for another host name
+        (DNS rebinding) and changes not sent as JSON (forms and text/plain
+        POSTs need no CORS preflight)"""
+        # Browsers always send one; other HTTP/1.0 clients may not
+        if 'host' in headers and host_name(headers['host']) not in self.hosts:
+            raise HTTPError(403, f"host {headers['host']} not allowed")
+        if method.upper() in ('POST', 'PATCH', 'DELETE'):
+            media_type = headers.get('content-type', '').split(';', 1)[0].strip().lower()
+            if media_type != 'application/json':
+                raise HTTPError(415, "Content-Type must be application/json")
+
+    async def _dispatch(self, reader, method, target, headers):
+        try:
+            length = int(headers.get('content-length') or 0)
+            if length > MAX_BODY:
+                raise HTTPError(413, "request body too large")
+            # Read even if refused, so the connection stays usable
+            raw = await reader.readexactly(length) if length else b''
+            self._check_origin(method, headers)
+            body = None
+            if raw:
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    raise HTTPError(400, "body is not valid JSON")
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "body must be a JSON object")
+            return await self.handle(method.upper(), target, body)
+        except HTTPError as e:
+            return e.status, {'error': str(e)}
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = b'' if payload is None else json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def shutdown(self):
+        """Let queued mutations finish, close client connections and stop
+        the worker"""
+        await self._idle.wait()
+        tasks = list(self._clients.values())
+        for writer in list(self._clients):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+
+async def _serve(manager, host, port):
+    api = TodoAPI(manager, hosts=LOCAL_HOSTS | {host_name(host)})
+    server = await asyncio.start_server(api.serve_client, host, port, backlog=1024)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"🌐 Todo API on http://{host}:{port} (Ctrl+C to stop)", flush=True)
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await api.shutdown()
+        await server.wait_closed()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signum)
+
+
+def serve(manager=None, host: str = '127.0.0.1', port: int = 8765) -> int:
+    """Run the API until interrupted"""
+    if manager is None:
+        from .config import manager_options
+        from .manager import TodoManager
+        manager = TodoManager(**manager_options())
+    try:
+        asyncio.run(_serve(manager, host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.save_data()
+    print("👋 API stopped")
+    return 0
@@ -0,0 +1,59 @@
+"""
+Sidecar cache of already-parsed data, keyed on the source file's identity
+"""
+
+import marshal
+import os
+from typing import Dict, Optional
+
+from . import snapshot
+from .files import atomic_write, file_mode
+from .migrations import CURRENT_SCHEMA_VERSION
+
+
+class StateCache:
+    """Binary snapshot (see ``src/snapshot.py``) of the data parsed from ``source``
+
+    The cache is only used while ``source`` has the same path, inode, size
+    and mtime as when it was written, and the code's schema version has not
+    changed. Any problem reading or writing the cache is ignored and the
+    caller falls back to parsing the source.
+    """
+
+    def __init__(self, source: str):
+        self.source = os.path.abspath(source)
+        directory, name = os.path.split(self.source)
+        self.path = os.path.join(directory, '.' + name + '.cache')
+
+    def key(self) -> Optional[tuple]:
+        """Identity of the source file right now, or None if it is missing"""
+        try:
+            st = os.stat(self.source)
+        except OSError:
+            return None
+        return (self.source, st.st_ino, st.st_size, st.st_mtime_ns, CURRENT_SCHEMA_VERSION)
+
+    def get(self, key: Optional[tuple]) -> Optional[Dict]:
+        """Return the cached data if it was stored under ``key``"""
+        if key is None:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                if marshal.load(f) != key:
+                    return None
+                return snapshot.decode(f.read())
+        except Exception:
+            return None
+
+    def put(self, key: Optional[tuple], data: Dict):
+        """Cache data parsed from the source as it was when ``key`` was taken"""
+        if key is None:
+            return
+        try:
+            # It holds the same data, so it gets the same permissions; a
+            # cache a later Python can't read is just parsed again
+            blob = snapshot.encode(data, portable=False)
+            atomic_write(self.path, marshal.dumps(key) + blob,
+                         mode=file_mode(self.source), fsync=False)
+        except Exception:
+            pass
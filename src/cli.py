@@ -3,11 +3,13 @@ Command-line interface for todo list manager
 """
 
 import cmd
+import json
 import os
-from datetime import datetime
+import sys
 
-from .manager import TodoManager
-from .models import TimeOfDay, get_current_time_of_day, format_time_of_day
+from .clock import SYSTEM_CLOCK
+from .models import TimeOfDay, format_time_of_day
+from .render import Renderer, RowCache
 
 
 class TodoCLI(cmd.Cmd):
@@ -30,93 +32,226 @@ Type 'quit' or 'q' to exit.
 """
     prompt = '📋 > '
     
-    def __init__(self):
+    # Machine-readable output formats for today, next and view
+    OUTPUT_FORMATS = ('json', 'ndjson')
+    
+    # Commands that never change data (`todo serve` runs these concurrently)
+    READ_ONLY_COMMANDS = frozenset(('today', 'next', 'view', 'export', 'help', '?'))
+    
+    # Commands that lock and save the store themselves, so not in --batch
+    UNBATCHED_COMMANDS = frozenset(('import', 'merge', 'sync'))
+    
+    def __init__(self, manager=None, clock=None, write_behind=None, cwd=None):
         super().__init__()
-        self.manager = TodoManager()
+        self._manager = manager
+        # Managers passed in belong to the caller (e.g. the daemon)
+        self._owns_manager = manager is None
+        self.write_behind = write_behind
+        # Relative paths in commands are taken from here (the daemon passes
+        # its client's directory)
+        self.cwd = cwd
+        self.clock = clock or (manager.clock if manager is not None else SYSTEM_CLOCK)
+        self._now = None
+        self.last_error = False
+        self._rows = RowCache()
+    
+    @property
+    def manager(self):
+        """The TodoManager, loaded on first use so commands like help and
+        quit never touch storage"""
+        if self._manager is None:
+            from .config import manager_options
+            from .manager import TodoManager
+            # A SQLite store is read as commands need it, not all at startup
+            self._manager = TodoManager(clock=self.clock, write_behind=self.write_behind,
+                                        lazy=True, **manager_options())
+        return self._manager
+    
+    def close(self):
+        """Write out anything a write-behind manager still holds"""
+        if self._owns_manager and self._manager is not None:
+            self._manager.close()
+    
+    @property
+    def now(self):
+        """Clock snapshot shared by everything the current command shows"""
+        if self._now is None:
+            self._now = self.clock.snapshot()
+        return self._now
+    
+    def is_read_only(self, line):
+        """Whether a command line only reads data"""
+        command = self.parseline(line)[0]
+        return command in self.READ_ONLY_COMMANDS or not command
+    
+    def onecmd(self, line):
+        """Run one command against a fresh clock snapshot and current data"""
+        self._now = None
+        if self._owns_manager and self._manager is not None:
+            # Pick up what other processes changed since the last command
+            self._manager.refresh()
+        try:
+            return super().onecmd(line)
+        except RuntimeError as e:
+            from .manager import ReadOnlyError
+            if not isinstance(e, ReadOnlyError):
+                raise
+            self._error(f"❌ {e}")
+    
+    def _path(self, path):
+        """A file or directory named in a command, resolved against ``cwd``"""
+        path = os.path.expanduser(path)
+        return os.path.join(self.cwd, path) if self.cwd else path
+    
+    def _error(self, message):
+        """Print an error message and flag the current command as failed"""
+        self.last_error = True
+        print(message)
+    
+    def default(self, line):
+        """Report unknown commands as errors"""
+        self._error(f"*** Unknown syntax: {line}")
+    
+    def run_batch(self, lines, stop_on_error=False):
+        """Run commands from an iterable of lines with a single save
+        
+        Blank lines and lines starting with '#' are skipped. All mutations
+        are kept in memory and written once at the end (see
+        TodoManager.batch). Commands that save on their own (import, merge,
+        sync) are refused. Returns the number of commands that failed."""
+        failures = 0
+        with self.manager.batch():
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                
+                self.last_error = False
+                command = self.parseline(line)[0]
+                try:
+                    if command in self.UNBATCHED_COMMANDS:
+                        raise ValueError(f"'{command}' can't run in --batch; run it on its own")
+                    stop = self.onecmd(line)
+                except Exception as e:
+                    self._error(f"❌ Line {number}: {e}")
+                    stop = False
+                
+                if self.last_error:
+                    failures += 1
+                    if stop_on_error:
+                        print(f"⛔ Stopped at line {number}: {line}")
+                        break
+                if stop:
+                    break
+        return failures
+    
+    def _parse_format(self, line):
+        """Split a `--format json|ndjson` option off a command line
+        
+        Returns (remaining line, format) where format is None for the normal
+        table output, or (None, None) after reporting an invalid option."""
+        parts = line.split()
+        fmt = None
+        rest = []
+        i = 0
+        while i < len(parts):
+            part = parts[i]
+            if part == '--format':
+                if i + 1 >= len(parts):
+                    self._error("❌ Usage: --format json|ndjson")
+                    return None, None
+                fmt = parts[i + 1].lower()
+                i += 2
+                continue
+            if part.startswith('--format='):
+                fmt = part.split('=', 1)[1].lower()
+            else:
+                rest.append(part)
+            i += 1
+        if fmt is not None and fmt not in self.OUTPUT_FORMATS:
+            self._error(f"❌ Invalid format. Use: {', '.join(self.OUTPUT_FORMATS)}")
+            return None, None
+        return ' '.join(rest), fmt
+    
+    def _write_items(self, items, fmt):
+        """Write item dicts as one JSON array or as NDJSON, in a single write"""
+        if fmt == 'json':
+            sys.stdout.write(json.dumps(items) + '\n')
+        else:
+            sys.stdout.write(''.join(json.dumps(item) + '\n' for item in items))
+        sys.stdout.flush()
+    
+    @staticmethod
+    def _frequency_info(frequency, days):
+        """e.g. 'Daily' or 'Weekly (Monday, Friday)'"""
+        freq_info = frequency.capitalize()
+        if frequency == 'weekly':
+            freq_info += f" ({', '.join(days)})"
+        return freq_info
+    
+    def _habit_info(self, item):
+        """'<time of day> | <frequency>' for a habit item, cached until the
+        habit's schedule changes"""
+        signature = (item['time_of_day'], item['frequency'], tuple(item['days']))
+        return self._rows.get(('habit', item['id']), signature, lambda: (
+            f"{format_time_of_day(item['time_of_day'])} | "
+            f"{self._frequency_info(item['frequency'], item['days'])}"))
     
     def _get_today_items(self, time_filtered=False):
         """Get all tasks and habits due today, optionally filtered by time"""
-        tasks = self.manager.get_tasks(show_completed=False)
-        
-        if time_filtered:
-            habits = self.manager.get_relevant_habits_now()
-        else:
-            # Get all habits due today
-            today_weekday = datetime.now().strftime('%A').lower()
-            today = datetime.now().date().isoformat()
-            all_habits = self.manager.get_habits()
-            habits = [h for h in all_habits if h.is_due_today(today_weekday) and not h.is_completed_today(today)]
-        
-        # Combine into items
-        items = []
-        for task in tasks:
-            items.append({
-                'type': 'task',
-                'id': task['id'],
-                'description': task['description'],
-                'created_at': task.get('created_at', '')
-            })
-        
-        for habit in habits:
-            items.append({
-                'type': 'habit',
-                'id': habit.id,
-                'description': habit.description,
-                'frequency': habit.frequency,
-                'days': habit.days,
-                'time_of_day': habit.time_of_day
-            })
-        
-        return items
+        return self.manager.get_agenda(self.now, relevant_only=time_filtered)
     
     # Main View Commands
     def do_today(self, line):
         """Show all tasks and habits due today
-        Usage: today
+        Usage: today [--format json|ndjson]
         
         From this view you can:
         - Type 'add <description>' to add a task
         - Type 'done task <id>' or 'done habit <id>' to complete
-        - Type 'remove task <id>' or 'remove habit <id>' to delete"""
+        - Type 'remove task <id>' or 'remove habit <id>' to delete
+        
+        --format json|ndjson prints the items as JSON for scripts"""
+        line, fmt = self._parse_format(line)
+        if line is None:
+            return
         items = self._get_today_items(time_filtered=False)
         
+        if fmt:
+            self._write_items(items, fmt)
+            return
+        
         if not items:
             print("\n🎉 Great! You have nothing due today!\n")
             return
         
-        # Get current time for display
-        current_time = get_current_time_of_day()
-        
-        print("\n" + "="*70)
-        print("TODAY'S AGENDA".center(70))
-        print("="*70)
+        out = Renderer()
+        out.line("\n" + "="*70)
+        out.line("TODAY'S AGENDA".center(70))
+        out.line("="*70)
         
         # Group by type
         tasks = [i for i in items if i['type'] == 'task']
         habits = [i for i in items if i['type'] == 'habit']
         
         if tasks:
-            print("\n📋 TASKS:")
-            for item in tasks:
-                print(f"  [{item['id']}] {item['description']}")
+            out.line("\n📋 TASKS:")
+            out.lines([f"  [{item['id']}] {item['description']}" for item in tasks])
         
         if habits:
-            print("\n🔄 HABITS:")
+            out.line("\n🔄 HABITS:")
             for item in habits:
-                time_display = format_time_of_day(item['time_of_day'])
-                freq_info = item['frequency'].capitalize()
-                if item['frequency'] == 'weekly':
-                    freq_info += f" ({', '.join(item['days'])})"
-                print(f"  [{item['id']}] {item['description']}")
-                print(f"       {time_display} | {freq_info}")
+                out.line(f"  [{item['id']}] {item['description']}")
+                out.line(f"       {self._habit_info(item)}")
         
-        print("\n" + "="*70)
-        print(f"Total: {len(tasks)} task(s), {len(habits)} habit(s)")
-        print("="*70 + "\n")
+        out.line("\n" + "="*70)
+        out.line(f"Total: {len(tasks)} task(s), {len(habits)} habit(s)")
+        out.line("="*70 + "\n")
+        out.flush()
     
     def do_next(self, line):
         """Show next 1-3 items to focus on (time-aware!)
-        Usage: next [number]
+        Usage: next [number] [--format json|ndjson]
         
         Shows items relevant to current time of day:
         - Morning (before 1pm): morning & anytime items
@@ -127,7 +262,13 @@ Type 'quit' or 'q' to exit.
         - Type 'add <description>' to add a task
         - Type 'done task <id>' or 'done habit <id>' to complete
         
-        Example: next 2 (shows next 2 items)"""
+        Example: next 2 (shows next 2 items)
+        
+        --format json|ndjson prints the items as JSON for scripts"""
+        
+        line, fmt = self._parse_format(line)
+        if line is None:
+            return
         
         # Parse number of items to show
         try:
@@ -138,8 +279,12 @@ Type 'quit' or 'q' to exit.
         
         items = self._get_today_items(time_filtered=True)
         
+        if fmt:
+            self._write_items(items[:max_items], fmt)
+            return
+        
         if not items:
-            current_time = get_current_time_of_day()
+            current_time = self.now.time_of_day
             time_name = current_time.value.capitalize()
             print(f"\n🎉 Nothing to do right now! (Current time: {format_time_of_day(current_time.value)})")
             print("💡 Tip: Use 'today' to see your full agenda\n")
@@ -148,32 +293,128 @@ Type 'quit' or 'q' to exit.
         # Show only the first N items
         next_items = items[:max_items]
         
-        current_time = get_current_time_of_day()
-        print("\n" + "="*70)
-        print(f"NEXT {len(next_items)} ITEM(S) TO FOCUS ON".center(70))
-        print(f"{format_time_of_day(current_time.value)}".center(70))
-        print("="*70 + "\n")
+        current_time = self.now.time_of_day
+        out = Renderer()
+        out.line("\n" + "="*70)
+        out.line(f"NEXT {len(next_items)} ITEM(S) TO FOCUS ON".center(70))
+        out.line(f"{format_time_of_day(current_time.value)}".center(70))
+        out.line("="*70 + "\n")
         
         for i, item in enumerate(next_items, 1):
             icon = "📋" if item['type'] == 'task' else "🔄"
             type_label = "Task" if item['type'] == 'task' else "Habit"
             
+            out.line(f"{i}. {icon} [{item['id']}] {item['description']}")
             if item['type'] == 'habit':
-                time_display = format_time_of_day(item['time_of_day'])
-                freq_info = item['frequency'].capitalize()
-                if item['frequency'] == 'weekly':
-                    freq_info += f" ({', '.join(item['days'])})"
-                print(f"{i}. {icon} [{item['id']}] {item['description']}")
-                print(f"   Type: {type_label} | {time_display} | {freq_info}\n")
+                out.line(f"   Type: {type_label} | {self._habit_info(item)}\n")
             else:
-                print(f"{i}. {icon} [{item['id']}] {item['description']}")
-                print(f"   Type: {type_label}\n")
+                out.line(f"   Type: {type_label}\n")
         
-        print("="*70 + "\n")
+        out.line("="*70 + "\n")
         
         if len(items) > max_items:
             remaining = len(items) - max_items
-            print(f"💡 Tip: You have {remaining} more item(s) for now. Type 'today' to see all.\n")
+            out.line(f"💡 Tip: You have {remaining} more item(s) for now. Type 'today' to see all.\n")
+        out.flush()
+    
+    def do_view(self, line):
+        """View full lists of tasks and habits
+        Usage: 
+          view tasks [all]  - View all incomplete tasks (or all tasks)
+          view habits       - View all habits
+        
+        Add --format json|ndjson to print the items as JSON for scripts.
+        
+        Examples:
+          view tasks
+          view tasks all
+          view habits
+          view habits --format ndjson"""
+        
+        line, fmt = self._parse_format(line)
+        if line is None:
+            return
+        parts = line.strip().lower().split()
+        
+        if not parts or parts[0] == 'tasks':
+            show_all = len(parts) > 1 and parts[1] == 'all'
+            tasks = self.manager.get_tasks(show_completed=show_all)
+            
+            if fmt:
+                self._write_items([{
+                    'type': 'task',
+                    'id': task.id,
+                    'description': task.description,
+                    'completed': task.completed,
+                    'created_at': task.created_at,
+                    'completed_at': task.completed_at,
+                    'updated_at': task.updated_at
+                } for task in tasks], fmt)
+                return
+            
+            if not tasks:
+                print("📭 No tasks found\n")
+                return
+            
+            out = Renderer()
+            out.line("\n" + "="*70)
+            out.line("ALL TASKS".center(70))
+            out.line("="*70)
+            out.line(f"{'ID':<5} {'Status':<12} {'Task':<50}")
+            out.line("="*70)
+            
+            for task in tasks:
+                status = "✓ Done" if task.completed else "○ Pending"
+                out.line(f"{task.id:<5} {status:<12} {task.description:<50}")
+            
+            out.line("="*70 + "\n")
+            out.flush()
+        
+        elif parts[0] == 'habits':
+            habits = self.manager.get_habits()
+            today_weekday = self.now.weekday
+            today = self.now.today
+            
+            if fmt:
+                self._write_items([{
+                    'type': 'habit',
+                    'id': habit.id,
+                    'description': habit.description,
+                    'frequency': habit.frequency,
+                    'days': habit.days,
+                    'time_of_day': habit.time_of_day,
+                    'due_today': habit.is_due_today(today_weekday),
+                    'completed_today': habit.is_completed_today(today)
+                } for habit in habits], fmt)
+                return
+            
+            if not habits:
+                print("📭 No habits found\n")
+                return
+            
+            out = Renderer()
+            out.line("\n" + "="*80)
+            out.line("ALL HABITS".center(80))
+            out.line("="*80)
+            out.line(f"{'ID':<5} {'Status':<15} {'Frequency':<20} {'Habit':<35}")
+            out.line("="*80)
+            
+            for habit in habits:
+                if habit.is_due_today(today_weekday):
+                    status = "✓ Done Today" if habit.is_completed_today(today) else "○ Due Today"
+                else:
+                    status = "— Not Due"
+                
+                freq_info = self._rows.get(
+                    ('freq', habit.id), (habit.frequency, tuple(habit.days)),
+                    lambda: self._frequency_info(habit.frequency, habit.days))
+                out.line(f"{habit.id:<5} {status:<15} {freq_info:<20} {habit.description:<35}")
+            
+            out.line("="*80 + "\n")
+            out.flush()
+        
+        else:
+            self._error("❌ Usage: view tasks [all] | view habits")
     
     # Quick Add/Complete/Remove Commands  
     def do_add(self, line):
@@ -192,7 +433,7 @@ Type 'quit' or 'q' to exit.
           add weekly monday,friday afternoon Go to gym"""
         
         if not line:
-            print("❌ Please provide a description")
+            self._error("❌ Please provide a description")
             return
         
         parts = line.strip().split(maxsplit=3)
@@ -200,7 +441,7 @@ Type 'quit' or 'q' to exit.
         # Check if it's a habit
         if parts[0].lower() == 'daily':
             if len(parts) < 3:
-                print("❌ Usage: add daily <time> <description>")
+                self._error("❌ Usage: add daily <time> <description>")
                 print("   Times: morning, afternoon, evening, anytime")
                 return
             
@@ -210,7 +451,7 @@ Type 'quit' or 'q' to exit.
             # Validate time of day
             valid_times = [t.value for t in TimeOfDay]
             if time_of_day not in valid_times:
-                print(f"❌ Invalid time. Use: {', '.join(valid_times)}")
+                self._error(f"❌ Invalid time. Use: {', '.join(valid_times)}")
                 return
             
             habit_id = self.manager.add_habit(description, 'daily', time_of_day=time_of_day)
@@ -218,7 +459,7 @@ Type 'quit' or 'q' to exit.
         
         elif parts[0].lower() == 'weekly':
             if len(parts) < 4:
-                print("❌ Usage: add weekly <days> <time> <description>")
+                self._error("❌ Usage: add weekly <days> <time> <description>")
                 print("   Example: add weekly monday,friday afternoon Go to gym")
                 return
             
@@ -229,7 +470,7 @@ Type 'quit' or 'q' to exit.
             # Validate time of day
             valid_times = [t.value for t in TimeOfDay]
             if time_of_day not in valid_times:
-                print(f"❌ Invalid time. Use: {', '.join(valid_times)}")
+                self._error(f"❌ Invalid time. Use: {', '.join(valid_times)}")
                 return
             
             days = [d.strip().capitalize() for d in days_str.split(',')]
@@ -238,7 +479,7 @@ Type 'quit' or 'q' to exit.
             invalid_days = [d for d in days if d not in valid_days]
             
             if invalid_days:
-                print(f"❌ Invalid days: {', '.join(invalid_days)}")
+                self._error(f"❌ Invalid days: {', '.join(invalid_days)}")
                 return
             
             habit_id = self.manager.add_habit(description, 'weekly', days, time_of_day)
@@ -264,7 +505,7 @@ Type 'quit' or 'q' to exit.
         parts = line.strip().split()
         
         if not parts:
-            print("❌ Usage: done <id> | done task <id> | done habit <id>")
+            self._error("❌ Usage: done <id> | done task <id> | done habit <id>")
             return
         
         try:
@@ -276,16 +517,16 @@ Type 'quit' or 'q' to exit.
                     if self.manager.complete_task(item_id):
                         print(f"✅ Task {item_id} marked as completed!")
                     else:
-                        print(f"❌ Task {item_id} not found")
+                        self._error(f"❌ Task {item_id} not found")
                 
                 elif item_type == 'habit':
                     if self.manager.complete_habit_today(item_id):
                         print(f"✅ Habit {item_id} checked off for today!")
                     else:
-                        print(f"❌ Habit {item_id} not found or already completed")
+                        self._error(f"❌ Habit {item_id} not found or already completed")
                 
                 else:
-                    print("❌ Type must be 'task' or 'habit'")
+                    self._error("❌ Type must be 'task' or 'habit'")
             
             else:
                 item_id = int(parts[0])
@@ -295,13 +536,140 @@ Type 'quit' or 'q' to exit.
                 elif self.manager.complete_habit_today(item_id):
                     print(f"✅ Habit {item_id} checked off for today!")
                 else:
-                    print(f"❌ Item {item_id} not found")
+                    self._error(f"❌ Item {item_id} not found")
         
         except ValueError:
-            print("❌ Please provide a valid ID (number)")
+            self._error("❌ Please provide a valid ID (number)")
+    
+    # Import/Export Commands
+    def do_export(self, line):
+        """Export all tasks and habits, including habit histories
+        Usage: export <file|-> [ndjson|csv]
+        
+        The format defaults to the file extension (.csv, .ndjson/.jsonl),
+        otherwise NDJSON. Use '-' to write to standard output.
+        
+        Examples:
+          export backup.ndjson
+          export habits.csv
+          export - csv"""
+        parts = line.split()
+        if not parts or len(parts) > 2:
+            self._error("❌ Usage: export <file|-> [ndjson|csv]")
+            return
+        from . import transfer  # only exports and imports need it
+        
+        path = parts[0]
+        fmt = parts[1].lower() if len(parts) == 2 else transfer.guess_format(path)
+        if fmt not in transfer.FORMATS:
+            self._error(f"❌ Invalid format. Use: {', '.join(transfer.FORMATS)}")
+            return
+        
+        if path == '-':
+            sys.stdout.writelines(self.manager.export_records(fmt))
+            return
+        try:
+            with open(self._path(path), 'w', newline='') as f:
+                f.writelines(self.manager.export_records(fmt))
+        except OSError as e:
+            self._error(f"❌ Cannot write {path}: {e}")
+            return
+        print(f"✅ Exported {len(self.manager.tasks)} task(s) and "
+              f"{len(self.manager.habits)} habit(s) to {path}")
+    
+    def do_import(self, line):
+        """Import tasks and habits from an export file
+        Usage: import <file|-> [ndjson|csv]
+        
+        The format defaults to the file extension (.csv, .ndjson/.jsonl),
+        otherwise NDJSON. Use '-' to read from standard input. Imported
+        items get new IDs; invalid rows are skipped.
+        
+        Examples:
+          import backup.ndjson
+          import archive.csv"""
+        parts = line.split()
+        if not parts or len(parts) > 2:
+            self._error("❌ Usage: import <file|-> [ndjson|csv]")
+            return
+        import csv
+        from . import transfer  # only exports and imports need it
+        
+        path = parts[0]
+        fmt = parts[1].lower() if len(parts) == 2 else transfer.guess_format(path)
+        if fmt not in transfer.FORMATS:
+            self._error(f"❌ Invalid format. Use: {', '.join(transfer.FORMATS)}")
+            return
+        
+        try:
+            if path == '-':
+                result = self.manager.import_records(sys.stdin, fmt)
+            else:
+                with open(self._path(path), 'r', newline='') as f:
+                    result = self.manager.import_records(f, fmt)
+        except (OSError, RuntimeError, ValueError, csv.Error) as e:
+            # Unreadable input (e.g. not UTF-8); nothing was imported
+            self._error(f"❌ Cannot import {path}: {e}")
+            return
+        
+        print(f"✅ Imported {result['tasks']} task(s) and {result['habits']} habit(s)")
+        if result['skipped']:
+            print(f"⚠️  Skipped {result['skipped']} invalid row(s):")
+            for number, error in result['errors']:
+                print(f"   line {number}: {error}")
+    
+    def do_merge(self, line):
+        """Merge another copy of the data file into this one
+        Usage: merge <file>
+    
+        For conflicting copies left by a sync tool or kept on two machines.
+        Items are matched across copies; for each field the latest change
+        wins, habit check-offs from both copies are kept, and removals carry
+        over. The other file is not changed.
+    
+        Examples:
+          merge "todo_data (conflicted copy).json"
+          merge /mnt/laptop/todo_data.json"""
+        path = line.strip().strip('"\'')
+        if not path:
+            self._error("❌ Usage: merge <file>")
+            return
+        try:
+            result = self.manager.merge_file(self._path(path))
+        except (OSError, ValueError, RuntimeError) as e:
+            self._error(f"❌ Cannot merge {path}: {e}")
+            return
+        self._print_merge("Merged", result)
+    
+    def do_sync(self, line):
+        """Exchange changes with other copies through a shared directory
+        Usage: sync <directory>
+    
+        Writes what changed here since the last sync into the directory and
+        merges in what other copies wrote there. Point every machine at the
+        same directory (e.g. one your file sync tool shares).
+    
+        Examples:
+          sync ~/Sync/todo"""
+        directory = line.strip().strip('"\'')
+        if not directory:
+            self._error("❌ Usage: sync <directory>")
+            return
+        try:
+            result = self.manager.sync(self._path(directory))
+        except (OSError, RuntimeError) as e:
+            self._error(f"❌ Cannot sync with {directory}: {e}")
+            return
+        self._print_merge(f"Sent {result['sent']} change(s); received", result)
+    
+    @staticmethod
+    def _print_merge(what, result):
+        print(f"✅ {what}: {result['added']} added, {result['updated']} updated, "
+              f"{result['removed']} removed")
     
     def do_quit(self, line):
         """Exit the application"""
+        self.close()
         print("\n👋 Goodbye! Stay productive!\n")
         return True
     
@@ -311,6 +679,7 @@ Type 'quit' or 'q' to exit.
     
     def do_EOF(self, line):
         """Exit on Ctrl+D"""
+        self.close()
         print()
         return True
 
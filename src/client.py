@@ -0,0 +1,54 @@
+"""
+Thin client for a running `todo serve` daemon
+
+Kept free of the rest of the package (bar the tiny ``config``) so a
+one-shot command sent to the daemon only pays for importing ``socket`` and
+``json``.
+"""
+
+import json
+import os
+import socket
+from typing import Dict, Optional
+
+from . import config
+
+
+def socket_path(data_file: Optional[str] = None) -> str:
+    """Where the daemon for ``data_file`` (the configured one by default)
+    listens (``$TODO_SOCKET`` overrides)"""
+    return os.environ.get('TODO_SOCKET') or (data_file or config.data_file()) + '.sock'
+
+
+def request(line: str, path: Optional[str] = None, timeout: float = 30.0) -> Optional[Dict]:
+    """Send one command line to the daemon and return its reply
+
+    The reply is ``{'output': str, 'error': bool}``. Returns None if no
+    daemon is listening, so the caller can run the command itself. Relative
+    paths in the command are resolved against our working directory.
+    """
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except OSError:
+            # Stale socket file from a daemon that is gone
+            return None
+        sock.sendall(json.dumps({'command': line, 'cwd': os.getcwd()}).encode() + b'\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if chunk.endswith(b'\n'):
+                break
+    finally:
+        sock.close()
+    if not chunks:
+        return None
+    return json.loads(b''.join(chunks))
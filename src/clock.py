@@ -0,0 +1,68 @@
+"""
+Clock snapshots for time-of-day checks
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .models import TimeOfDay, get_current_time_of_day, is_time_relevant
+
+
+class Now:
+    """Everything the agenda needs to know about one moment, computed once
+
+    A command takes a single snapshot and passes it to every check, so all
+    habits are judged against the same instant and a view can't change
+    halfway through when a period boundary is crossed.
+    """
+
+    __slots__ = ('datetime', 'today', 'ordinal', 'weekday', 'time_of_day', 'relevant_times')
+
+    def __init__(self, moment: datetime):
+        self.datetime = moment
+        self.today = moment.date().isoformat()
+        self.ordinal = moment.toordinal()
+        self.weekday = moment.strftime('%A').lower()
+        self.time_of_day = get_current_time_of_day(moment)
+        self.relevant_times = frozenset(
+            t.value for t in TimeOfDay if is_time_relevant(t.value, self.time_of_day, moment))
+
+    def is_relevant(self, habit_time: str) -> bool:
+        """Whether a habit with this time of day should be shown now"""
+        return habit_time in self.relevant_times
+
+    def isoformat(self) -> str:
+        return self.datetime.isoformat()
+
+    def __repr__(self):
+        return f"Now({self.datetime.isoformat()})"
+
+
+class Clock:
+    """The system clock"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def snapshot(self) -> Now:
+        return Now(self.now())
+
+
+class FakeClock(Clock):
+    """A clock that only moves when told to, for tests and benchmarks"""
+
+    def __init__(self, moment: Optional[datetime] = None):
+        self.moment = moment or datetime(2024, 1, 1, 9, 0)
+
+    def now(self) -> datetime:
+        return self.moment
+
+    def set(self, moment: datetime):
+        self.moment = moment
+
+    def advance(self, **kwargs):
+        """Move forward by ``timedelta(**kwargs)``"""
+        self.moment += timedelta(**kwargs)
+
+
+SYSTEM_CLOCK = Clock()
@@ -0,0 +1,171 @@
+"""
+Habit completion history stored as sorted day ordinals
+"""
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import chain, groupby
+from typing import Iterable, Iterator, List, Optional, Union
+
+Day = Union[int, str, date]
+
+# 4-byte unsigned ints; day ordinals for any realistic date fit easily
+_TYPECODE = 'I'
+
+
+def to_ordinal(day: Day) -> int:
+    """Day ordinal (``date.toordinal()``) of an ordinal, ISO date string or date"""
+    if isinstance(day, int):
+        return day
+    if isinstance(day, str):
+        return date.fromisoformat(day[:10]).toordinal()
+    return day.toordinal()
+
+
+def to_iso(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+class Completions:
+    """The days a habit was completed, as a sorted array of day ordinals
+
+    Membership, counts over a range and streaks are binary searches, and
+    checking off today appends to the end. Iterating yields ISO date
+    strings, so code that treated completions as a list of dates still
+    works; ``ordinals()`` gives the raw integers.
+    """
+
+    __slots__ = ('_days',)
+
+    def __init__(self, days: Iterable[Day] = ()):
+        if isinstance(days, Completions):
+            self._days = array(_TYPECODE, days._days)
+        else:
+            self._days = array(_TYPECODE, sorted({to_ordinal(day) for day in days}))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'Completions':
+        """Rebuild from ``to_bytes()`` output"""
+        completions = cls()
+        completions._days.frombytes(blob)
+        if sys.byteorder == 'big':
+            completions._days.byteswap()
+        return completions
+
+    def to_bytes(self) -> bytes:
+        """Little-endian packed ordinals"""
+        if sys.byteorder == 'big':
+            days = array(_TYPECODE, self._days)
+            days.byteswap()
+            return days.tobytes()
+        return self._days.tobytes()
+
+    def ordinals(self) -> array:
+        return self._days
+
+    def add(self, day: Day) -> bool:
+        """Record a completion; returns False if the day was already there"""
+        ordinal = to_ordinal(day)
+        days = self._days
+        if not days or ordinal > days[-1]:
+            days.append(ordinal)
+            return True
+        i = bisect_left(days, ordinal)
+        if days[i] == ordinal:
+            return False
+        days.insert(i, ordinal)
+        return True
+
+    def union(self, other: 'Completions') -> 'Completions':
+        """Completions in either; linear, since sorting two sorted runs
+        is a single merge"""
+        merged = sorted(chain(self._days, other._days))
+        completions = Completions()
+        completions._days = array(_TYPECODE, (day for day, _ in groupby(merged)))
+        return completions
+
+    def discard(self, day: Day) -> bool:
+        """Remove a completion; returns False if the day wasn't there"""
+        ordinal = to_ordinal(day)
+        i = bisect_left(self._days, ordinal)
+        if i < len(self._days) and self._days[i] == ordinal:
+            del self._days[i]
+            return True
+        return False
+
+    def count_between(self, start: Day, end: Day) -> int:
+        """Number of completions from ``start`` to ``end`` inclusive"""
+        return (bisect_right(self._days, to_ordinal(end))
+                - bisect_left(self._days, to_ordinal(start)))
+
+    def between(self, start: Day, end: Day) -> List[str]:
+        """ISO dates of completions from ``start`` to ``end`` inclusive"""
+        lo = bisect_left(self._days, to_ordinal(start))
+        hi = bisect_right(self._days, to_ordinal(end))
+        return [to_iso(d) for d in self._days[lo:hi]]
+
+    def streak(self, day: Day) -> int:
+        """Number of consecutive completed days ending on ``day``"""
+        days = self._days
+        ordinal = to_ordinal(day)
+        end = bisect_left(days, ordinal)
+        if end == len(days) or days[end] != ordinal:
+            return 0
+        # Within a run of consecutive days, days[i] - i is constant (and it
+        # only grows across gaps), so the run's start is a binary search
+        gap = ordinal - end
+        lo, hi = 0, end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if days[mid] - mid < gap:
+                lo = mid + 1
+            else:
+                hi = mid
+        return end - lo + 1
+
+    def last(self) -> Optional[str]:
+        """ISO date of the most recent completion"""
+        return to_iso(self._days[-1]) if self._days else None
+
+    def __contains__(self, day: Day) -> bool:
+        try:
+            ordinal = to_ordinal(day)
+        except (TypeError, ValueError, AttributeError):
+            return False
+        days = self._days
+        i = bisect_left(days, ordinal)
+        return i < len(days) and days[i] == ordinal
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def __iter__(self) -> Iterator[str]:
+        return (to_iso(d) for d in self._days)
+
+    def __eq__(self, other):
+        if isinstance(other, Completions):
+            return self._days == other._days
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (_from_ordinals, (self._days,))
+
+    def __repr__(self):
+        return f"Completions({list(self)!r})"
+
+
+def _from_ordinals(days: array) -> Completions:
+    completions = Completions()
+    completions._days = array(_TYPECODE, days)
+    return completions
+
+
+def json_default(value):
+    """``json.dumps(default=...)`` hook writing completions as ordinals"""
+    if isinstance(value, Completions):
+        return value.ordinals().tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,54 @@
+"""
+Where the `todo` command keeps its data, read from the environment
+
+    TODO_DATA      the data file (default todo_data.json); a .db or .sqlite
+                   file is stored in SQLite
+    TODO_STORAGE   comma-separated storage options: ``journal`` appends each
+                   change to <data file>.journal instead of rewriting the
+                   file, ``binary`` writes snapshots in the compact binary
+                   format, ``sqlite`` makes the default data file todo_data.db
+
+Kept free of the rest of the package; the daemon client imports it too.
+"""
+
+import os
+from typing import Dict, Set
+
+DATA_FILE = 'todo_data.json'
+SQLITE_FILE = 'todo_data.db'
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+STORAGE_OPTIONS = ('journal', 'binary', 'sqlite')
+
+
+class ConfigError(ValueError):
+    """An environment variable holds a value the tool cannot use"""
+
+
+def storage_options() -> Set[str]:
+    """The options named in ``$TODO_STORAGE``"""
+    raw = os.environ.get('TODO_STORAGE', '')
+    options = {option.strip().lower() for option in raw.split(',') if option.strip()}
+    unknown = options.difference(STORAGE_OPTIONS)
+    if unknown:
+        raise ConfigError(f"Unknown TODO_STORAGE option(s): {', '.join(sorted(unknown))}. "
+                          f"Use: {', '.join(STORAGE_OPTIONS)}")
+    return options
+
+
+def data_file() -> str:
+    """The data file (``$TODO_DATA``, or the default for the backend)"""
+    path = os.environ.get('TODO_DATA')
+    if path:
+        return os.path.expanduser(path)
+    return SQLITE_FILE if 'sqlite' in storage_options() else DATA_FILE
+
+
+def manager_options() -> Dict:
+    """``TodoManager`` keyword arguments for the configured store"""
+    options = storage_options()
+    path = data_file()
+    if 'sqlite' in options and not path.endswith(SQLITE_SUFFIXES):
+        raise ConfigError(f"TODO_STORAGE=sqlite needs a {'/'.join(SQLITE_SUFFIXES)} "
+                          f"TODO_DATA file, not {path}")
+    return {'data_file': path, 'journal': 'journal' in options,
+            'binary': 'binary' in options}
@@ -0,0 +1,194 @@
+"""
+`todo serve`: a resident process holding one TodoManager in memory
+
+Clients (see ``src/client.py``) send command lines over a Unix domain
+socket; each line runs through ``TodoCLI`` exactly as it would locally and
+the printed output is sent back. Read-only commands run concurrently;
+commands that change data run one at a time.
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from .cli import TodoCLI
+from .client import socket_path
+
+
+class ReadWriteLock:
+    """Many readers or one writer; waiting writers block new readers"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class ThreadOutput(io.TextIOBase):
+    """Stand-in for sys.stdout that gives each capturing thread its own buffer
+
+    Commands print directly to stdout; while a request thread is inside
+    ``capture()`` its output goes to that request's buffer instead.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self):
+        buffer = self._local.buffer = io.StringIO()
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def _target(self):
+        return getattr(self._local, 'buffer', None) or self._default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def isatty(self):
+        # Captured output goes to a client, not this terminal
+        return self._target() is self._default and self._default.isatty()
+
+
+class TodoServer:
+    """Runs command lines against one shared TodoManager"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.lock = ReadWriteLock()
+        self.output = ThreadOutput(sys.stdout)
+
+    def run(self, line: str, cwd: Optional[str] = None) -> dict:
+        """Run one command line and return ``{'output', 'error'}``; relative
+        paths in it are taken from ``cwd`` (the client's directory)"""
+        cli = TodoCLI(self.manager, cwd=cwd)
+        if cli.is_read_only(line):
+            with self.lock.read():
+                # Usually nothing changed outside, and reads share the lock
+                if not self.manager.has_outside_changes():
+                    return self._run(cli, line)
+        with self.lock.write():
+            # Pick up changes other processes made to the store
+            self.manager.refresh()
+            return self._run(cli, line)
+
+    def _run(self, cli, line):
+        with self.output.capture() as buffer:
+            try:
+                cli.onecmd(line)
+            except Exception as e:
+                cli._error(f"❌ {e}")
+        return {'output': buffer.getvalue(), 'error': cli.last_error}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            try:
+                request = json.loads(raw)
+                reply = self.server.todo.run(request['command'], request.get('cwd'))
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {'output': f"❌ Bad request: {e}\n", 'error': True}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Prompt widgets in many shells may connect at once
+    request_queue_size = 128
+
+
+def _in_use(path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(manager=None, path=None) -> int:
+    """Serve commands on the Unix socket until interrupted"""
+    if manager is None:
+        from .config import manager_options
+        from .manager import TodoManager
+        manager = TodoManager(**manager_options())
+    path = path or socket_path(manager.data_file)
+
+    if os.path.exists(path):
+        if _in_use(path):
+            print(f"❌ A todo daemon is already listening on {path}")
+            return 1
+        os.remove(path)
+
+    # Only the owner may connect
+    umask = os.umask(0o177)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(umask)
+    server.todo = TodoServer(manager)
+    sys.stdout = server.todo.output
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"📡 Serving {manager.data_file} on {path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.stdout = server.todo.output._default
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        manager.save_data()
+    print("👋 Daemon stopped")
+    return 0
@@ -0,0 +1,72 @@
+"""
+Writing the store's files: atomically, and with the data file's permissions
+"""
+
+import os
+import stat
+from typing import Optional
+
+
+def _umask() -> int:
+    """The process umask (reading it means setting it, so set it back)"""
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def file_mode(path: str) -> int:
+    """Permissions of ``path``, or the umask default if it doesn't exist
+
+    Files kept next to the data file (journal, cache, sync deltas) are
+    created with the data file's mode, so a store readable only by its
+    owner doesn't leak its contents through them.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask()
+
+
+def atomic_write(path: str, data, mode: Optional[int] = None, fsync: bool = True):
+    """Write ``data`` to ``path`` so readers see either the old or new file
+
+    The data goes to a temporary file in the same directory, is fsynced, and
+    then renamed over ``path``. A crash at any point leaves the previous
+    file intact. The new file gets ``mode``, by default the permissions of
+    the one it replaces (the umask default for a new file), not the
+    temporary file's 0600. ``fsync=False`` skips the syncs, for files that
+    can be rebuilt if a crash loses them.
+    """
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if mode is None:
+        mode = file_mode(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if not fsync:
+        return
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,134 @@
+"""
+Append-only journal of mutations kept next to the JSON snapshot
+"""
+
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+from .completions import json_default
+from .files import file_mode
+
+
+class Journal:
+    """Write-ahead log with one compact JSON record per line
+
+    Every entry is idempotent (upsert, field patch, delete, add completion),
+    so replaying a journal on top of a snapshot that already contains some of
+    its entries is harmless.
+    """
+
+    def __init__(self, path: str, like: Optional[str] = None):
+        self.path = path
+        # A new journal gets the permissions of this file (the snapshot)
+        self.like = like or path
+        self.entries = 0
+        # How far this process has read or written, and in which file
+        self.offset = 0
+        self.inode = None
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def replay(self) -> Iterator[Dict]:
+        """Yield journal entries in the order they were written"""
+        self.entries = 0
+        self.offset = 0
+        self.inode = None
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            for line in f:
+                entry = self._parse(line)
+                if entry is False:
+                    # A torn final line from an interrupted append
+                    break
+                self.offset += len(line)
+                if entry is not None:
+                    self.entries += 1
+                    yield entry
+
+    def tail(self) -> Optional[List[Dict]]:
+        """Entries appended since this process last replayed, read or wrote
+        the journal, or None if it has been replaced or truncated since (the
+        snapshot must be reloaded then)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None if self.offset else []
+        if (self.inode is not None and st.st_ino != self.inode) or st.st_size < self.offset:
+            return None
+        if st.st_size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        entries = []
+        for line in data.splitlines(keepends=True):
+            entry = self._parse(line)
+            if entry is False or not line.endswith(b'\n'):
+                # Not fully written yet; read it next time
+                break
+            self.offset += len(line)
+            if entry is not None:
+                entries.append(entry)
+        self.inode = st.st_ino
+        self.entries += len(entries)
+        return entries
+
+    @staticmethod
+    def _parse(line: bytes):
+        """The entry on ``line``, None for a blank line, False if torn"""
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return False
+
+    def append(self, entry: Dict):
+        """Append a single entry to the end of the journal"""
+        self.extend([entry])
+
+    def extend(self, entries: List[Dict]):
+        """Append several entries with a single write"""
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry, separators=(',', ':'), default=json_default) + '\n' for entry in entries)
+        data = memoryview(lines.encode('utf-8'))
+        # Unbuffered, so a failed write can be cut back off the file
+        with open(self._open_fd(), 'ab', buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                while data:
+                    data = data[f.write(data):]
+            except BaseException:
+                # A torn line would stop every later replay short
+                f.truncate(start)
+                raise
+            # Writers hold the store's exclusive lock and are current, so
+            # everything up to here is already applied in this process
+            self.offset = f.tell()
+            self.inode = os.fstat(f.fileno()).st_ino
+        self.entries += len(entries)
+
+    def _open_fd(self) -> int:
+        """The journal opened for appending, created if need be"""
+        try:
+            return os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            os.fchmod(fd, file_mode(self.like))
+            return fd
+
+    def clear(self):
+        """Drop all entries once they are part of a snapshot"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = 0
+        self.offset = 0
+        self.inode = None
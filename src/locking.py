@@ -0,0 +1,134 @@
+"""
+Cross-process advisory locking, the store's generation counter and the
+next free ids
+"""
+
+import os
+from contextlib import contextmanager
+from typing import List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class NullLock:
+    """Lock for stores no other process can see"""
+
+    @contextmanager
+    def shared(self):
+        yield self
+
+    @contextmanager
+    def exclusive(self):
+        yield self
+
+    def generation(self) -> int:
+        return 0
+
+    def bump(self, next_ids: Tuple[int, int] = (0, 0)) -> int:
+        return 0
+
+    def reserve(self, kind: str, count: int, at_least: int) -> int:
+        return at_least
+
+
+class FileLock:
+    """Advisory ``flock`` on ``path`` that also stores a generation counter
+
+    Readers hold a shared lock while loading and writers an exclusive lock
+    while saving. Every write bumps the counter kept in the lock file, so a
+    process can tell cheaply whether the store changed since it last loaded
+    it. The file also holds the next task and habit ids, so ``reserve()``
+    can hand out ids for records that are written later without another
+    process taking them meanwhile. Locks are reentrant within one
+    ``FileLock``; an exclusive lock also covers nested shared sections.
+    """
+
+    KINDS = ('task', 'habit')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError("Cannot upgrade a shared lock to an exclusive one")
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+            return
+
+        if exclusive:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        else:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                # Nobody has written through a lock yet
+                yield self
+                return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._fd = fd
+            self._depth = 1
+            self._exclusive = exclusive
+            yield self
+        finally:
+            self._depth = 0
+            self._exclusive = False
+            self._fd = None
+            os.close(fd)
+
+    def shared(self):
+        """Context manager holding a shared (reader) lock"""
+        return self._locked(exclusive=False)
+
+    def exclusive(self):
+        """Context manager holding an exclusive (writer) lock"""
+        return self._locked(exclusive=True)
+
+    def _counters(self) -> List[int]:
+        """Generation, next task id and next habit id; older lock files hold
+        only the generation"""
+        if self._fd is None:
+            return [0, 0, 0]
+        values = [int(value) for value in os.pread(self._fd, 64, 0).split()]
+        return (values + [0, 0, 0])[:3]
+
+    def _store(self, values: List[int]):
+        data = ' '.join(map(str, values)).encode()
+        os.pwrite(self._fd, data, 0)
+        os.ftruncate(self._fd, len(data))
+
+    def generation(self) -> int:
+        """Current generation; call while holding a lock"""
+        return self._counters()[0]
+
+    def bump(self, next_ids: Tuple[int, int] = (0, 0)) -> int:
+        """Increment and return the generation, raising the next free
+        (task, habit) ids to at least ``next_ids``; call while holding an
+        exclusive lock"""
+        generation, next_task, next_habit = self._counters()
+        self._store([generation + 1, max(next_task, next_ids[0]),
+                     max(next_habit, next_ids[1])])
+        return generation + 1
+
+    def reserve(self, kind: str, count: int, at_least: int) -> int:
+        """Take ``count`` consecutive ids for new ``kind`` records, none below
+        ``at_least``, and return the first; call while holding an
+        exclusive lock"""
+        values = self._counters()
+        index = 1 + self.KINDS.index(kind)
+        start = max(values[index], at_least)
+        values[index] = start + count
+        self._store(values)
+        return start
@@ -2,215 +2,939 @@
 TodoManager - handles data persistence and business logic
 """
 
-import json
+import copy
+import gc
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 
+from . import sync
+from .agenda import Agenda
+from .clock import SYSTEM_CLOCK, Clock, Now
+from .files import file_mode
+from .migrations import CURRENT_SCHEMA_VERSION, migrate
 from .models import Task, Habit, TimeOfDay
+from .schedule import HabitIndex
+from .storage import Storage, apply_entry, open_storage
+from .watch import StatWatcher, watch
+from .writebehind import WriteBehind
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend cyclic garbage collection while building many records at once
+    
+    Records hold no reference cycles, but each collection triggered during
+    a bulk load would walk every record built so far."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class ReadOnlyError(RuntimeError):
+    """A change was refused because the store could not be loaded"""
+
+
+class SaveError(RuntimeError):
+    """A merge or sync could not be saved; nothing in memory changed"""
+
+
+def _synchronized(method):
+    """Run ``method`` holding the manager's mutex, so a background save
+    never sees records half-changed"""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.mutex:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _mutation(method):
+    """``_synchronized`` for methods that change the store; refused while
+    the manager is read-only"""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.mutex:
+            self._check_writable()
+            return method(self, *args, **kwargs)
+    return locked
 
 
 class TodoManager:
-    """Manages tasks and habits with persistence"""
+    """Manages tasks and habits with persistence
+    
+    Records are held in memory as ``Task``/``Habit`` objects keyed by id and
+    persisted through a backend from ``src/storage.py``, picked from
+    ``data_file``: SQLite for ``.db``/``.sqlite``, a JSON or binary snapshot
+    otherwise. Changes are written at once, at the end of ``batch()``, or
+    with ``write_behind=N`` by a background thread within N ms. Public
+    methods hold ``mutex``; several processes can share one store, and
+    ``refresh()`` picks up changes made by the others.
+    """
     
-    def __init__(self, data_file='todo_data.json'):
+    def __init__(self, data_file='todo_data.json', journal: bool = False,
+                 compact_every: int = 500, binary: bool = False,
+                 storage: Optional[Storage] = None, clock: Optional[Clock] = None,
+                 write_behind: Optional[int] = None, lazy: bool = False):
         self.data_file = data_file
-        self.tasks = []
-        self.habits = []
+        self.tasks: Dict[int, Task] = {}
+        self.habits: Dict[int, Habit] = {}
+        self.tombstones: Dict[str, Dict[int, Dict]] = {'task': {}, 'habit': {}}
+        self._schedule = HabitIndex()
+        self._agenda = Agenda()
+        self._next_task_id = 1
+        self._next_habit_id = 1
+        self._batch_depth = 0
+        self._pending: List[Dict] = []
+        self._unsaved: List[Dict] = []
+        # Entries whose write failed; they go out with the next one
+        self._failed: List[Dict] = []
+        self.mutex = threading.RLock()
+        self.dirty = False
+        self.read_only = False
+        # False while only the records used so far are in memory (lazy mode)
+        self._loaded = True
+        self._generation = 0
+        self._writer: Optional[WriteBehind] = None
+        self.clock = clock or SYSTEM_CLOCK
+        self.storage = storage or open_storage(data_file, journal=journal,
+                                               compact_every=compact_every,
+                                               binary=binary)
+        self.lazy = lazy and self.storage.queryable
+        # Stat baseline; refresh() sets up a real watcher on first use
+        self._watcher = StatWatcher(self.storage.watch_paths())
+        self._watching = False
+        self._seen_change = False
         self.load_data()
+        if write_behind:
+            self._writer = WriteBehind(self.flush, write_behind / 1000)
     
     def load_data(self):
-        """Load tasks and habits from JSON file"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    self.tasks = data.get('tasks', [])
-                    self.habits = data.get('habits', [])
-                    
-                    # Migrate old habits to include time_of_day
-                    for habit in self.habits:
-                        if 'time_of_day' not in habit:
-                            habit['time_of_day'] = TimeOfDay.ANYTIME.value
-                    
-                    # Save migrated data
-                    if self.habits:
-                        self.save_data()
-                        
-            except Exception as e:
-                print(f"Error loading data: {e}")
-                self.tasks = []
-                self.habits = []
-        else:
-            self.tasks = []
-            self.habits = []
-    
-    def save_data(self):
-        """Save tasks and habits to JSON file"""
+        """Load tasks and habits from storage"""
+        try:
+            with self.storage.lock.shared():
+                self._generation = self.storage.lock.generation()
+                next_ids = self._peek()
+                data = self.storage.load() if next_ids is None else None
+            # Upgrade older files once; current files skip per-record fixups
+            migrated = data is not None and migrate(data)
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            print(f"⚠️  Not saving any changes to {self.data_file} until it can be loaded")
+            self._set_state([], [])
+            self.dirty = False
+            self.read_only = True
+            return
+        self.read_only = False
+        if next_ids is not None:
+            self._unload(next_ids)
+            return
+        self._set_state(data['tasks'], data['habits'])
+        self.dirty = migrated
+        
+        # Save migrated data (only if a migration ran)
+        self.save_data()
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise ReadOnlyError(f"{self.data_file} could not be loaded; "
+                                f"not changing it until it can be")
+    
+    @_synchronized
+    def refresh(self) -> bool:
+        """Catch up with changes other processes made to the store; returns
+        True if anything was reloaded
+        
+        Costs next to nothing while the store's files are unchanged. New
+        journal entries are applied to just the records they name; any
+        other change (a compaction, a rewrite by a sync tool) means a full
+        reload. Unsaved changes are kept (nothing is reloaded while dirty).
+        A read-only manager retries the full load once the files change.
+        """
+        if self.dirty or self._batch_depth or not self.has_outside_changes():
+            return False
+        self._seen_change = False
+        return self._reload()
+    
+    def _reload(self) -> bool:
+        """Read what other processes wrote: new journal entries where that
+        is all that changed, otherwise the whole store"""
+        try:
+            with self.storage.lock.shared():
+                generation = self.storage.lock.generation()
+                entries = None if self.read_only else self.storage.read_tail()
+                next_ids = self._peek() if entries is None else None
+                data = self.storage.load() if entries is None and next_ids is None else None
+            migrated = data is not None and migrate(data)
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return False
+        self._generation = generation
+        if entries is not None:
+            self._apply_entries(entries)
+            return bool(entries)
+        
+        self.read_only = False
+        if next_ids is not None:
+            self._unload(next_ids)
+            return True
+        self._set_state(data['tasks'], data['habits'])
+        if migrated:
+            self.dirty = True
+            self.save_data()
+        return True
+    
+    @_synchronized
+    def has_outside_changes(self) -> bool:
+        """Whether ``refresh()`` has anything to pick up; as cheap as an idle
+        refresh, and the change is kept for the next ``refresh()``"""
+        if not self._seen_change:
+            self._seen_change = self._outside_changes()
+        return self._seen_change
+    
+    def _outside_changes(self) -> bool:
+        """Whether the store's files changed since we last looked
+        
+        Only long-lived processes (the shell, daemon and API) refresh, so
+        the first call is what sets up ``watch()`` (inotify where available);
+        until then a stat baseline taken at load time stands in, and
+        one-shot commands never pay for the watcher.
+        """
+        if not self._watching:
+            self._watching = True
+            baseline, self._watcher = self._watcher, watch(self.storage.watch_paths())
+            return baseline.changed()
+        return self._watcher.changed()
+    
+    def _apply_entries(self, entries: Iterable[Dict]):
+        """Apply mutation entries another process wrote to the records they
+        name, keeping the habit index and agenda current"""
+        tasks, habits = self.tasks, self.habits
+        for entry in entries:
+            op = entry['op']
+            if entry['kind'] == 'task':
+                if op == 'put':
+                    record = entry['record']
+                    self._next_task_id = max(self._next_task_id, record['id'] + 1)
+                    if 'deleted' in record:
+                        self.tombstones['task'][record['id']] = record
+                        if tasks.pop(record['id'], None) is not None:
+                            self._agenda.task_removed(record['id'])
+                        continue
+                    self.tombstones['task'].pop(record['id'], None)
+                    task = tasks[record['id']] = Task.from_dict(record)
+                    self._agenda.task_changed(task)
+                elif op == 'del':
+                    if tasks.pop(entry['id'], None) is not None:
+                        self._agenda.task_removed(entry['id'])
+                        if entry['id'] == self._next_task_id - 1:
+                            self._next_task_id = max(tasks, default=0) + 1
+                elif op == 'set' and entry['id'] in tasks:
+                    task = tasks[entry['id']]
+                    task.update(entry['fields'])
+                    self._agenda.task_changed(task)
+                continue
+            
+            if op == 'put':
+                record = entry['record']
+                self._next_habit_id = max(self._next_habit_id, record['id'] + 1)
+                if 'deleted' in record:
+                    self.tombstones['habit'][record['id']] = record
+                    if habits.pop(record['id'], None) is not None:
+                        self._schedule.remove(record['id'])
+                        self._agenda.habit_removed(record['id'])
+                    continue
+                self.tombstones['habit'].pop(record['id'], None)
+                habit = habits[record['id']] = Habit.from_dict(record)
+            else:
+                habit = habits.get(entry['id'])
+                if habit is None:
+                    continue
+                if op == 'del':
+                    del habits[habit.id]
+                    self._schedule.remove(habit.id)
+                    self._agenda.habit_removed(habit.id)
+                    if habit.id == self._next_habit_id - 1:
+                        self._next_habit_id = max(habits, default=0) + 1
+                    continue
+                if op == 'set':
+                    habit.update(entry['fields'])
+                elif op == 'check':
+                    habit.completions.add(entry['date'])
+                    if 'versions' in entry:
+                        habit.versions = entry['versions']
+            self._schedule.add(habit)
+            self._agenda.habit_changed(habit)
+    
+    def _set_state(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        """Replace the in-memory records with ones built from stored dicts
+        (tombstones included) and reset the id counters"""
+        tombstones = self.tombstones = {'task': {}, 'habit': {}}
+        
+        def live(kind, records):
+            graves = tombstones[kind]
+            for record in records:
+                if 'deleted' in record:
+                    graves[record['id']] = record
+                else:
+                    yield record
+        
+        with _gc_paused():
+            self.tasks = {task.id: task for task in map(Task.from_dict, live('task', tasks))}
+            self.habits = {habit.id: habit for habit in map(Habit.from_dict, live('habit', habits))}
+        self._schedule.rebuild(self.habits.values())
+        self._agenda.reset()
+        # Ids of removed records are not reused
+        self._next_task_id = max(max(self.tasks, default=0),
+                                 max(tombstones['task'], default=0)) + 1
+        self._next_habit_id = max(max(self.habits, default=0),
+                                  max(tombstones['habit'], default=0)) + 1
+        self._loaded = True
+    
+    def _peek(self) -> Optional[Tuple[int, int]]:
+        """The next task and habit ids of a store to load lazily, or None if
+        it has to be loaded in full; call under the store's lock"""
+        if self.lazy and self.storage.schema_version() == CURRENT_SCHEMA_VERSION:
+            return self.storage.next_ids()
+        return None
+    
+    def _unload(self, next_ids: Tuple[int, int]):
+        """Drop the records in memory; lazy mode reads them from storage
+        again as they are needed"""
+        self.tasks, self.habits = {}, {}
+        self.tombstones = {'task': {}, 'habit': {}}
+        self._schedule.rebuild(())
+        self._agenda.reset()
+        self._next_task_id, self._next_habit_id = next_ids
+        self._loaded = False
+    
+    def _load_all(self):
+        """Read every record into memory, if lazy mode hasn't yet
+        
+        Changes not written yet are applied on top of what storage holds.
+        """
+        if self._loaded:
+            return
+        with self.storage.lock.shared():
+            generation = self.storage.lock.generation()
+            data = self.storage.load()
+        tasks = {task['id']: task for task in data['tasks']}
+        habits = {habit['id']: habit for habit in data['habits']}
+        for entry in self._failed + self._unsaved + self._pending:
+            apply_entry(tasks, habits, entry)
+        self._set_state(tasks.values(), habits.values())
+        self._generation = generation
+    
+    def _task(self, task_id: int) -> Optional[Task]:
+        """The task with this id, read from storage if lazy mode hasn't yet"""
+        task = self.tasks.get(task_id)
+        if task is None and not self._loaded and task_id not in self.tombstones['task']:
+            with self.mutex:
+                record = self.storage.get('task', task_id)
+                if record is not None:
+                    task = self.tasks[task_id] = Task.from_dict(record)
+        return task
+    
+    def _habit(self, habit_id: int) -> Optional[Habit]:
+        """The habit with this id, read from storage if lazy mode hasn't yet"""
+        habit = self.habits.get(habit_id)
+        if habit is None and not self._loaded and habit_id not in self.tombstones['habit']:
+            with self.mutex:
+                record = self.storage.get('habit', habit_id)
+                if record is not None:
+                    habit = self.habits[habit_id] = Habit.from_dict(record)
+        return habit
+    
+    @_synchronized
+    def save_data(self, force: bool = False):
+        """Save tasks and habits to storage if there are unsaved changes"""
+        self.flush()
+        if not (self.dirty or force):
+            return
+        if self._write(lambda: self.storage.save(*self._stored_records())):
+            self._failed = []
+    
+    @_synchronized
+    def flush(self):
+        """Write out the mutations write-behind mode has queued"""
+        entries, self._unsaved = self._unsaved, []
+        if entries:
+            self._commit(entries)
+    
+    def close(self):
+        """Stop the write-behind thread, save everything still pending and
+        release the file watcher; later mutations are written synchronously"""
+        if self._writer is not None:
+            # Not under the mutex: the thread may be waiting for it to flush
+            self._writer.close()
+        with self.mutex:
+            self._writer = None
+            # Also retries a background save that failed
+            self.save_data()
+            self._watcher.close()
+            self._watcher = StatWatcher(self.storage.watch_paths())
+            self._watching = False
+    
+    @_mutation
+    def compact(self):
+        """Fold any incremental log (e.g. the journal) into the main store"""
+        if self._write(lambda: self.storage.compact(*self._stored_records())):
+            self._failed = []
+    
+    def _stored_records(self, tombstones: bool = True):
+        """Tasks and habits as the plain dicts storage works with, converted
+        lazily as the backend consumes them"""
+        self._load_all()
+        tasks = (task.to_dict() for task in self.tasks.values())
+        habits = (habit.to_dict() for habit in self.habits.values())
+        if tombstones:
+            tasks = chain(tasks, self.tombstones['task'].values())
+            habits = chain(habits, self.tombstones['habit'].values())
+        return tasks, habits
+    
+    def _record(self, entry: Dict):
+        """Persist one mutation through the storage backend"""
+        self.dirty = True
+        if self._batch_depth:
+            self._pending.append(entry)
+            return
+        self._persist([entry])
+    
+    def _persist(self, entries: List[Dict]):
+        """Write ``entries`` now, or queue them for the write-behind thread"""
+        if self._writer is None:
+            self._commit(entries)
+            return
+        self._unsaved.extend(entries)
+        self._writer.notify()
+    
+    def _commit(self, entries: List[Dict]):
+        """Persist mutation entries with a single write
+        
+        Entries from an earlier write that failed go out first: a later
+        write that succeeded without them would clear ``dirty`` and lose
+        them for good.
+        """
+        entries, self._failed = self._failed + entries, []
+        
+        def write():
+            # Only snapshot backends need the records, and those are never lazy
+            records = self._stored_records() if self._loaded else ((), ())
+            self.storage.record_many(entries, *records)
+        
+        if not self._write(write, entries):
+            self._failed = entries
+    
+    def _write(self, write, entries: Optional[List[Dict]] = None, strict: bool = False) -> bool:
+        """Run ``write`` under the store's exclusive lock; returns False if
+        it failed (the error is reported), or raises ``SaveError`` if
+        ``strict``
+        
+        If another process wrote since we loaded (the generation moved on),
+        reload first and re-apply ``entries`` on top instead of overwriting
+        its changes. A read-only manager never writes.
+        """
+        self._check_writable()
         try:
-            data = {
-                'tasks': self.tasks,
-                'habits': self.habits
-            }
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with self.storage.lock.exclusive():
+                if self.storage.lock.generation() != self._generation:
+                    self._merge_from_disk(entries or [])
+                write()
+                self._generation = self.storage.lock.bump((self._next_task_id,
+                                                           self._next_habit_id))
+                # Our own write is not news
+                self._watcher.changed()
+            self.dirty = False
         except Exception as e:
+            if strict:
+                raise SaveError(str(e)) from e
             print(f"Error saving data: {e}")
+            return False
+        return True
+    
+    def _merge_from_disk(self, entries: List[Dict]):
+        """Reload the store and re-apply our pending ``entries`` to it
+        
+        Records we added keep their ids: those were reserved in the lock
+        file, so no other process has used them. A lazily loaded store just
+        forgets what it read, as its backend applies entries row by row.
+        """
+        if not self._loaded:
+            self._unload(self.storage.next_ids())
+            self._generation = self.storage.lock.generation()
+            return
+        data = self.storage.load()
+        migrate(data)
+        tasks = {task['id']: task for task in data['tasks']}
+        habits = {habit['id']: habit for habit in data['habits']}
+        for entry in entries:
+            apply_entry(tasks, habits, entry)
+        
+        self._set_state(tasks.values(), habits.values())
+        self._generation = self.storage.lock.generation()
     
+    @contextmanager
+    def batch(self, rollback: bool = True):
+        """Coalesce mutations into one save
+        
+        Mutations inside the block only update memory; a single write runs
+        when the outermost block exits. If the block raises, in-memory
+        changes are rolled back and nothing is written. ``rollback=False``
+        skips the copy that rollback needs, for callers whose blocks cannot
+        fail halfway; what ran before an exception is then still saved.
+        
+        The block holds the store's exclusive lock, after catching up with
+        other processes' writes, so the write never has to merge theirs.
+        
+        Usage:
+            with manager.batch():
+                for line in lines:
+                    manager.add_task(line)
+        """
+        with self.mutex:
+            if self._batch_depth:
+                # Nested batches join the outermost one
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._batch_depth -= 1
+                return
+            
+            self.flush()
+            with self.storage.lock.exclusive():
+                if not self.dirty and self.storage.lock.generation() != self._generation:
+                    self._reload()
+                saved = rollback and (copy.deepcopy(self.tasks), copy.deepcopy(self.habits),
+                                      copy.deepcopy(self.tombstones), self._next_task_id,
+                                      self._next_habit_id, self.dirty, self._loaded)
+                self._batch_depth = 1
+                self._pending = []
+                try:
+                    yield self
+                except BaseException:
+                    if saved:
+                        (self.tasks, self.habits, self.tombstones, self._next_task_id,
+                         self._next_habit_id, self.dirty, self._loaded) = saved
+                        self._schedule.rebuild(self.habits.values())
+                        self._agenda.reset()
+                        self._pending = []
+                    raise
+                finally:
+                    self._batch_depth = 0
+                    pending, self._pending = self._pending, []
+                    if pending:
+                        self._persist(pending)
+    
+    def _allocate_ids(self, kind: str, count: int) -> range:
+        """Reserve ``count`` consecutive ids for new tasks or habits
+        
+        The next free ids are kept in the lock file, so ids are final when
+        handed out, even if the records are written later.
+        """
+        with self.storage.lock.exclusive():
+            if kind == 'task':
+                start = self.storage.lock.reserve(kind, count, self._next_task_id)
+                self._next_task_id = start + count
+            else:
+                start = self.storage.lock.reserve(kind, count, self._next_habit_id)
+                self._next_habit_id = start + count
+        return range(start, start + count)
+    
+    @_synchronized
+    def export_records(self, fmt: str = 'ndjson') -> Iterator[str]:
+        """Stream all tasks and habits (with completion histories) as lines
+        of NDJSON or CSV"""
+        from . import transfer  # off the startup path
+        
+        return transfer.iter_export(*self._stored_records(tombstones=False), fmt)
+    
+    @_mutation
+    def import_records(self, lines: Iterable[str], fmt: str = 'ndjson',
+                       chunk_size: int = 1000) -> Dict:
+        """Stream tasks and habits from NDJSON or CSV lines into the store
+        
+        Input is read lazily and ids are allocated a chunk at a time. The
+        store stays locked for the whole import and is written once at the
+        end, so no per-record journal entries are kept. Invalid rows are
+        skipped and reported. If reading the input raises, the records
+        imported so far are taken back out and the error propagates.
+        
+        Returns {'tasks': n, 'habits': n, 'skipped': n, 'errors': [...]}
+        where errors holds the first few (line, message) pairs.
+        """
+        from . import transfer
+        
+        if self._batch_depth:
+            raise RuntimeError("import_records() cannot run inside batch()")
+        
+        result = {'tasks': 0, 'habits': 0, 'skipped': 0, 'errors': []}
+        items = transfer.iter_import(lines, fmt)
+        # Imported records are new here, whenever they were created
+        now = self.clock.now().isoformat()
+        with self.storage.lock.exclusive():
+            if self.storage.lock.generation() != self._generation:
+                self._merge_from_disk([])
+            self._load_all()
+            
+            first_ids = self._next_task_id, self._next_habit_id
+            imported = []
+            try:
+                while True:
+                    chunk = list(islice(items, chunk_size))
+                    if not chunk:
+                        break
+                    tasks = [item['record'] for item in chunk if item['type'] == 'task']
+                    habits = [item['record'] for item in chunk if item['type'] == 'habit']
+                    for item in chunk:
+                        if item['type'] == 'error':
+                            result['skipped'] += 1
+                            if len(result['errors']) < 10:
+                                result['errors'].append((item['line'], item['error']))
+                    
+                    task_ids = self._allocate_ids('task', len(tasks))
+                    habit_ids = self._allocate_ids('habit', len(habits))
+                    imported.append((task_ids, habit_ids))
+                    for task_id, task in zip(task_ids, tasks):
+                        task.update(id=task_id, uid=sync.new_uid(), versions={sync.LOCAL: now})
+                        self.tasks[task_id] = Task.from_dict(task)
+                    for habit_id, habit in zip(habit_ids, habits):
+                        habit.update(id=habit_id, uid=sync.new_uid(), versions={sync.LOCAL: now})
+                        habit = self.habits[habit_id] = Habit.from_dict(habit)
+                        self._schedule.add(habit)
+                    result['tasks'] += len(tasks)
+                    result['habits'] += len(habits)
+            except BaseException:
+                # Nothing was written; the reserved ids are simply left unused
+                for task_ids, habit_ids in imported:
+                    for task_id in task_ids:
+                        self.tasks.pop(task_id, None)
+                    for habit_id in habit_ids:
+                        self.habits.pop(habit_id, None)
+                        self._schedule.remove(habit_id)
+                self._next_task_id, self._next_habit_id = first_ids
+                raise
+            finally:
+                self._agenda.reset()
+            
+            if result['tasks'] or result['habits']:
+                self.dirty = True
+                self.save_data()
+        return result
+    
+    @_mutation
+    def merge_records(self, tasks: Iterable[Dict], habits: Iterable[Dict]) -> Dict:
+        """Merge another copy of the store's records (tombstones included)
+        into this one and save the result
+        
+        Records are matched by uid and reconciled field by field (see
+        ``src/sync.py``); the merge is one pass over each side. Returns
+        how many records were {'added', 'updated', 'removed'} here. Raises
+        ``SaveError`` if the result cannot be saved.
+        """
+        if self._batch_depth:
+            raise RuntimeError("merge_records() cannot run inside batch()")
+        self.flush()
+        counts = dict.fromkeys(('added', 'updated', 'removed'), 0)
+        self._write(lambda: self._merge_in(tasks, habits, counts), strict=True)
+        return counts
+    
+    def _merge_in(self, tasks: Iterable[Dict], habits: Iterable[Dict], counts: Dict,
+                  stamp: Optional[str] = None):
+        """Merge records into the current state and save it if anything
+        changed; call under the store's exclusive lock. Records changed
+        here are stamped as such at ``stamp`` (now by default)."""
+        stamp = stamp or self.clock.now().isoformat()
+        ours_tasks, ours_habits = (list(records) for records in self._stored_records())
+        # Ids other processes reserved but have not written yet are not free
+        lock = self.storage.lock
+        merged_tasks = sync.merge('task', ours_tasks, tasks, counts, stamp,
+                                  lock.reserve('task', 0, self._next_task_id))
+        merged_habits = sync.merge('habit', ours_habits, habits, counts, stamp,
+                                   lock.reserve('habit', 0, self._next_habit_id))
+        if merged_tasks is None and merged_habits is None:
+            return
+        merged_tasks = ours_tasks if merged_tasks is None else merged_tasks
+        merged_habits = ours_habits if merged_habits is None else merged_habits
+        # Saved first, so a failed save leaves memory as it was
+        self.storage.save(merged_tasks, merged_habits)
+        self._set_state(merged_tasks, merged_habits)
+    
+    @_mutation
+    def merge_file(self, path: str) -> Dict:
+        """Merge another copy of the store (e.g. a sync tool's conflicted
+        copy, in any format this tool reads) into this one"""
+        journal = os.path.exists(path + '.journal')
+        if not (journal or os.path.exists(path)):
+            raise FileNotFoundError(f"No such file: {path}")
+        other = open_storage(path, journal=journal, cache=False)
+        try:
+            with other.lock.shared():
+                data = other.load()
+        finally:
+            other.close()
+        migrate(data)
+        return self.merge_records(data['tasks'], data['habits'])
+    
+    @_mutation
+    def sync(self, directory: str) -> Dict:
+        """Exchange changes with other copies of the store through
+        ``directory`` (e.g. one a file sync tool shares between machines)
+        
+        Writes the records changed here since the last sync (everything,
+        the first time) as a delta file, then merges the deltas other copies
+        wrote since. Returns the ``merge_records()`` counts plus how many
+        records were 'sent'; raises ``SaveError`` if the result cannot be
+        saved (the exchange is then repeated next time).
+        """
+        if self._batch_depth:
+            raise RuntimeError("sync() cannot run inside batch()")
+        self.flush()
+        os.makedirs(directory, exist_ok=True)
+        replica = sync.replica_id(self.data_file)
+        state = sync.load_state(directory, replica)
+        # Deltas hold the store's data, so they get the data file's permissions
+        mode = file_mode(self.data_file)
+        result = dict.fromkeys(('sent', 'added', 'updated', 'removed'), 0)
+        
+        def exchange():
+            # Under the exclusive lock, so later changes are stamped after this
+            started = self.clock.now().isoformat()
+            tasks, habits = self._stored_records()
+            result['sent'] = sync.write_delta(directory, replica, state,
+                                              sync.changed_since(tasks, state['exported']),
+                                              sync.changed_since(habits, state['exported']),
+                                              mode)
+            state['exported'] = started
+            theirs = sync.read_deltas(directory, replica, state['applied'])
+            # Stamped as of the export, so their own changes aren't sent back
+            self._merge_in(theirs['task'], theirs['habit'], result, started)
+            sync.save_state(directory, replica, state, mode)
+        
+        self._write(exchange, strict=True)
+        return result
+    
+    @_mutation
     def add_task(self, description: str) -> int:
         """Add a new task"""
-        task = {
-            'id': len(self.tasks) + 1,
-            'description': description,
-            'completed': False,
-            'created_at': datetime.now().isoformat()
-        }
-        self.tasks.append(task)
-        self.save_data()
-        return task['id']
+        task = Task(self._allocate_ids('task', 1)[0], description,
+                    created_at=self.clock.now().isoformat(), uid=sync.new_uid())
+        self.tasks[task.id] = task
+        self._agenda.task_changed(task)
+        self._record({'op': 'put', 'kind': 'task', 'record': task.to_dict()})
+        return task.id
     
+    @_mutation
     def add_habit(self, description: str, frequency: str, days: Optional[List[str]] = None,
                   time_of_day: str = TimeOfDay.ANYTIME.value) -> int:
         """Add a new habit with daily or weekly frequency and time of day"""
-        habit = {
-            'id': len(self.habits) + 1,
-            'description': description,
-            'frequency': frequency,
-            'days': days or [],
-            'time_of_day': time_of_day,
-            'created_at': datetime.now().isoformat(),
-            'completions': []
-        }
-        self.habits.append(habit)
-        self.save_data()
-        return habit['id']
+        habit = Habit(self._allocate_ids('habit', 1)[0], description, frequency, days or [],
+                      time_of_day, created_at=self.clock.now().isoformat(),
+                      uid=sync.new_uid())
+        self.habits[habit.id] = habit
+        self._schedule.add(habit)
+        self._agenda.habit_changed(habit)
+        self._record({'op': 'put', 'kind': 'habit', 'record': habit.to_dict()})
+        return habit.id
     
+    @_mutation
     def complete_task(self, task_id: int) -> bool:
         """Mark a task as completed"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                task['completed'] = True
-                task['completed_at'] = datetime.now().isoformat()
-                self.save_data()
-                return True
-        return False
+        task = self._task(task_id)
+        if task is None:
+            return False
+        now = self.clock.now().isoformat()
+        fields = {
+            'completed': True,
+            'completed_at': now,
+            'versions': sync.stamped(task.versions, 'task', ('completed',), now)
+        }
+        task.update(fields)
+        self._agenda.task_changed(task)
+        self._record({'op': 'set', 'kind': 'task', 'id': task_id, 'fields': fields})
+        return True
     
+    @_mutation
     def remove_task(self, task_id: int) -> bool:
-        """Remove a task"""
-        for i, task in enumerate(self.tasks):
-            if task['id'] == task_id:
-                self.tasks.pop(i)
-                self.save_data()
-                return True
-        return False
+        """Remove a task, leaving a tombstone"""
+        task = self._task(task_id)
+        if task is None:
+            return False
+        del self.tasks[task_id]
+        self._agenda.task_removed(task_id)
+        self._record({'op': 'put', 'kind': 'task',
+                      'record': self._bury('task', task)})
+        return True
     
+    def _bury(self, kind: str, record) -> Dict:
+        """Tombstone for a removed task or habit: its last state, marked
+        deleted"""
+        grave = record.to_dict()
+        grave['deleted'] = self.clock.now().isoformat()
+        self.tombstones[kind][record.id] = grave
+        return grave
+    
+    @_mutation
     def complete_habit_today(self, habit_id: int) -> bool:
         """Mark a habit as completed for today"""
-        for habit in self.habits:
-            if habit['id'] == habit_id:
-                today = datetime.now().date().isoformat()
-                if today not in habit['completions']:
-                    habit['completions'].append(today)
-                    self.save_data()
-                    return True
-        return False
+        habit = self._habit(habit_id)
+        if habit is None:
+            return False
+        now = self.clock.now()
+        today = now.date()
+        if not habit.completions.add(today):
+            return False
+        habit.versions = sync.stamped(habit.versions, 'habit', ('completions',),
+                                      now.isoformat())
+        self._agenda.habit_changed(habit)
+        self._record({'op': 'check', 'kind': 'habit', 'id': habit_id,
+                      'date': today.isoformat(), 'versions': habit.versions})
+        return True
     
+    @_mutation
     def remove_habit(self, habit_id: int) -> bool:
-        """Remove a habit"""
-        for i, habit in enumerate(self.habits):
-            if habit['id'] == habit_id:
-                self.habits.pop(i)
-                self.save_data()
-                return True
-        return False
+        """Remove a habit, leaving a tombstone"""
+        habit = self._habit(habit_id)
+        if habit is None:
+            return False
+        del self.habits[habit_id]
+        self._schedule.remove(habit_id)
+        self._agenda.habit_removed(habit_id)
+        self._record({'op': 'put', 'kind': 'habit',
+                      'record': self._bury('habit', habit)})
+        return True
     
+    @_mutation
     def update_task(self, task_id: int, new_description: str) -> bool:
         """Update a task's description"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                task['description'] = new_description
-                task['updated_at'] = datetime.now().isoformat()
-                self.save_data()
-                return True
-        return False
+        task = self._task(task_id)
+        if task is None:
+            return False
+        now = self.clock.now().isoformat()
+        fields = {
+            'description': new_description,
+            'updated_at': now,
+            'versions': sync.stamped(task.versions, 'task', ('description',), now)
+        }
+        task.update(fields)
+        self._agenda.task_changed(task)
+        self._record({'op': 'set', 'kind': 'task', 'id': task_id, 'fields': fields})
+        return True
     
+    @_mutation
     def update_habit(self, habit_id: int, new_description: str = None, 
                      new_frequency: str = None, new_days: List[str] = None,
                      new_time_of_day: str = None) -> bool:
         """Update a habit's description, frequency, days, or time of day"""
-        for habit in self.habits:
-            if habit['id'] == habit_id:
-                if new_description:
-                    habit['description'] = new_description
-                if new_frequency:
-                    habit['frequency'] = new_frequency
-                if new_days is not None:
-                    habit['days'] = new_days
-                if new_time_of_day:
-                    habit['time_of_day'] = new_time_of_day
-                habit['updated_at'] = datetime.now().isoformat()
-                self.save_data()
-                return True
-        return False
+        habit = self._habit(habit_id)
+        if habit is None:
+            return False
+        fields = {}
+        if new_description:
+            fields['description'] = new_description
+        if new_frequency:
+            fields['frequency'] = new_frequency
+        if new_days is not None:
+            fields['days'] = new_days
+        if new_time_of_day:
+            fields['time_of_day'] = new_time_of_day
+        now = self.clock.now().isoformat()
+        fields['versions'] = sync.stamped(habit.versions, 'habit', fields, now)
+        fields['updated_at'] = now
+        habit.update(fields)
+        self._schedule.add(habit)
+        self._agenda.habit_changed(habit)
+        self._record({'op': 'set', 'kind': 'habit', 'id': habit_id, 'fields': fields})
+        return True
     
-    def get_task(self, task_id: int) -> Optional[Dict]:
+    def get_task(self, task_id: int) -> Optional[Task]:
         """Get a specific task by ID"""
-        for task in self.tasks:
-            if task['id'] == task_id:
-                return task
-        return None
+        return self._task(task_id)
     
-    def get_habit(self, habit_id: int) -> Optional[Dict]:
+    def get_habit(self, habit_id: int) -> Optional[Habit]:
         """Get a specific habit by ID"""
-        for habit in self.habits:
-            if habit['id'] == habit_id:
-                return habit
-        return None
+        return self._habit(habit_id)
     
-    def get_tasks(self, show_completed=False) -> List[Dict]:
+    @_synchronized
+    def get_tasks(self, show_completed=False) -> List[Task]:
         """Get all tasks, optionally filtering out completed ones"""
+        self._load_all()
         if show_completed:
-            return self.tasks
-        return [t for t in self.tasks if not t['completed']]
+            return list(self.tasks.values())
+        return [t for t in self.tasks.values() if not t.completed]
     
-    def get_habits(self, time_filter: Optional[str] = None) -> List[Habit]:
-        """Get all habits with today's completion status, optionally filtered by time"""
-        today = datetime.now().date().isoformat()
-        today_weekday = datetime.now().strftime('%A').lower()
+    @_synchronized
+    def get_habits(self, time_filter: Optional[str] = None,
+                   now: Optional[Now] = None) -> List[Habit]:
+        """Get all habits, optionally only those relevant at this time of day"""
+        self._load_all()
+        if not time_filter:
+            return list(self.habits.values())
         
-        habit_objects = []
-        for habit_dict in self.habits:
-            habit = Habit(habit_dict)
-            
-            # Apply time filter if specified
-            if time_filter and not habit.is_relevant_now():
-                continue
-            
-            habit_objects.append(habit)
-        
-        return habit_objects
+        now = now or self.clock.snapshot()
+        relevant_times = now.relevant_times
+        return [habit for habit in self.habits.values()
+                if habit.time_of_day in relevant_times]
+    
+    @_synchronized
+    def get_due_habits(self, now: Optional[Now] = None,
+                       relevant_only: bool = False) -> List[Habit]:
+        """Get habits due today and not yet completed, optionally only those
+        relevant for the current time of day"""
+        self._load_all()
+        return self._due_habits(now or self.clock.snapshot(), relevant_only)
+    
+    def _due_habits(self, now: Now, relevant_only: bool = False) -> List[Habit]:
+        times = now.relevant_times if relevant_only else None
+        today = now.ordinal
+        habits = self.habits
+        return [habits[habit_id] for habit_id in self._schedule.due(now.weekday, times)
+                if today not in habits[habit_id].completions]
     
-    def get_relevant_habits_now(self) -> List[Habit]:
+    def get_relevant_habits_now(self, now: Optional[Now] = None) -> List[Habit]:
         """Get habits that are relevant for the current time of day and due today"""
-        today = datetime.now().date().isoformat()
-        today_weekday = datetime.now().strftime('%A').lower()
-        
-        relevant = []
-        for habit_dict in self.habits:
-            habit = Habit(habit_dict)
-            
-            # Check if due today
-            if not habit.is_due_today(today_weekday):
-                continue
-            
-            # Check if already completed
-            if habit.is_completed_today(today):
-                continue
-            
-            # Check if relevant for current time
-            if not habit.is_relevant_now():
-                continue
-            
-            relevant.append(habit)
+        return self.get_due_habits(now, relevant_only=True)
+    
+    @_synchronized
+    def get_agenda(self, now: Optional[Now] = None, relevant_only: bool = False) -> List[Dict]:
+        """Today's agenda items: open tasks, then habits due and not yet
+        completed (only those relevant now if ``relevant_only``)
         
-        return relevant
+        Items are ``{'type', 'id', 'description', ...}`` dicts. The list is
+        cached and kept current by every mutation; it is rebuilt when the
+        day changes. Treat the returned items as read-only.
+        """
+        now = now or self.clock.snapshot()
+        agenda = self._agenda
+        if agenda.day != now.ordinal and not self._loaded:
+            agenda.build(now.ordinal, now.weekday, *self._query_agenda(now))
+        elif agenda.day != now.ordinal:
+            # Not the public getters: the API calls this without the mutex
+            agenda.build(now.ordinal, now.weekday,
+                         [task for task in self.tasks.values() if not task.completed],
+                         self._due_habits(now))
+        return list(agenda.items(now.relevant_times if relevant_only else None))
+    
+    def _query_agenda(self, now: Now) -> Tuple[List[Task], List[Habit]]:
+        """Open tasks and due habits of a lazily loaded store, from storage
+        queries; records already in memory (changed, maybe not written yet)
+        stand in for their stored rows"""
+        tasks, habits, tombstones = self.tasks, self.habits, self.tombstones
+        for record in self.storage.open_tasks():
+            if record['id'] not in tasks and record['id'] not in tombstones['task']:
+                tasks[record['id']] = Task.from_dict(record)
+        for record in self.storage.due_habits(now.weekday, now.today):
+            if record['id'] not in habits and record['id'] not in tombstones['habit']:
+                habits[record['id']] = Habit.from_dict(record)
+        return (sorted((task for task in tasks.values() if not task.completed),
+                       key=lambda task: task.id),
+                sorted((habit for habit in habits.values()
+                        if habit.is_due_today(now.weekday) and now.ordinal not in habit.completions),
+                       key=lambda habit: habit.id))
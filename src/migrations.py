@@ -0,0 +1,93 @@
+"""
+Schema versions and one-time data migrations
+
+Schema history:
+    1 - v1 plain text todo file, one item per line
+    2 - v2.x JSON with tasks and habits (no schema_version field)
+    3 - habits always carry time_of_day; file records schema_version
+    4 - habit completions are day ordinals (``date.toordinal()``), not ISO
+        date strings
+    5 - records may carry sync metadata (``uid``, ``versions``) and removed
+        records leave tombstones (the record plus ``deleted``, see sync.py)
+"""
+
+from datetime import datetime
+from typing import Callable, Dict
+
+from .completions import Completions
+from .models import TimeOfDay
+
+CURRENT_SCHEMA_VERSION = 5
+
+# from_version -> function upgrading data from that version to the next
+MIGRATIONS: Dict[int, Callable[[Dict], Dict]] = {}
+
+
+def migration(from_version: int):
+    """Register a migration from ``from_version`` to ``from_version + 1``"""
+    def register(fn):
+        MIGRATIONS[from_version] = fn
+        return fn
+    return register
+
+
+def schema_version(data: Dict) -> int:
+    """Schema version of loaded data (JSON files before v3 have no field)"""
+    return data.get('schema_version', 2)
+
+
+@migration(1)
+def _text_to_json(data: Dict) -> Dict:
+    """v1 text file lines become v2 tasks"""
+    now = datetime.now().isoformat()
+    lines = [line.strip() for line in data.get('lines', [])]
+    tasks = [
+        {'id': i, 'description': line, 'completed': False, 'created_at': now}
+        for i, line in enumerate((line for line in lines if line), 1)
+    ]
+    return {'tasks': tasks, 'habits': []}
+
+
+@migration(2)
+def _add_time_of_day(data: Dict) -> Dict:
+    """Habits created before time-based habits default to anytime"""
+    for habit in data.get('habits', []):
+        habit.setdefault('time_of_day', TimeOfDay.ANYTIME.value)
+    return data
+
+
+@migration(3)
+def _completions_to_ordinals(data: Dict) -> Dict:
+    """Completion date lists become sorted day ordinals"""
+    for habit in data.get('habits', []):
+        habit['completions'] = Completions(habit.get('completions') or ())
+    return data
+
+
+@migration(4)
+def _allow_tombstones(data: Dict) -> Dict:
+    """Nothing to convert; the bump keeps older versions, which cannot
+    read tombstones, away from the file"""
+    return data
+
+
+def migrate(data: Dict) -> bool:
+    """Upgrade ``data`` in place to the current schema
+
+    Returns True if any migration ran (so the caller should save).
+    """
+    version = schema_version(data)
+    if version > CURRENT_SCHEMA_VERSION:
+        raise ValueError(f"Data file uses schema version {version}, "
+                         f"newer than supported version {CURRENT_SCHEMA_VERSION}")
+    if version == CURRENT_SCHEMA_VERSION:
+        return False
+
+    while version < CURRENT_SCHEMA_VERSION:
+        upgraded = MIGRATIONS[version](data)
+        version += 1
+        if upgraded is not data:
+            data.clear()
+            data.update(upgraded)
+        data['schema_version'] = version
+    return True
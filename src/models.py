@@ -6,6 +6,8 @@ from datetime import datetime
 from typing import List, Dict, Optional
 from enum import Enum
 
+from .completions import Completions, to_ordinal
+
 
 class TimeOfDay(Enum):
     """Time periods for habit scheduling"""
@@ -15,11 +17,11 @@ class TimeOfDay(Enum):
     ANYTIME = "anytime"      # No specific time
 
 
-def get_current_time_of_day() -> TimeOfDay:
-    """Determine current time of day based on system time"""
-    now = datetime.now()
+def get_current_time_of_day(now: Optional[datetime] = None) -> TimeOfDay:
+    """Determine current time of day based on system time (or ``now``)"""
+    if now is None:
+        now = datetime.now()
     hour = now.hour
-    minute = now.minute
     
     # Morning: midnight to 12:59pm
     if hour < 13:
@@ -32,10 +34,16 @@ def get_current_time_of_day() -> TimeOfDay:
         return TimeOfDay.EVENING
 
 
-def is_time_relevant(habit_time: str, current_time: Optional[TimeOfDay] = None) -> bool:
-    """Check if a habit is relevant for the current time of day"""
+def is_time_relevant(habit_time: str, current_time: Optional[TimeOfDay] = None,
+                     now: Optional[datetime] = None) -> bool:
+    """Check if a habit is relevant for the current time of day
+    
+    ``now`` defaults to the system time; pass it (with ``current_time``) to
+    judge several habits against the same moment."""
+    if now is None:
+        now = datetime.now()
     if current_time is None:
-        current_time = get_current_time_of_day()
+        current_time = get_current_time_of_day(now)
     
     # Anytime habits are always relevant
     if habit_time == TimeOfDay.ANYTIME.value:
@@ -47,7 +55,6 @@ def is_time_relevant(habit_time: str, current_time: Optional[TimeOfDay] = None)
     
     # Afternoon habits show from 11:30am onwards (allow morning planning)
     if habit_time == TimeOfDay.AFTERNOON.value:
-        now = datetime.now()
         # Show afternoon habits if it's after 11:30am
         if (now.hour == 11 and now.minute >= 30) or now.hour >= 12:
             return True
@@ -71,76 +78,188 @@ def format_time_of_day(time_of_day: str) -> str:
     return f"{emoji} {time_of_day.capitalize()}"
 
 
+def _extra(record: Dict, fields: frozenset) -> Optional[Dict]:
+    """Fields of a stored record that the model doesn't know about"""
+    if fields.issuperset(record):
+        return None
+    return {k: v for k, v in record.items() if k not in fields}
+
+
 class Task:
-    """Task model"""
+    """Task model
+    
+    Tasks are kept in memory as these slotted records; ``from_dict`` and
+    ``to_dict`` convert at the storage boundary. Stored fields this version
+    doesn't know are kept in ``extra`` and written back unchanged.
     
-    def __init__(self, task_dict: Dict):
-        self.data = task_dict
+    ``uid`` and ``versions`` are for merging copies of the store (see
+    ``src/sync.py``): ``uid`` is random, set when the record is created
+    (records from before then have none and derive one from id and
+    creation time), and ``versions`` maps each field changed since
+    creation to when it last changed.
+    """
     
-    @property
-    def id(self) -> int:
-        return self.data['id']
+    __slots__ = ('id', 'description', 'completed', 'created_at',
+                 'completed_at', 'updated_at', 'uid', 'versions', 'extra')
     
-    @property
-    def description(self) -> str:
-        return self.data['description']
+    FIELDS = frozenset(('id', 'description', 'completed', 'created_at',
+                        'completed_at', 'updated_at', 'uid', 'versions'))
     
-    @property
-    def completed(self) -> bool:
-        return self.data.get('completed', False)
+    def __init__(self, id: int, description: str, completed: bool = False,
+                 created_at: str = '', completed_at: Optional[str] = None,
+                 updated_at: Optional[str] = None, uid: Optional[str] = None,
+                 versions: Optional[Dict[str, str]] = None, extra: Optional[Dict] = None):
+        self.id = id
+        self.description = description
+        self.completed = completed
+        self.created_at = created_at
+        self.completed_at = completed_at
+        self.updated_at = updated_at
+        self.uid = uid
+        self.versions = versions
+        self.extra = extra
+    
+    @classmethod
+    def from_dict(cls, record: Dict) -> 'Task':
+        get = record.get
+        return cls(record['id'], record['description'], get('completed', False),
+                   get('created_at', ''), get('completed_at'), get('updated_at'),
+                   get('uid'), get('versions'), _extra(record, cls.FIELDS))
     
     def to_dict(self) -> Dict:
-        return self.data
+        record = {
+            'id': self.id,
+            'description': self.description,
+            'completed': self.completed,
+            'created_at': self.created_at
+        }
+        if self.completed_at is not None:
+            record['completed_at'] = self.completed_at
+        if self.updated_at is not None:
+            record['updated_at'] = self.updated_at
+        if self.uid is not None:
+            record['uid'] = self.uid
+        if self.versions:
+            record['versions'] = self.versions
+        if self.extra:
+            record.update(self.extra)
+        return record
+    
+    def update(self, fields: Dict):
+        """Apply a field patch (as stored in a ``set`` journal entry)"""
+        _update(self, fields)
+    
+    def __repr__(self):
+        return f"Task({self.id}, {self.description!r}, completed={self.completed})"
 
 
 class Habit:
-    """Habit model with time of day support"""
+    """Habit model with time of day support
     
-    def __init__(self, habit_dict: Dict):
-        self.data = habit_dict
-        # Set default time_of_day if not present
-        if 'time_of_day' not in self.data:
-            self.data['time_of_day'] = TimeOfDay.ANYTIME.value
+    Like ``Task``, a slotted record converted to and from dicts only at the
+    storage boundary (``uid`` and ``versions`` work the same way).
+    ``completions`` is always a ``Completions``.
+    """
     
-    @property
-    def id(self) -> int:
-        return self.data['id']
+    __slots__ = ('id', 'description', 'frequency', 'days', 'time_of_day',
+                 'created_at', 'updated_at', 'completions', 'uid', 'versions', 'extra')
     
-    @property
-    def description(self) -> str:
-        return self.data['description']
+    FIELDS = frozenset(('id', 'description', 'frequency', 'days', 'time_of_day',
+                        'created_at', 'updated_at', 'completions', 'uid', 'versions'))
     
-    @property
-    def frequency(self) -> str:
-        return self.data['frequency']
+    def __init__(self, id: int, description: str, frequency: str = 'daily',
+                 days: Optional[List[str]] = None,
+                 time_of_day: str = TimeOfDay.ANYTIME.value, created_at: str = '',
+                 updated_at: Optional[str] = None, completions=None,
+                 uid: Optional[str] = None, versions: Optional[Dict[str, str]] = None,
+                 extra: Optional[Dict] = None):
+        self.id = id
+        self.description = description
+        self.frequency = frequency
+        self.days = days if days is not None else []
+        self.time_of_day = time_of_day
+        self.created_at = created_at
+        self.updated_at = updated_at
+        if not isinstance(completions, Completions):
+            completions = Completions(completions or ())
+        self.completions = completions
+        self.uid = uid
+        self.versions = versions
+        self.extra = extra
     
-    @property
-    def days(self) -> List[str]:
-        return self.data.get('days', [])
+    @classmethod
+    def from_dict(cls, record: Dict) -> 'Habit':
+        get = record.get
+        return cls(record['id'], record['description'], get('frequency', 'daily'),
+                   get('days'), get('time_of_day', TimeOfDay.ANYTIME.value),
+                   get('created_at', ''), get('updated_at'), get('completions'),
+                   get('uid'), get('versions'), _extra(record, cls.FIELDS))
     
-    @property
-    def time_of_day(self) -> str:
-        return self.data.get('time_of_day', TimeOfDay.ANYTIME.value)
+    def to_dict(self) -> Dict:
+        record = {
+            'id': self.id,
+            'description': self.description,
+            'frequency': self.frequency,
+            'days': list(self.days),
+            'time_of_day': self.time_of_day,
+            'created_at': self.created_at,
+            'completions': self.completions
+        }
+        if self.updated_at is not None:
+            record['updated_at'] = self.updated_at
+        if self.uid is not None:
+            record['uid'] = self.uid
+        if self.versions:
+            record['versions'] = self.versions
+        if self.extra:
+            record.update(self.extra)
+        return record
     
-    @property
-    def completions(self) -> List[str]:
-        return self.data.get('completions', [])
+    def update(self, fields: Dict):
+        """Apply a field patch (as stored in a ``set`` journal entry)"""
+        _update(self, fields)
+        if not isinstance(self.completions, Completions):
+            self.completions = Completions(self.completions or ())
     
     def is_due_today(self, today_weekday: str) -> bool:
         """Check if habit is due today"""
         if self.frequency == 'daily':
             return True
         elif self.frequency == 'weekly':
-            return today_weekday in [d.lower() for d in self.days]
+            return any(day.lower() == today_weekday for day in self.days)
         return False
     
-    def is_completed_today(self, today: str) -> bool:
-        """Check if habit is completed today"""
+    def is_completed_today(self, today) -> bool:
+        """Check if habit is completed today (an ISO date or day ordinal)"""
         return today in self.completions
     
-    def is_relevant_now(self) -> bool:
-        """Check if habit is relevant for current time of day"""
+    def streak(self, today) -> int:
+        """Consecutive days completed up to today (or up to yesterday while
+        today is still open)"""
+        today = to_ordinal(today)
+        completions = self.completions
+        if today in completions:
+            return completions.streak(today)
+        return completions.streak(today - 1)
+    
+    def is_relevant_now(self, now=None) -> bool:
+        """Check if habit is relevant for current time of day
+        
+        ``now`` is a ``clock.Now`` snapshot; without one the system time is
+        read."""
+        if now is not None:
+            return now.is_relevant(self.time_of_day)
         return is_time_relevant(self.time_of_day)
     
-    def to_dict(self) -> Dict:
-        return self.data
+    def __repr__(self):
+        return f"Habit({self.id}, {self.description!r}, {self.frequency!r})"
+
+
+def _update(record, fields: Dict):
+    for name, value in fields.items():
+        if name in record.FIELDS:
+            setattr(record, name, value)
+        else:
+            if record.extra is None:
+                record.extra = {}
+            record.extra[name] = value
@@ -0,0 +1,105 @@
+"""
+Buffered rendering for the CLI views
+"""
+
+import os
+import sys
+import unicodedata
+from typing import Callable, Dict, Hashable, List, Tuple
+
+
+def display_width(text: str) -> int:
+    """Approximate terminal columns used by ``text`` (wide emoji count as 2)"""
+    if text.isascii():
+        return len(text)
+    width = 0
+    for char in text:
+        if unicodedata.combining(char) or unicodedata.category(char) in ('Mn', 'Me', 'Cf'):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+    return width
+
+
+def truncate(text: str, width: int) -> str:
+    """Cut ``text`` to at most ``width`` display columns, marking the cut"""
+    if display_width(text) <= width:
+        return text
+    out = []
+    used = 0
+    for char in text:
+        char_width = display_width(char)
+        if used + char_width > width - 1:
+            break
+        out.append(char)
+        used += char_width
+    return ''.join(out) + '…'
+
+
+class Renderer:
+    """Collects a view's lines and writes them to the terminal in one go
+
+    When the output is a terminal, lines are truncated to its width, and a
+    view taller than the terminal goes through the pager (``$PAGER``) if
+    ``pager`` is enabled. Piped output is written as-is.
+    """
+
+    def __init__(self, out=None, pager: bool = True):
+        self.out = out or sys.stdout
+        self.pager = pager
+        self._lines: List[str] = []
+
+    def line(self, text: str = ''):
+        """Add one line (it may contain embedded newlines)"""
+        self._lines.append(text)
+
+    def lines(self, texts):
+        """Add several lines"""
+        self._lines.extend(texts)
+
+    def _terminal_size(self):
+        try:
+            if not self.out.isatty():
+                return None
+            return os.get_terminal_size(self.out.fileno())
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def flush(self):
+        """Write everything collected so far and reset the buffer"""
+        text = '\n'.join(self._lines)
+        self._lines = []
+        size = self._terminal_size()
+        if size is None:
+            self.out.write(text + '\n')
+            self.out.flush()
+            return
+
+        rows = [truncate(row, size.columns) for row in text.split('\n')]
+        if self.pager and len(rows) >= size.lines:
+            import pydoc
+            pydoc.pager('\n'.join(rows))
+            return
+        self.out.write('\n'.join(rows) + '\n')
+        self.out.flush()
+
+
+class RowCache:
+    """Formatted output per item, reused until the item's fields change
+
+    ``get(key, signature, build)`` returns what was cached for ``key`` if it
+    was built from the same ``signature``, otherwise calls ``build``.
+    """
+
+    def __init__(self):
+        self._rows: Dict[Hashable, Tuple[Hashable, str]] = {}
+
+    def get(self, key: Hashable, signature: Hashable, build: Callable[[], str]) -> str:
+        cached = self._rows.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        rows = build()
+        self._rows[key] = (signature, rows)
+        return rows
+
+    def clear(self):
+        self._rows.clear()
@@ -0,0 +1,87 @@
+"""
+Index of habits by the weekdays they are due and their time of day
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from .models import Habit
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# One bit per weekday, Monday = bit 0
+WEEKDAY_BITS = {day: 1 << i for i, day in enumerate(WEEKDAYS)}
+EVERY_DAY = (1 << len(WEEKDAYS)) - 1
+
+
+def weekday_mask(frequency: str, days: Iterable[str]) -> int:
+    """7-bit mask of the weekdays a habit is due on (0 if never)"""
+    if frequency == 'daily':
+        return EVERY_DAY
+    if frequency == 'weekly':
+        mask = 0
+        for day in days:
+            mask |= WEEKDAY_BITS.get(day.lower(), 0)
+        return mask
+    return 0
+
+
+class HabitIndex:
+    """Habit ids bucketed by (weekday, time of day)
+
+    A habit sits in one bucket per weekday it is due, under its time of day,
+    so the habits due on a given day and period are a lookup instead of a
+    scan over every habit. The manager keeps it up to date as habits are
+    added, changed and removed.
+    """
+
+    def __init__(self, habits: Iterable[Habit] = ()):
+        # weekday -> time of day -> ids (dicts used as ordered sets)
+        self._buckets: Dict[str, Dict[str, Dict[int, None]]] = {day: {} for day in WEEKDAYS}
+        # id -> (mask, time of day) the habit is currently filed under
+        self._keys: Dict[int, tuple] = {}
+        self.rebuild(habits)
+
+    def rebuild(self, habits: Iterable[Habit]):
+        """Re-index from scratch"""
+        for buckets in self._buckets.values():
+            buckets.clear()
+        self._keys.clear()
+        for habit in habits:
+            self.add(habit)
+
+    def add(self, habit: Habit):
+        """Index a habit, or re-index it after its schedule changed"""
+        habit_id = habit.id
+        key = (weekday_mask(habit.frequency, habit.days), habit.time_of_day)
+        if self._keys.get(habit_id) == key:
+            return
+        self.remove(habit_id)
+        self._keys[habit_id] = key
+        mask, time_of_day = key
+        for day, bit in WEEKDAY_BITS.items():
+            if mask & bit:
+                self._buckets[day].setdefault(time_of_day, {})[habit_id] = None
+
+    def remove(self, habit_id: int):
+        key = self._keys.pop(habit_id, None)
+        if key is None:
+            return
+        mask, time_of_day = key
+        for day, bit in WEEKDAY_BITS.items():
+            if mask & bit:
+                self._buckets[day][time_of_day].pop(habit_id, None)
+
+    def due(self, weekday: str, times: Optional[Iterable[str]] = None) -> List[int]:
+        """Ids of habits due on ``weekday`` in any of ``times`` (all periods
+        if None), in id order"""
+        buckets = self._buckets.get(weekday, {})
+        if times is None:
+            times = list(buckets)
+        ids = []
+        for time_of_day in times:
+            ids.extend(buckets.get(time_of_day, ()))
+        ids.sort()
+        return ids
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,140 @@
+"""
+Compact binary snapshot format
+
+A binary snapshot is ``MAGIC``, a one-byte format version, and then:
+
+- a little-endian ``uint32`` length and that many bytes of compact UTF-8
+  JSON (no indentation or spaces) holding the data dict without the
+  habits' completions;
+- for each habit, in order, a ``uint32`` length and its completions as
+  packed little-endian ``uint32`` day ordinals (``Completions.to_bytes``).
+
+Completions are most of a large store, and reading them back is a single
+``array.frombytes`` per habit instead of parsing a list of dates, so
+loading avoids most of the work of parsing pretty-printed JSON. Everything
+else stays JSON, which any Python version (or any other tool) can read.
+
+Formats 1 and 2 were a ``marshal`` payload. They are still read, and a
+data file is rewritten as format 3 on its next save. marshal is faster to
+load but may change between Python versions, so ``encode(portable=False)``
+writes format 2 only for files that can be rebuilt, like the parsed-state
+cache. marshal is not meant for untrusted input; snapshots are local data
+files written by this tool.
+"""
+
+import json
+import marshal
+import struct
+import sys
+from typing import Dict
+
+from .completions import Completions
+
+MAGIC = b'TODOSNAP'
+FORMAT_VERSION = 3
+HEADER = MAGIC + bytes([FORMAT_VERSION])
+
+_LENGTH = struct.Struct('<I')
+
+# marshal format 4 references repeated interned objects instead of
+# writing them again
+_MARSHAL_VERSION = 4
+
+
+def is_snapshot(header: bytes) -> bool:
+    """Check whether a file starting with ``header`` is a binary snapshot"""
+    return header.startswith(MAGIC)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _encode_marshal(data: Dict) -> bytes:
+    tasks = [{_intern(k): v for k, v in task.items()} for task in data['tasks']]
+    habits = []
+    for habit in data['habits']:
+        record = {_intern(k): _intern(v) for k, v in habit.items()
+                  if k not in ('completions', 'days')}
+        record['days'] = [sys.intern(d) for d in habit.get('days', [])]
+        completions = habit.get('completions') or ()
+        if not isinstance(completions, Completions):
+            completions = Completions(completions)
+        record['completions'] = completions.to_bytes()
+        habits.append(record)
+    payload = {
+        'schema_version': data.get('schema_version'),
+        'tasks': tasks,
+        'habits': habits
+    }
+    return MAGIC + bytes([2]) + marshal.dumps(payload, _MARSHAL_VERSION)
+
+
+def encode(data: Dict, portable: bool = True) -> bytes:
+    """Serialize a data dict (schema_version, tasks, habits) to bytes
+
+    ``portable=False`` writes the marshal-based format 2 instead, for files
+    that can be rebuilt if a later Python can't read them.
+    """
+    if not portable:
+        return _encode_marshal(data)
+    habits = []
+    packed = []
+    for habit in data['habits']:
+        habits.append({k: v for k, v in habit.items() if k != 'completions'})
+        completions = habit.get('completions') or ()
+        if not isinstance(completions, Completions):
+            completions = Completions(completions)
+        packed.append(completions.to_bytes())
+    payload = json.dumps({
+        'schema_version': data.get('schema_version'),
+        'tasks': data['tasks'],
+        'habits': habits
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    parts = [HEADER, _LENGTH.pack(len(payload)), payload]
+    for blob in packed:
+        parts.append(_LENGTH.pack(len(blob)))
+        parts.append(blob)
+    return b''.join(parts)
+
+
+def _chunk(view: memoryview, offset: int):
+    """The length-prefixed chunk at ``offset`` and the offset after it"""
+    if offset + _LENGTH.size > len(view):
+        raise ValueError("Truncated binary snapshot")
+    (length,) = _LENGTH.unpack_from(view, offset)
+    start = offset + _LENGTH.size
+    if start + length > len(view):
+        raise ValueError("Truncated binary snapshot")
+    return view[start:start + length], start + length
+
+
+def _decode_marshal(version: int, view: memoryview) -> Dict:
+    data = marshal.loads(view)
+    for habit in data['habits']:
+        completions = habit['completions']
+        if version == 1:
+            habit['completions'] = completions.split(',') if completions else []
+        else:
+            habit['completions'] = Completions.from_bytes(completions)
+    return data
+
+
+def decode(blob: bytes) -> Dict:
+    """Deserialize bytes written by ``encode``"""
+    if not is_snapshot(blob):
+        raise ValueError("Not a binary snapshot")
+    version = blob[len(MAGIC)]
+    view = memoryview(blob)[len(HEADER):]
+    if version in (1, 2):
+        return _decode_marshal(version, view)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version {version}")
+    payload, offset = _chunk(view, 0)
+    data = json.loads(str(payload, 'utf-8'))
+    for habit in data['habits']:
+        packed, offset = _chunk(view, offset)
+        habit['completions'] = Completions.from_bytes(packed)
+    if offset != len(view):
+        raise ValueError("Trailing bytes after binary snapshot")
+    return data
@@ -0,0 +1,503 @@
+"""
+Storage backends for TodoManager
+"""
+
+import json
+import os
+from typing import Iterable, List, Dict, Optional, Tuple
+
+from . import snapshot
+from .cache import StateCache
+from .completions import Completions, json_default
+from .config import SQLITE_SUFFIXES
+from .files import atomic_write
+from .journal import Journal
+from .locking import FileLock, NullLock
+from .migrations import CURRENT_SCHEMA_VERSION
+
+# The only file the v1 tool wrote: a plain text list, one item per line
+V1_FILE = 'todo_file'
+
+
+def apply_entry(tasks: Dict[int, Dict], habits: Dict[int, Dict], entry: Dict):
+    """Apply a single mutation entry to id-keyed task and habit dicts"""
+    records = tasks if entry['kind'] == 'task' else habits
+    op = entry['op']
+    if op == 'put':
+        records[entry['record']['id']] = entry['record']
+        return
+
+    record = records.get(entry['id'])
+    if record is None:
+        return
+    if op == 'set':
+        record.update(entry['fields'])
+    elif op == 'del':
+        del records[entry['id']]
+    elif op == 'check':
+        completions = record.get('completions')
+        if not isinstance(completions, Completions):
+            completions = record['completions'] = Completions(completions or ())
+        completions.add(entry['date'])
+        if 'versions' in entry:
+            record['versions'] = entry['versions']
+
+
+class Storage:
+    """Base class for storage backends
+
+    A backend loads and saves the full state, and persists single mutations
+    through ``record``. Mutation entries are dicts with an ``op`` of
+    ``put`` (upsert a full record), ``set`` (patch fields), ``del`` or
+    ``check`` (add a habit completion date), and a ``kind`` of ``task`` or
+    ``habit``. Removals are puts of a tombstone (the record marked
+    ``deleted``, see ``src/sync.py``), which backends store alongside the
+    live records.
+
+    ``lock`` coordinates processes sharing the store: a shared lock around
+    loads, an exclusive lock around writes, plus a generation counter that
+    each write bumps.
+
+    A ``queryable`` backend can also answer the queries a lazily loading
+    manager needs (``next_ids``, ``get``, ``open_tasks``, ``due_habits``)
+    without a full ``load()``.
+    """
+
+    lock = NullLock()
+    queryable = False
+
+    def load(self) -> Dict:
+        """Return the stored data as ``{'schema_version', 'tasks', 'habits'}``
+
+        The data is returned as stored; the caller runs any schema migrations.
+        """
+        raise NotImplementedError
+
+    def save(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        """Replace the stored state with the given tasks and habits"""
+        raise NotImplementedError
+
+    def record(self, entry: Dict, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        """Persist one mutation; ``tasks`` and ``habits`` already include it"""
+        self.record_many([entry], tasks, habits)
+
+    def record_many(self, entries: List[Dict], tasks: Iterable[Dict], habits: Iterable[Dict]):
+        """Persist several mutations as one write"""
+        self.save(tasks, habits)
+
+    def compact(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        """Fold any incremental log into the main store"""
+
+    def watch_paths(self) -> List[str]:
+        """Files whose changes mean the stored data changed"""
+        return []
+
+    def read_tail(self) -> Optional[List[Dict]]:
+        """Mutation entries other processes appended since this backend last
+        loaded or wrote, or None if only a full ``load()`` can catch up;
+        call while holding a lock"""
+        return None
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class MemoryStorage(Storage):
+    """Keeps nothing on disk; useful for benchmarks and throwaway managers"""
+
+    def __init__(self, tasks: Iterable[Dict] = (), habits: Iterable[Dict] = ()):
+        self.tasks = list(tasks)
+        self.habits = list(habits)
+
+    def load(self) -> Dict:
+        return {'schema_version': CURRENT_SCHEMA_VERSION,
+                'tasks': self.tasks, 'habits': self.habits}
+
+    def save(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        pass
+
+    def record_many(self, entries: List[Dict], tasks: Iterable[Dict], habits: Iterable[Dict]):
+        pass
+
+
+class JsonStorage(Storage):
+    """Single snapshot file, optionally with an append-only journal
+
+    Without a journal every mutation rewrites the whole file. With
+    ``journal=True`` each mutation appends one compact record to
+    ``<data_file>.journal`` and the snapshot is only rewritten once the
+    journal reaches ``compact_every`` entries.
+
+    The snapshot is pretty-printed JSON, or the binary format from
+    ``src/snapshot.py`` when ``binary=True``. An existing file keeps the
+    format found in its header. Only a file named ``todo_file`` may hold
+    the v1 text format; anything else that is not a JSON object fails to
+    load rather than being migrated.
+
+    Parsed JSON snapshots are cached in a binary sidecar file
+    (``.<data_file>.cache``) that is reused while the snapshot is unchanged;
+    pass ``cache=False`` to disable it.
+    """
+
+    def __init__(self, data_file: str, journal: bool = False, compact_every: int = 500,
+                 binary: bool = False, cache: bool = True):
+        self.data_file = data_file
+        self.journal = Journal(data_file + '.journal', like=data_file) if journal else None
+        self.compact_every = compact_every
+        self.binary = binary
+        self.cache = StateCache(data_file) if cache else None
+        self.lock = FileLock(data_file + '.lock')
+        self._snapshot_key = None
+
+    def _snapshot_stat(self):
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def watch_paths(self) -> List[str]:
+        # Not the lock file: reserving ids writes to it without changing data
+        paths = [self.data_file]
+        if self.journal is not None:
+            paths.append(self.journal.path)
+        return paths
+
+    def read_tail(self) -> Optional[List[Dict]]:
+        # Only journal appends can be applied on top of what we have
+        if self.journal is None or self._snapshot_stat() != self._snapshot_key:
+            return None
+        return self.journal.tail()
+
+    def load(self) -> Dict:
+        self._snapshot_key = self._snapshot_stat()
+        if os.path.exists(self.data_file):
+            data = self._read_snapshot()
+            if 'lines' in data:
+                return data
+        else:
+            # Nothing compacted yet; the journal may still hold entries
+            data = {'schema_version': CURRENT_SCHEMA_VERSION}
+        data.setdefault('tasks', [])
+        data.setdefault('habits', [])
+
+        if self.journal is not None:
+            task_map = {task['id']: task for task in data['tasks']}
+            habit_map = {habit['id']: habit for habit in data['habits']}
+            for entry in self.journal.replay():
+                apply_entry(task_map, habit_map, entry)
+            data['tasks'] = list(task_map.values())
+            data['habits'] = list(habit_map.values())
+
+        return data
+
+    def _read_snapshot(self) -> Dict:
+        key = self.cache.key() if self.cache is not None else None
+        if key is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                self.binary = False
+                return data
+
+        with open(self.data_file, 'rb') as f:
+            blob = f.read()
+        self.binary = snapshot.is_snapshot(blob)
+        if self.binary:
+            # Already a fast format; caching it would only duplicate the file
+            return snapshot.decode(blob)
+
+        text = blob.decode('utf-8-sig')
+        if os.path.basename(self.data_file) == V1_FILE and not text.lstrip().startswith('{'):
+            return {'schema_version': 1, 'lines': text.splitlines()}
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.data_file} does not hold todo data")
+        if key is not None:
+            self.cache.put(key, data)
+        return data
+
+    def save(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        data = {
+            'schema_version': CURRENT_SCHEMA_VERSION,
+            'tasks': list(tasks),
+            'habits': list(habits)
+        }
+        if self.binary:
+            atomic_write(self.data_file, snapshot.encode(data))
+        else:
+            atomic_write(self.data_file, json.dumps(data, indent=2, default=json_default))
+            if self.cache is not None:
+                # The next load, here or in another process, needn't parse it
+                self.cache.put(self.cache.key(), data)
+        self._snapshot_key = self._snapshot_stat()
+        if self.journal is not None:
+            self.journal.clear()
+
+    def record_many(self, entries: List[Dict], tasks: Iterable[Dict], habits: Iterable[Dict]):
+        if self.journal is None:
+            self.save(tasks, habits)
+            return
+        self.journal.extend(entries)
+        if len(self.journal) >= self.compact_every:
+            self.save(tasks, habits)
+
+    def compact(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        self.save(tasks, habits)
+
+
+class SQLiteStorage(Storage):
+    """SQLite database with one row per record
+
+    Completed state, habit frequency, weekdays, time of day and completion
+    dates live in indexed columns; the rest of each record is kept as a JSON
+    blob. A lazily loading manager reads today's open tasks and due habits
+    and single records by id through those indexes instead of loading every
+    row at startup. Mutations touch only the affected rows.
+    """
+
+    queryable = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            completed INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed);
+
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY,
+            frequency TEXT NOT NULL,
+            time_of_day TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_habits_frequency ON habits (frequency);
+        CREATE INDEX IF NOT EXISTS idx_habits_time_of_day ON habits (time_of_day);
+
+        CREATE TABLE IF NOT EXISTS habit_days (
+            habit_id INTEGER NOT NULL,
+            weekday TEXT NOT NULL,
+            PRIMARY KEY (habit_id, weekday)
+        );
+        CREATE INDEX IF NOT EXISTS idx_habit_days_weekday ON habit_days (weekday);
+
+        CREATE TABLE IF NOT EXISTS completions (
+            habit_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            PRIMARY KEY (habit_id, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_completions_date ON completions (date);
+
+        CREATE TABLE IF NOT EXISTS tombstones (
+            kind TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (kind, id)
+        );
+    """
+
+    def __init__(self, db_file: str):
+        import sqlite3  # only needed for this backend
+
+        self.db_file = db_file
+        self.lock = FileLock(db_file + '.lock')
+        # The manager may write from a background or worker thread; it never
+        # uses the connection from two threads at once
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+            self.conn.execute(f"PRAGMA user_version = {CURRENT_SCHEMA_VERSION}")
+
+    # Row <-> record conversion
+    def _put_task(self, task: Dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, completed, data) VALUES (?, ?, ?)",
+            (task['id'], int(task.get('completed', False)), json.dumps(task))
+        )
+
+    def _put_habit(self, habit: Dict):
+        data = {k: v for k, v in habit.items() if k != 'completions'}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO habits (id, frequency, time_of_day, data) VALUES (?, ?, ?, ?)",
+            (habit['id'], habit['frequency'], habit.get('time_of_day', 'anytime'), json.dumps(data))
+        )
+        self.conn.execute("DELETE FROM habit_days WHERE habit_id = ?", (habit['id'],))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO habit_days (habit_id, weekday) VALUES (?, ?)",
+            [(habit['id'], d.lower()) for d in habit.get('days', [])]
+        )
+        self.conn.execute("DELETE FROM completions WHERE habit_id = ?", (habit['id'],))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO completions (habit_id, date) VALUES (?, ?)",
+            [(habit['id'], d) for d in Completions(habit.get('completions') or ())]
+        )
+
+    def _put(self, kind: str, record: Dict):
+        if 'deleted' in record:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tombstones (kind, id, data) VALUES (?, ?, ?)",
+                (kind, record['id'], json.dumps(record, default=json_default))
+            )
+        elif kind == 'task':
+            self._put_task(record)
+        else:
+            self._put_habit(record)
+
+    def _delete(self, kind: str, record_id: int):
+        """Remove the record with this id, live or tombstone"""
+        self.conn.execute("DELETE FROM tombstones WHERE kind = ? AND id = ?", (kind, record_id))
+        if kind == 'task':
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (record_id,))
+        else:
+            self.conn.execute("DELETE FROM habits WHERE id = ?", (record_id,))
+            self.conn.execute("DELETE FROM habit_days WHERE habit_id = ?", (record_id,))
+            self.conn.execute("DELETE FROM completions WHERE habit_id = ?", (record_id,))
+
+    def _habits_from_rows(self, rows) -> List[Dict]:
+        habits = [json.loads(data) for (data,) in rows]
+        if not habits:
+            return habits
+        ids = [h['id'] for h in habits]
+        completions = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT habit_id, date FROM completions WHERE habit_id IN ({placeholders}) "
+                "ORDER BY habit_id, date", chunk
+            )
+            for habit_id, date in rows:
+                completions.setdefault(habit_id, []).append(date)
+        for habit in habits:
+            habit['completions'] = completions.get(habit['id'], [])
+        return habits
+
+    def load(self) -> Dict:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        tasks = [json.loads(data) for (data,) in
+                 self.conn.execute("SELECT data FROM tasks ORDER BY id")]
+        habits = self._habits_from_rows(
+            self.conn.execute("SELECT data FROM habits ORDER BY id").fetchall()
+        )
+        for kind, data in self.conn.execute("SELECT kind, data FROM tombstones ORDER BY id"):
+            (tasks if kind == 'task' else habits).append(json.loads(data))
+        return {'schema_version': version, 'tasks': tasks, 'habits': habits}
+
+    # Queries for managers that read records as they need them
+    def schema_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def next_ids(self) -> Tuple[int, int]:
+        """The next unused task and habit ids (removed records' included)"""
+        row = self.conn.execute(
+            "SELECT (SELECT max(id) FROM tasks), (SELECT max(id) FROM habits), "
+            "(SELECT max(id) FROM tombstones WHERE kind = 'task'), "
+            "(SELECT max(id) FROM tombstones WHERE kind = 'habit')"
+        ).fetchone()
+        return max(row[0] or 0, row[2] or 0) + 1, max(row[1] or 0, row[3] or 0) + 1
+
+    def get(self, kind: str, record_id: int) -> Optional[Dict]:
+        """The live record with this id, or None"""
+        if kind == 'task':
+            row = self.conn.execute("SELECT data FROM tasks WHERE id = ?",
+                                    (record_id,)).fetchone()
+            return None if row is None else json.loads(row[0])
+        habits = self._habits_from_rows(
+            self.conn.execute("SELECT data FROM habits WHERE id = ?", (record_id,)).fetchall()
+        )
+        return habits[0] if habits else None
+
+    def open_tasks(self) -> List[Dict]:
+        """Tasks not completed yet, in id order"""
+        return [json.loads(data) for (data,) in
+                self.conn.execute("SELECT data FROM tasks WHERE completed = 0 ORDER BY id")]
+
+    def due_habits(self, weekday: str, day: str) -> List[Dict]:
+        """Habits due on ``weekday`` and not completed on ``day`` (an ISO
+        date), in id order"""
+        return self._habits_from_rows(self.conn.execute(
+            "SELECT data FROM habits WHERE (frequency = 'daily' OR (frequency = 'weekly' "
+            "AND id IN (SELECT habit_id FROM habit_days WHERE weekday = ?))) "
+            "AND id NOT IN (SELECT habit_id FROM completions WHERE date = ?) ORDER BY id",
+            (weekday, day)
+        ).fetchall())
+
+    def save(self, tasks: Iterable[Dict], habits: Iterable[Dict]):
+        with self.conn:
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.execute("DELETE FROM habits")
+            self.conn.execute("DELETE FROM habit_days")
+            self.conn.execute("DELETE FROM completions")
+            self.conn.execute("DELETE FROM tombstones")
+            for task in tasks:
+                self._put('task', task)
+            for habit in habits:
+                self._put('habit', habit)
+            self.conn.execute(f"PRAGMA user_version = {CURRENT_SCHEMA_VERSION}")
+
+    def watch_paths(self) -> List[str]:
+        return [self.db_file, self.db_file + '-journal', self.db_file + '-wal']
+
+    def record_many(self, entries: List[Dict], tasks: Iterable[Dict], habits: Iterable[Dict]):
+        with self.conn:
+            for entry in entries:
+                self._apply(entry)
+
+    def _apply(self, entry: Dict):
+        kind = entry['kind']
+        op = entry['op']
+        if op == 'put':
+            record = entry['record']
+            if 'deleted' in record:
+                self._delete(kind, record['id'])
+            else:
+                self.conn.execute("DELETE FROM tombstones WHERE kind = ? AND id = ?",
+                                  (kind, record['id']))
+            self._put(kind, record)
+        elif op == 'del':
+            self._delete(kind, entry['id'])
+        elif op == 'check':
+            self.conn.execute(
+                "INSERT OR IGNORE INTO completions (habit_id, date) VALUES (?, ?)",
+                (entry['id'], entry['date'])
+            )
+            if 'versions' in entry:
+                row = self.conn.execute(
+                    "SELECT data FROM habits WHERE id = ?", (entry['id'],)
+                ).fetchone()
+                if row is not None:
+                    record = json.loads(row[0])
+                    record['versions'] = entry['versions']
+                    self.conn.execute("UPDATE habits SET data = ? WHERE id = ?",
+                                      (json.dumps(record), entry['id']))
+        elif op == 'set':
+            table = 'tasks' if kind == 'task' else 'habits'
+            row = self.conn.execute(
+                f"SELECT data FROM {table} WHERE id = ?", (entry['id'],)
+            ).fetchone()
+            if row is None:
+                return
+            record = json.loads(row[0])
+            record.update(entry['fields'])
+            if kind == 'task':
+                self._put_task(record)
+            else:
+                record['completions'] = self._completions_for(entry['id'])
+                self._put_habit(record)
+
+    def _completions_for(self, habit_id: int) -> List[str]:
+        return [date for (date,) in self.conn.execute(
+            "SELECT date FROM completions WHERE habit_id = ? ORDER BY date", (habit_id,)
+        )]
+
+    def close(self):
+        self.conn.close()
+
+
+def open_storage(data_file: str, journal: bool = False, compact_every: int = 500,
+                 binary: bool = False, cache: bool = True) -> Storage:
+    """Pick a backend from the data file name (``.db``/``.sqlite`` use SQLite)"""
+    if data_file.endswith(SQLITE_SUFFIXES):
+        return SQLiteStorage(data_file)
+    return JsonStorage(data_file, journal=journal, compact_every=compact_every,
+                       binary=binary, cache=cache)
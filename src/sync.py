@@ -0,0 +1,332 @@
+"""
+Merging copies of the store kept on different machines
+
+Records are matched by ``uid`` rather than by their local id, so two
+copies may number the same task differently. Each record gets a random
+uid when it is created (or imported); older records fall back to one
+derived from their id and creation time. For a record on both sides:
+
+- Each field group (``FIELD_GROUPS``) is last-writer-wins by its version
+  stamp: when it last changed, from the record's ``versions``, or its
+  ``created_at`` if it never changed. If stamps are equal but values
+  differ, the larger value wins so that both sides pick the same one.
+- Habit completions are the union of both sides.
+- Removing a record leaves a tombstone: its last state plus a ``deleted``
+  stamp. Tombstones merge like live records, and the result stays removed
+  unless a field changed after the latest removal, in which case the
+  record comes back.
+
+Each side is read once and indexed by uid, so a merge is linear in the
+number of records and completions.
+
+Delta sync exchanges only recent changes through a shared directory. Each
+copy of the store writes numbered delta files into its own subdirectory
+(named by ``replica_id()``) and applies the files other copies wrote since
+it last looked; ``state.json`` there remembers how far it got. A delta
+holds the records this copy changed since its last export: by its own
+edits, or by an import or merge, which stamp ``versions[LOCAL]`` since
+such records keep their original, possibly old, timestamps.
+"""
+
+import json
+import os
+import re
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .completions import Completions, json_default
+from .files import atomic_write
+
+# Fields merged as one value; the first names the group in ``versions``
+FIELD_GROUPS = {
+    'task': (('description',), ('completed', 'completed_at')),
+    'habit': (('description',), ('frequency', 'days'), ('time_of_day',)),
+}
+
+_GROUP_OF = {kind: {field: group[0] for group in groups for field in group}
+             for kind, groups in FIELD_GROUPS.items()}
+
+# Key in ``versions`` for when this copy last took in a change it did not
+# make itself (an import or merge); not a field group, and never merged
+LOCAL = 'local'
+
+# What dated a group's last change before ``versions`` existed
+_LEGACY_STAMPS = {
+    'task': {'description': 'updated_at', 'completed': 'completed_at'},
+    'habit': {'description': 'updated_at', 'frequency': 'updated_at',
+              'time_of_day': 'updated_at'},
+}
+
+
+def new_uid() -> str:
+    """A random uid for a new record"""
+    return os.urandom(16).hex()
+
+
+def derive_uid(record_id: int, created_at: str) -> str:
+    """The uid of a record created before records were given one"""
+    return f"{record_id}@{created_at}"
+
+
+def uid_of(record: Dict) -> str:
+    return record.get('uid') or derive_uid(record['id'], record.get('created_at', ''))
+
+
+def stamped(versions: Optional[Dict[str, str]], kind: str, fields: Iterable[str],
+            when: str) -> Dict[str, str]:
+    """A copy of ``versions`` recording that ``fields`` changed at ``when``"""
+    versions = dict(versions or ())
+    groups = _GROUP_OF[kind]
+    for field in fields:
+        versions[groups.get(field, field)] = when
+    return versions
+
+
+def _changed_at(record: Dict) -> str:
+    """When the record's fields last changed"""
+    get = record.get
+    latest = max(get('created_at') or '', get('updated_at') or '', get('completed_at') or '')
+    versions = get('versions')
+    if versions:
+        latest = max(latest, max((at for key, at in versions.items() if key != LOCAL),
+                                 default=''))
+    return latest
+
+
+def modified(record: Dict) -> str:
+    """When the record (or its tombstone) last changed"""
+    return max(_changed_at(record), record.get('deleted') or '')
+
+
+def _stamp(record: Dict, kind: str, group: str) -> str:
+    """When a field group last changed; records written before ``versions``
+    existed fall back to their timestamps"""
+    versions = record.get('versions')
+    if versions and group in versions:
+        return versions[group]
+    legacy = _LEGACY_STAMPS[kind].get(group)
+    return (legacy and record.get(legacy)) or record.get('created_at') or ''
+
+
+def _rehome(record: Dict, record_id: int) -> Dict:
+    """``record`` under another local id, keeping its identity"""
+    if record['id'] == record_id:
+        return record
+    return dict(record, uid=uid_of(record), id=record_id)
+
+
+def _taken_in(record: Dict, stamp: str) -> Dict:
+    """``record`` (a copy we own) stamped as changed here at ``stamp``"""
+    record['versions'] = dict(record.get('versions') or (), **{LOCAL: stamp})
+    return record
+
+
+def _order(values) -> str:
+    return json.dumps(values, sort_keys=True, default=json_default)
+
+
+def _completions(value) -> Completions:
+    return value if isinstance(value, Completions) else Completions(value or ())
+
+
+def merge_record(kind: str, mine: Dict, theirs: Dict) -> Tuple[Dict, Optional[str]]:
+    """Merge two versions of one record (same uid), keeping ``mine``'s id
+
+    Returns the merged record (``mine`` itself if theirs adds nothing) and
+    what happened to ours: None, 'updated', 'removed' or 'added' (a
+    removed record came back).
+    """
+    merged = dict(mine)
+    versions = dict(mine.get('versions') or ())
+    changed = False
+    for group in FIELD_GROUPS[kind]:
+        key = group[0]
+        ours_at = _stamp(mine, kind, key)
+        theirs_at = _stamp(theirs, kind, key)
+        if theirs_at < ours_at:
+            continue
+        mine_values = [mine.get(field) for field in group]
+        theirs_values = [theirs.get(field) for field in group]
+        if theirs_values == mine_values:
+            continue
+        if theirs_at == ours_at and _order(theirs_values) < _order(mine_values):
+            continue
+        for field in group:
+            if field in theirs:
+                merged[field] = theirs[field]
+            else:
+                merged.pop(field, None)
+        versions[key] = theirs_at
+        changed = True
+    # Later stamps for values both sides agree on (e.g. the last check-off)
+    for key, at in (theirs.get('versions') or {}).items():
+        if key != LOCAL and at > versions.get(key, ''):
+            versions[key] = at
+    if versions:
+        merged['versions'] = versions
+
+    if kind == 'habit':
+        ours_done = _completions(mine.get('completions'))
+        done = ours_done.union(_completions(theirs.get('completions')))
+        if len(done) != len(ours_done):
+            merged['completions'] = done
+            changed = True
+
+    if (theirs.get('updated_at') or '') > (mine.get('updated_at') or ''):
+        merged['updated_at'] = theirs['updated_at']
+    for field, value in theirs.items():
+        if field not in merged and field not in ('uid', 'deleted', 'versions'):
+            merged[field] = value
+
+    # Removed unless something changed after the latest removal
+    deleted = max(mine.get('deleted') or '', theirs.get('deleted') or '')
+    if deleted and deleted >= _changed_at(merged):
+        merged['deleted'] = deleted
+    else:
+        merged.pop('deleted', None)
+
+    if merged == mine:
+        return mine, None
+    was_live, live = 'deleted' not in mine, 'deleted' not in merged
+    if was_live != live:
+        return merged, 'added' if live else 'removed'
+    return merged, 'updated' if changed and live else None
+
+
+def merge(kind: str, ours: Iterable[Dict], theirs: Iterable[Dict],
+          counts: Dict[str, int], stamp: str, first_free: int = 0) -> Optional[List[Dict]]:
+    """Merge two copies' records (tombstones included) of one kind
+
+    Ours keep their ids; records only they have keep theirs when it is
+    free here and get the next free id otherwise. Ids below ``first_free``
+    that ours don't use may be reserved for records not yet written, so
+    they don't count as free. Records that change here
+    get ``stamp`` as their ``LOCAL`` version. ``counts`` collects how many
+    of ours were 'added', 'updated' and 'removed'. Returns the merged
+    records, or None if theirs add nothing to ours.
+    """
+    by_uid: Dict[str, Dict] = {}
+    for record in ours:
+        by_uid[uid_of(record)] = record
+    taken = {record['id'] for record in by_uid.values()}
+    next_id = max(max(taken, default=0) + 1, first_free)
+    changed = False
+
+    for record in theirs:
+        uid = uid_of(record)
+        mine = by_uid.get(uid)
+        if mine is not None:
+            if record == mine:
+                # Most records are the same in both copies
+                continue
+            merged, change = merge_record(kind, mine, record)
+            if merged is not mine:
+                by_uid[uid] = _taken_in(merged, stamp)
+                changed = True
+            if change:
+                counts[change] += 1
+            continue
+        if record['id'] in taken or record['id'] < first_free:
+            record = _rehome(record, next_id)
+        taken.add(record['id'])
+        next_id = max(next_id, record['id'] + 1)
+        by_uid[uid] = _taken_in(dict(record, uid=uid), stamp)
+        changed = True
+        if 'deleted' not in record:
+            counts['added'] += 1
+    if not changed:
+        return None
+    # Nearly sorted already: ours in order, then the few new ones
+    return sorted(by_uid.values(), key=itemgetter('id'))
+
+
+# Delta sync through a directory
+def replica_id(data_file: str) -> str:
+    """Name of this copy of the store in a sync directory"""
+    import hashlib  # only needed to sync
+    import socket
+
+    host = re.sub(r'[^A-Za-z0-9_.-]', '_', socket.gethostname()) or 'host'
+    digest = hashlib.sha1(os.path.abspath(data_file).encode()).hexdigest()[:8]
+    return f"{host}-{digest}"
+
+
+def load_state(directory: str, replica: str) -> Dict:
+    """How far ``replica`` got: its last delta number, when it last
+    exported, and the last delta it applied from each other replica"""
+    try:
+        with open(os.path.join(directory, replica, 'state.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'seq': 0, 'exported': None, 'applied': {}}
+
+
+def save_state(directory: str, replica: str, state: Dict, mode: Optional[int] = None):
+    os.makedirs(os.path.join(directory, replica), exist_ok=True)
+    atomic_write(os.path.join(directory, replica, 'state.json'), json.dumps(state, indent=2),
+                 mode)
+
+
+def changed_here(record: Dict) -> str:
+    """When this copy last changed the record or took in a change to it"""
+    versions = record.get('versions')
+    return max(modified(record), (versions and versions.get(LOCAL)) or '')
+
+
+def changed_since(records: Iterable[Dict], since: Optional[str]) -> Iterator[Dict]:
+    """Records (and tombstones) changed here after ``since``; all if None"""
+    if since is None:
+        return iter(records)
+    return (record for record in records if changed_here(record) > since)
+
+
+def write_delta(directory: str, replica: str, state: Dict,
+                tasks: Iterable[Dict], habits: Iterable[Dict], mode: Optional[int] = None) -> int:
+    """Write the next delta file for ``replica`` with permissions ``mode``
+    (as ``atomic_write``); returns how many records it holds (nothing is
+    written for none)"""
+    lines = [json.dumps({'kind': kind, 'record': record}, separators=(',', ':'),
+                        default=json_default) + '\n'
+             for kind, records in (('task', tasks), ('habit', habits))
+             for record in records]
+    if not lines:
+        return 0
+    os.makedirs(os.path.join(directory, replica), exist_ok=True)
+    state['seq'] += 1
+    atomic_write(os.path.join(directory, replica, f"{state['seq']:08d}.ndjson"), ''.join(lines),
+                 mode)
+    # Others may read the file at once; never write that number again
+    save_state(directory, replica, state, mode)
+    return len(lines)
+
+
+def read_deltas(directory: str, replica: str, applied: Dict[str, int]) -> Dict[str, List[Dict]]:
+    """Records from delta files other replicas wrote since ``applied``
+
+    ``applied`` is advanced past each file read. A replica's files are read
+    in order and reading stops at one that is incomplete (e.g. still
+    being copied in by a file sync tool); it is retried next time.
+    """
+    records = {'task': [], 'habit': []}
+    try:
+        replicas = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return records
+    for other in replicas:
+        folder = os.path.join(directory, other)
+        if other == replica or not os.path.isdir(folder):
+            continue
+        seqs = sorted(int(name[:-len('.ndjson')]) for name in os.listdir(folder)
+                      if name.endswith('.ndjson') and name[:-len('.ndjson')].isdigit())
+        for seq in seqs:
+            if seq <= applied.get(other, 0):
+                continue
+            try:
+                with open(os.path.join(folder, f"{seq:08d}.ndjson")) as f:
+                    items = [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError):
+                break
+            for item in items:
+                records[item['kind']].append(item['record'])
+            applied[other] = seq
+    return records
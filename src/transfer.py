@@ -0,0 +1,147 @@
+"""
+Streaming import/export of tasks and habits as NDJSON or CSV
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator
+
+from .completions import Completions
+from .models import TimeOfDay
+
+FORMATS = ('ndjson', 'csv')
+
+CSV_FIELDS = [
+    'type', 'id', 'description', 'completed', 'created_at', 'completed_at',
+    'updated_at', 'frequency', 'days', 'time_of_day', 'completions'
+]
+
+# Separator for list fields (days, completions) inside one CSV cell
+LIST_SEPARATOR = ';'
+
+
+def guess_format(path: str, default: str = 'ndjson') -> str:
+    """Pick a format from a file name's extension"""
+    lower = path.lower()
+    if lower.endswith('.csv'):
+        return 'csv'
+    if lower.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return default
+
+
+def iter_export(tasks: Iterable[Dict], habits: Iterable[Dict], fmt: str = 'ndjson') -> Iterator[str]:
+    """Yield export lines (newline-terminated) for all tasks, then all habits
+
+    Each record carries a ``type`` of ``task`` or ``habit``; habits include
+    their full completion history.
+    """
+    if fmt == 'ndjson':
+        for kind, records in (('task', tasks), ('habit', habits)):
+            for record in records:
+                row = {'type': kind, **record}
+                if kind == 'habit':
+                    row['completions'] = list(record.get('completions') or ())
+                yield json.dumps(row, separators=(',', ':')) + '\n'
+        return
+
+    if fmt != 'csv':
+        raise ValueError(f"Unknown format: {fmt}")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore',
+                            lineterminator='\n')
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield flush()
+    for kind, records in (('task', tasks), ('habit', habits)):
+        for record in records:
+            row = dict(record, type=kind)
+            if kind == 'habit':
+                row['days'] = LIST_SEPARATOR.join(record.get('days', []))
+                row['completions'] = LIST_SEPARATOR.join(record.get('completions') or ())
+            writer.writerow(row)
+            yield flush()
+
+
+def _split(value) -> list:
+    if isinstance(value, list):
+        return value
+    return [v for v in (value or '').split(LIST_SEPARATOR) if v]
+
+
+def _normalize(row: Dict) -> Dict:
+    """Turn a parsed NDJSON/CSV row into a task or habit record
+
+    Raises ValueError for rows that cannot be imported.
+    """
+    kind = row.get('type') or 'task'
+    description = (row.get('description') or '').strip()
+    if not description:
+        raise ValueError("missing description")
+    created_at = row.get('created_at') or datetime.now().isoformat()
+
+    if kind == 'task':
+        completed = row.get('completed', False)
+        if isinstance(completed, str):
+            completed = completed.strip().lower() in ('1', 'true', 'yes')
+        record = {'description': description, 'completed': bool(completed),
+                  'created_at': created_at}
+        for field in ('completed_at', 'updated_at'):
+            if row.get(field):
+                record[field] = row[field]
+        return {'type': 'task', 'record': record}
+
+    if kind == 'habit':
+        frequency = (row.get('frequency') or 'daily').lower()
+        if frequency not in ('daily', 'weekly'):
+            raise ValueError(f"invalid frequency {frequency!r}")
+        time_of_day = (row.get('time_of_day') or TimeOfDay.ANYTIME.value).lower()
+        if time_of_day not in [t.value for t in TimeOfDay]:
+            raise ValueError(f"invalid time of day {time_of_day!r}")
+        record = {
+            'description': description,
+            'frequency': frequency,
+            'days': _split(row.get('days')),
+            'time_of_day': time_of_day,
+            'created_at': created_at,
+            'completions': Completions(_split(row.get('completions')))
+        }
+        if row.get('updated_at'):
+            record['updated_at'] = row['updated_at']
+        return {'type': 'habit', 'record': record}
+
+    raise ValueError(f"unknown type {kind!r}")
+
+
+def iter_import(lines: Iterable[str], fmt: str = 'ndjson') -> Iterator[Dict]:
+    """Yield ``{'type', 'record'}`` items parsed from export lines
+
+    Rows that cannot be imported are yielded as ``{'type': 'error',
+    'line': n, 'error': message}`` so callers can report and skip them.
+    Ids in the input are ignored; the importer allocates new ones.
+    """
+    if fmt == 'ndjson':
+        rows = ((n, line) for n, line in enumerate(lines, 1) if line.strip())
+        for number, line in rows:
+            try:
+                yield _normalize(json.loads(line))
+            except (ValueError, TypeError, AttributeError) as e:
+                yield {'type': 'error', 'line': number, 'error': str(e)}
+        return
+
+    if fmt != 'csv':
+        raise ValueError(f"Unknown format: {fmt}")
+    reader = csv.DictReader(lines)
+    for row in reader:
+        try:
+            yield _normalize(row)
+        except ValueError as e:
+            yield {'type': 'error', 'line': reader.line_num, 'error': str(e)}
@@ -0,0 +1,133 @@
+"""
+Noticing changes other programs make to the store's files
+
+``watch(paths)`` returns an object whose ``changed()`` says, cheaply,
+whether any of ``paths`` was written, replaced or removed since the last
+call. On Linux it uses inotify (through ctypes, no extra dependencies);
+elsewhere, or if inotify is unavailable, it compares ``os.stat`` results.
+"""
+
+import os
+import struct
+import sys
+from typing import Iterable, List
+
+
+class NullWatcher:
+    """For stores with no files (e.g. MemoryStorage); never reports a change"""
+
+    def changed(self) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+
+class StatWatcher:
+    """Polls size, mtime and inode of each path"""
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths: List[str] = list(paths)
+        self._stats = self._stat_all()
+
+    def _stat_all(self):
+        stats = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stats.append(None)
+            else:
+                stats.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return stats
+
+    def changed(self) -> bool:
+        stats = self._stat_all()
+        if stats == self._stats:
+            return False
+        self._stats = stats
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Watches the directories holding ``paths`` for events naming them
+
+    Directories rather than the files are watched, since atomic saves
+    replace a file with a new inode rather than writing to it.
+    """
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    # Not IN_CLOSE_WRITE: every write already raises IN_MODIFY, and closing
+    # the lock file after our own save would read as an outside change
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE)
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, paths: Iterable[str]):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._names = set()
+        try:
+            for directory in {os.path.dirname(os.path.abspath(path)) for path in paths}:
+                if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+                    raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        except BaseException:
+            os.close(self.fd)
+            raise
+        self._names = {os.fsencode(os.path.basename(path)) for path in paths}
+
+    def changed(self) -> bool:
+        changed = False
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, length = self.EVENT.unpack_from(buffer, offset)
+                offset += self.EVENT.size
+                name = buffer[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if name in self._names or mask & self.IN_Q_OVERFLOW:
+                    changed = True
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __del__(self):
+        self.close()
+
+
+def watch(paths: Iterable[str]):
+    """The cheapest watcher available for ``paths``"""
+    paths = list(paths)
+    if not paths:
+        return NullWatcher()
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            # No inotify (or out of instances); fall back to polling
+            pass
+    return StatWatcher(paths)
@@ -0,0 +1,54 @@
+"""
+Background writer for TodoManager's write-behind mode
+"""
+
+import atexit
+import threading
+
+
+class WriteBehind:
+    """Calls ``flush`` on a background thread shortly after ``notify()``
+    
+    Notifications arriving within ``interval`` seconds of the first are
+    handled by one ``flush``, so a burst of mutations costs one write.
+    ``close()`` stops the thread and flushes once more in the caller; it is
+    also registered with ``atexit`` so nothing queued is lost when the
+    interpreter exits normally.
+    """
+    
+    def __init__(self, flush, interval: float):
+        self._flush = flush
+        self.interval = interval
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='todo-write-behind',
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def notify(self):
+        """Schedule a flush"""
+        self._wake.set()
+    
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._closed.is_set():
+                return
+            # Let the rest of a burst arrive; close() cuts the wait short
+            self._closed.wait(self.interval)
+            if self._closed.is_set():
+                return
+            self._wake.clear()
+            self._flush()
+    
+    def close(self):
+        """Stop the thread and flush whatever is still queued"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        atexit.unregister(self.close)
+        self._flush()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.manager import TodoManager
+
+STORES = {
+    'json': ('todo.json', {}),
+    'journal': ('todo.json', {'journal': True}),
+    'sqlite': ('todo.db', {}),
+}
+
+
+@pytest.fixture(params=sorted(STORES))
+def open_store(request, tmp_path):
+    """Opens managers on one store, for each backend; closed afterwards"""
+    name, options = STORES[request.param]
+    path = str(tmp_path / name)
+    managers = []
+
+    def open_manager(**extra):
+        manager = TodoManager(path, **{**options, **extra})
+        managers.append(manager)
+        return manager
+
+    yield open_manager
+    for manager in managers:
+        manager.close()
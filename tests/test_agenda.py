@@ -0,0 +1,99 @@
+"""
+The cached agenda, updated change by change, against one built from scratch
+"""
+
+import random
+
+import pytest
+
+from src.agenda import Agenda
+from src.clock import FakeClock
+from src.manager import TodoManager
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIMES = ['morning', 'afternoon', 'evening', 'anytime']
+
+
+def from_scratch(manager, relevant_only=False):
+    now = manager.clock.snapshot()
+    agenda = Agenda()
+    agenda.build(now.ordinal, now.weekday,
+                 sorted((task for task in manager.tasks.values() if not task.completed),
+                        key=lambda task: task.id),
+                 sorted((habit for habit in manager.habits.values()
+                         if habit.is_due_today(now.weekday)
+                         and now.ordinal not in habit.completions),
+                        key=lambda habit: habit.id))
+    return agenda.items(now.relevant_times if relevant_only else None)
+
+
+def step(manager, rng):
+    task_id = rng.randrange(1, len(manager.tasks) + 2)
+    habit_id = rng.randrange(1, len(manager.habits) + 2)
+    action = rng.randrange(9)
+    if action == 0:
+        manager.add_task(f'Task {rng.random():.3f}')
+    elif action == 1:
+        manager.add_habit(f'Habit {rng.random():.3f}', rng.choice(['daily', 'weekly']),
+                          rng.sample(DAYS, 2), rng.choice(TIMES))
+    elif action == 2:
+        manager.complete_task(task_id)
+    elif action == 3:
+        manager.remove_task(task_id)
+    elif action == 4:
+        manager.update_task(task_id, 'Renamed')
+    elif action == 5:
+        manager.complete_habit_today(habit_id)
+    elif action == 6:
+        manager.remove_habit(habit_id)
+    elif action == 7:
+        manager.update_habit(habit_id, new_frequency=rng.choice(['daily', 'weekly']),
+                             new_days=rng.sample(DAYS, 1), new_time_of_day=rng.choice(TIMES))
+    else:
+        manager.clock.advance(hours=rng.choice([1, 5, 13]))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_updates_match_a_rebuild(tmp_path, seed):
+    rng = random.Random(seed)
+    manager = TodoManager(str(tmp_path / 'todo.json'), clock=FakeClock())
+    with manager.batch():
+        for n in range(5):
+            manager.add_task(f'Task {n}')
+            manager.add_habit(f'Habit {n}', 'weekly', rng.sample(DAYS, 3), rng.choice(TIMES))
+    for _ in range(150):
+        step(manager, rng)
+        assert manager.get_agenda() == from_scratch(manager)
+        assert manager.get_agenda(relevant_only=True) == from_scratch(manager, True)
+    manager.close()
+
+
+def test_cached_list_is_reused_until_a_change(tmp_path):
+    manager = TodoManager(str(tmp_path / 'todo.json'), clock=FakeClock())
+    manager.add_task('Buy milk')
+    manager.add_habit('Walk', 'daily')
+    agenda = manager._agenda
+    manager.get_agenda()
+    assert agenda.items() is agenda.items()
+    first = agenda.items()
+    manager.complete_habit_today(1)
+    assert agenda.items() is not first
+    assert [item['id'] for item in manager.get_agenda()] == [1]
+    # The next day the habit is due again
+    manager.clock.advance(days=1)
+    assert [(item['type'], item['id']) for item in manager.get_agenda()] == \
+        [('task', 1), ('habit', 1)]
+    manager.close()
+
+
+def test_failed_batch_puts_the_agenda_back(tmp_path):
+    manager = TodoManager(str(tmp_path / 'todo.json'), clock=FakeClock())
+    manager.add_task('Keep')
+    before = manager.get_agenda()
+    with pytest.raises(RuntimeError):
+        with manager.batch():
+            manager.add_task('Dropped')
+            manager.complete_task(1)
+            raise RuntimeError
+    assert manager.get_agenda() == before == from_scratch(manager)
+    manager.close()
@@ -0,0 +1,104 @@
+"""
+The HTTP/JSON API, over a real socket
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.api import TodoAPI, host_name
+from src.clock import FakeClock
+from src.manager import TodoManager
+
+JSON = {'Content-Type': 'application/json'}
+
+
+def exchange(manager, requests):
+    """Send (method, path, headers, body) requests over one keep-alive
+    connection; returns (status, payload) pairs"""
+
+    async def run():
+        api = TodoAPI(manager)
+        server = await asyncio.start_server(api.serve_client, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for method, path, headers, body in requests:
+            payload = b'' if body is None else json.dumps(body).encode()
+            headers = {'Host': f'localhost:{port}', **headers,
+                       'Content-Length': str(len(payload))}
+            head = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+            writer.write(f'{method} {path} HTTP/1.1\r\n{head}\r\n'.encode() + payload)
+            status_line, *lines = (await reader.readuntil(b'\r\n\r\n')).decode().split('\r\n')
+            length = next(int(line.split(':')[1]) for line in lines
+                          if line.lower().startswith('content-length'))
+            raw = await reader.readexactly(length)
+            responses.append((int(status_line.split()[1]), json.loads(raw) if raw else None))
+        writer.close()
+        server.close()
+        await api.shutdown()
+        await server.wait_closed()
+        return responses
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = TodoManager(str(tmp_path / 'todo.json'), clock=FakeClock())
+    yield manager
+    manager.close()
+
+
+def test_crud(manager):
+    responses = exchange(manager, [
+        ('POST', '/tasks', JSON, {'description': 'Buy milk'}),
+        ('POST', '/habits', JSON, {'description': 'Walk', 'frequency': 'daily'}),
+        ('GET', '/today', {}, None),
+        ('PATCH', '/tasks/1', JSON, {'completed': True}),
+        ('POST', '/habits/1/done', JSON, None),
+        ('GET', '/today', {}, None),
+        ('DELETE', '/tasks/1', JSON, None),
+        ('GET', '/tasks/1', {}, None),
+    ])
+    assert [status for status, _ in responses] == [201, 201, 200, 200, 200, 200, 204, 404]
+    assert responses[0][1] == {'id': 1}
+    assert [(item['type'], item['id']) for item in responses[2][1]] == [('task', 1), ('habit', 1)]
+    assert responses[3][1]['completed'] is True
+    assert responses[4][1] == {'id': 1, 'checked': True}
+    assert responses[5][1] == []
+
+
+def test_invalid_input(manager):
+    responses = exchange(manager, [
+        ('POST', '/habits', JSON, {'description': 'Gym', 'frequency': 'weekly'}),
+        ('POST', '/tasks', JSON, {'description': '  '}),
+        ('GET', '/next?n=x', {}, None),
+        ('PUT', '/tasks', JSON, None),
+        ('GET', '/nowhere', {}, None),
+    ])
+    assert [status for status, _ in responses] == [400, 400, 400, 405, 404]
+    assert responses[0][1] == {'error': 'weekly habits need days'}
+
+
+def test_requests_a_web_page_could_send_are_refused(manager):
+    responses = exchange(manager, [
+        ('GET', '/tasks', {'Host': 'attacker.example'}, None),
+        ('POST', '/tasks', {'Content-Type': 'text/plain'}, {'description': 'csrf'}),
+        ('POST', '/tasks', {}, {'description': 'no type'}),
+        ('DELETE', '/tasks/1', {}, None),
+        ('POST', '/tasks', {'Content-Type': 'application/json; charset=utf-8'},
+         {'description': 'fine'}),
+        ('GET', '/tasks', {'Host': '127.0.0.1'}, None),
+    ])
+    assert [status for status, _ in responses] == [403, 415, 415, 415, 201, 200]
+    assert [task['description'] for task in responses[-1][1]] == ['fine']
+
+
+@pytest.mark.parametrize('header, name', [('localhost:8765', 'localhost'),
+                                          ('127.0.0.1', '127.0.0.1'),
+                                          ('[::1]:8765', '[::1]'),
+                                          ('LocalHost', 'localhost')])
+def test_host_name(header, name):
+    assert host_name(header) == name
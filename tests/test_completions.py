@@ -0,0 +1,68 @@
+"""
+Completion history: streaks and unions against the obvious implementations
+"""
+
+import pickle
+import random
+from datetime import date
+
+import pytest
+
+from src.completions import Completions
+
+START = date(2025, 1, 1).toordinal()
+
+
+def naive_streak(days, ordinal):
+    streak = 0
+    while ordinal - streak in days:
+        streak += 1
+    return streak
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_streak_matches_counting_back(seed):
+    rng = random.Random(seed)
+    days = {START + d for d in range(120) if rng.random() < 0.7}
+    completions = Completions(days)
+    for ordinal in range(START - 2, START + 122):
+        assert completions.streak(ordinal) == naive_streak(days, ordinal)
+
+
+def test_streak_accepts_dates_and_strings():
+    completions = Completions(['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-05'])
+    assert completions.streak('2025-01-03') == 3
+    assert completions.streak(date(2025, 1, 5)) == 1
+    assert completions.streak('2025-01-04') == 0
+    assert Completions().streak('2025-01-01') == 0
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_union_is_the_sorted_set_union(seed):
+    rng = random.Random(seed)
+    ours = {START + rng.randrange(60) for _ in range(rng.randrange(30))}
+    theirs = {START + rng.randrange(60) for _ in range(rng.randrange(30))}
+    union = Completions(ours).union(Completions(theirs))
+    assert list(union.ordinals()) == sorted(ours | theirs)
+    # Neither side is changed
+    assert list(Completions(ours).ordinals()) == sorted(ours)
+
+
+def test_add_discard_and_ranges():
+    completions = Completions(['2025-01-03'])
+    assert completions.add('2025-01-05')
+    assert completions.add('2025-01-01')
+    assert not completions.add(date(2025, 1, 3))
+    assert list(completions) == ['2025-01-01', '2025-01-03', '2025-01-05']
+    assert completions.count_between('2025-01-02', '2025-01-05') == 2
+    assert completions.between('2025-01-01', '2025-01-03') == ['2025-01-01', '2025-01-03']
+    assert completions.discard('2025-01-03')
+    assert not completions.discard('2025-01-03')
+    assert '2025-01-05' in completions and 'not a date' not in completions
+    assert completions.last() == '2025-01-05'
+
+
+def test_bytes_and_pickle_round_trip():
+    completions = Completions(['2025-01-01', '2030-06-15'])
+    assert Completions.from_bytes(completions.to_bytes()) == completions
+    assert pickle.loads(pickle.dumps(completions)) == completions
@@ -0,0 +1,93 @@
+"""
+`todo serve` and its client, over a real Unix socket
+"""
+
+import sys
+import threading
+
+import pytest
+
+import todo
+from src import client
+from src.daemon import TodoServer, _Handler, _Server
+from src.manager import TodoManager
+
+
+@pytest.fixture
+def serving(tmp_path, monkeypatch):
+    """Runs a daemon on a fresh store; call it (in the test) for its socket
+    path"""
+    manager = TodoManager(str(tmp_path / 'todo.json'))
+    path = str(tmp_path / 'todo.sock')
+    server = _Server(path, _Handler)
+    server.todo = TodoServer(manager)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01})
+    thread.start()
+
+    def serving():
+        # As `serve()` does; pytest puts its own stdout back before each test
+        monkeypatch.setattr(sys, 'stdout', server.todo.output)
+        return path
+
+    yield serving
+    server.shutdown()
+    thread.join()
+    server.server_close()
+    manager.close()
+
+
+def test_commands_run_in_the_daemon(serving, tmp_path):
+    daemon = serving()
+    reply = client.request('add Buy milk', daemon)
+    assert reply == {'output': '✅ Task added with ID: 1\n', 'error': False}
+    assert 'Buy milk' in client.request('today', daemon)['output']
+    assert client.request('done task 9', daemon)['error']
+    assert [task.description for task in TodoManager(str(tmp_path / 'todo.json')).tasks.values()] \
+        == ['Buy milk']
+
+
+def test_paths_are_the_clients(serving, tmp_path, monkeypatch):
+    daemon = serving()
+    client.request('add Buy milk', daemon)
+    (tmp_path / 'elsewhere').mkdir()
+    monkeypatch.chdir(tmp_path / 'elsewhere')
+    assert not client.request('export backup.ndjson', daemon)['error']
+    assert 'Buy milk' in (tmp_path / 'elsewhere' / 'backup.ndjson').read_text()
+
+
+def test_concurrent_reads_get_their_own_output(serving):
+    daemon = serving()
+    for n in range(5):
+        client.request(f'add Task {n}', daemon)
+    replies = []
+
+    def read():
+        replies.append(client.request('view tasks --format json', daemon))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(replies) == 8
+    assert len({reply['output'] for reply in replies}) == 1
+    assert replies[0]['output'].count('Task ') == 5
+
+
+def test_outside_changes_are_picked_up(serving, tmp_path):
+    daemon = serving()
+    client.request('today', daemon)
+    other = TodoManager(str(tmp_path / 'todo.json'))
+    other.add_task('From elsewhere')
+    other.close()
+    assert 'From elsewhere' in client.request('today', daemon)['output']
+
+
+def test_no_daemon_means_no_reply(tmp_path):
+    assert client.request('today', str(tmp_path / 'missing.sock')) is None
+
+
+@pytest.mark.parametrize('line', ['', '   '])
+def test_empty_command_line_does_nothing(line, capsys):
+    assert todo.run_one(line) == 0
+    assert capsys.readouterr().out == ''
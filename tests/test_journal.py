@@ -0,0 +1,94 @@
+"""
+Journal mode: replaying appended entries and writes that fail
+"""
+
+import errno
+import os
+
+import pytest
+
+from src.journal import Journal
+from src.manager import TodoManager
+
+
+def state(manager):
+    return {task.id: (task.description, task.completed) for task in manager.tasks.values()}
+
+
+def test_entries_replay_on_top_of_the_snapshot(tmp_path):
+    path = str(tmp_path / 'todo.json')
+    manager = TodoManager(path, journal=True, compact_every=3)
+    manager.add_task('one')
+    manager.add_task('two')
+    assert not os.path.exists(path)
+    assert len(manager.storage.journal) == 2
+    manager.complete_task(1)
+    # The third entry compacts the journal into the snapshot
+    assert os.path.exists(path) and not os.path.exists(path + '.journal')
+    manager.update_task(2, 'second')
+    manager.close()
+    assert state(TodoManager(path, journal=True)) == {1: ('one', True), 2: ('second', False)}
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'todo.json')
+    manager = TodoManager(path, journal=True)
+    manager.add_task('kept')
+    manager.close()
+    with open(path + '.journal', 'ab') as f:
+        f.write(b'{"op":"put","kind":"task","rec')
+    journal = Journal(path + '.journal')
+    assert [entry['record']['description'] for entry in journal.replay()] == ['kept']
+    assert state(TodoManager(path, journal=True)) == {1: ('kept', False)}
+
+
+@pytest.mark.parametrize('name, options', [('todo.json', {'journal': True}),
+                                           ('todo.db', {})])
+def test_failed_write_is_retried_with_the_next(tmp_path, monkeypatch, name, options):
+    path = str(tmp_path / name)
+    manager = TodoManager(path, **options)
+    manager.add_task('one')
+    storage = type(manager.storage)
+    record_many = storage.record_many
+    failures = [OSError(errno.ENOSPC, 'No space left on device')]
+
+    def flaky(self, entries, tasks, habits):
+        if failures:
+            raise failures.pop()
+        return record_many(self, entries, tasks, habits)
+
+    monkeypatch.setattr(storage, 'record_many', flaky)
+    manager.complete_task(1)
+    assert manager.dirty
+    manager.add_task('two')
+    assert not manager.dirty
+    manager.close()
+    assert state(TodoManager(path, **options)) == {1: ('one', True), 2: ('two', False)}
+
+
+def test_failed_append_leaves_no_partial_line(tmp_path, monkeypatch):
+    path = str(tmp_path / 'todo.json')
+    manager = TodoManager(path, journal=True)
+    manager.add_task('one')
+    size = os.path.getsize(path + '.journal')
+
+    def full_disk(*args, **kwargs):
+        f = open(*args, **kwargs)
+        written = []
+
+        def write(data):
+            # Takes a few bytes, then runs out of space
+            if written:
+                raise OSError(errno.ENOSPC, 'No space left on device')
+            written.append(data[:5])
+            return os.write(f.fileno(), data[:5])
+
+        f.write = write
+        return f
+
+    monkeypatch.setattr('src.journal.open', full_disk, raising=False)
+    manager.complete_task(1)
+    monkeypatch.undo()
+    assert os.path.getsize(path + '.journal') == size
+    manager.close()
+    assert state(TodoManager(path, journal=True)) == {1: ('one', True)}
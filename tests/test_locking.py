@@ -0,0 +1,29 @@
+"""
+Several managers sharing one store
+"""
+
+
+def descriptions(manager):
+    return {task.id: task.description for task in manager.tasks.values()}
+
+
+def test_stale_writer_gets_a_free_id(open_store):
+    first, second = open_store(), open_store()
+    assert first.add_task('first') == 1
+    # second still thinks id 1 is free
+    assert second.add_task('second') == 2
+    assert descriptions(second) == {1: 'first', 2: 'second'}
+    assert descriptions(open_store()) == {1: 'first', 2: 'second'}
+
+
+def test_stale_writer_keeps_other_changes(open_store):
+    first, second = open_store(), open_store()
+    first.add_task('shared')
+    second.refresh()
+    first.add_habit('Stretch', 'daily')
+    second.complete_task(1)
+    second.add_task('later')
+    fresh = open_store()
+    assert fresh.tasks[1].completed
+    assert descriptions(fresh) == {1: 'shared', 2: 'later'}
+    assert [habit.description for habit in fresh.habits.values()] == ['Stretch']
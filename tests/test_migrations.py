@@ -0,0 +1,97 @@
+"""
+Schema migrations and stores that cannot be loaded
+"""
+
+import json
+import os
+from datetime import date
+
+import pytest
+
+from src.manager import ReadOnlyError, TodoManager
+from src.migrations import CURRENT_SCHEMA_VERSION, migrate
+from src.storage import V1_FILE
+
+
+def test_failed_load_never_writes(tmp_path, capsys):
+    path = tmp_path / 'todo.json'
+    newer = json.dumps({'schema_version': 99, 'tasks': [], 'habits': [], 'future': True})
+    path.write_text(newer)
+    manager = TodoManager(str(path))
+    assert manager.read_only
+    assert 'Not saving' in capsys.readouterr().out
+    with pytest.raises(ReadOnlyError):
+        manager.add_task('lost')
+    with pytest.raises(ReadOnlyError):
+        manager.remove_task(1)
+    manager.save_data()
+    manager.close()
+    assert path.read_text() == newer
+
+
+@pytest.mark.parametrize('content', ['[1, 2, 3]', 'not json\nat all\n', '{"tasks": [',
+                                     '\ufeffBuy milk\n'])
+def test_unparseable_files_are_not_migrated(tmp_path, content):
+    path = tmp_path / 'todo_data.json'
+    path.write_text(content)
+    manager = TodoManager(str(path))
+    assert manager.read_only and not manager.tasks
+    manager.close()
+    assert path.read_text() == content
+
+
+def test_bom_prefixed_json_loads_without_a_write(tmp_path):
+    path = tmp_path / 'todo_data.json'
+    content = '\ufeff' + json.dumps({'schema_version': CURRENT_SCHEMA_VERSION, 'habits': [],
+                                     'tasks': [{'id': 1, 'description': 'Milk',
+                                                'completed': False, 'created_at': ''}]})
+    path.write_text(content, encoding='utf-8')
+    manager = TodoManager(str(path))
+    assert not manager.read_only
+    assert manager.tasks[1].description == 'Milk'
+    manager.close()
+    assert path.read_text(encoding='utf-8') == content
+
+
+def test_v1_text_file_becomes_tasks(tmp_path):
+    path = tmp_path / V1_FILE
+    path.write_text('Buy milk\n\n  Call mom  \n')
+    manager = TodoManager(str(path))
+    assert [task.description for task in manager.tasks.values()] == ['Buy milk', 'Call mom']
+    manager.close()
+    assert json.loads(path.read_text())['schema_version'] == CURRENT_SCHEMA_VERSION
+
+
+def test_v2_file_is_upgraded_once(tmp_path):
+    path = tmp_path / 'todo_data.json'
+    path.write_text(json.dumps({
+        'tasks': [{'id': 1, 'description': 'Old task', 'completed': False,
+                   'created_at': '2025-01-01T09:00:00'}],
+        'habits': [{'id': 1, 'description': 'Walk', 'frequency': 'daily', 'days': [],
+                    'created_at': '2025-01-01T09:00:00',
+                    'completions': ['2025-01-02', '2025-01-01']}],
+    }))
+    manager = TodoManager(str(path))
+    habit = manager.habits[1]
+    assert habit.time_of_day == 'anytime'
+    assert list(habit.completions) == ['2025-01-01', '2025-01-02']
+    manager.close()
+    stored = json.loads(path.read_text())
+    assert stored['schema_version'] == CURRENT_SCHEMA_VERSION
+    assert stored['habits'][0]['completions'] == [date(2025, 1, 1).toordinal(),
+                                                  date(2025, 1, 2).toordinal()]
+
+    # A current file is not written again
+    before = os.stat(path).st_mtime_ns
+    TodoManager(str(path)).close()
+    assert os.stat(path).st_mtime_ns == before
+
+
+def test_migrate_steps_through_each_version():
+    data = {'schema_version': 1, 'lines': ['one', '', 'two']}
+    assert migrate(data)
+    assert data['schema_version'] == CURRENT_SCHEMA_VERSION
+    assert [task['description'] for task in data['tasks']] == ['one', 'two']
+    assert not migrate(data)
+    with pytest.raises(ValueError):
+        migrate({'schema_version': CURRENT_SCHEMA_VERSION + 1})
@@ -0,0 +1,74 @@
+"""
+HabitIndex against a scan over every habit
+"""
+
+import random
+
+import pytest
+
+from src.clock import FakeClock
+from src.manager import TodoManager
+from src.models import Habit
+from src.schedule import WEEKDAYS, HabitIndex, weekday_mask
+
+TIMES = ('morning', 'afternoon', 'evening', 'anytime')
+
+
+def scan(habits, weekday, times=None):
+    return sorted(habit.id for habit in habits.values()
+                  if habit.is_due_today(weekday)
+                  and (times is None or habit.time_of_day in times))
+
+
+def random_habit(rng, habit_id):
+    frequency = rng.choice(('daily', 'weekly', 'weekly', 'monthly'))
+    days = [day.capitalize() for day in WEEKDAYS if rng.random() < 0.3]
+    return Habit(habit_id, f'Habit {habit_id}', frequency, days, rng.choice(TIMES))
+
+
+def assert_matches(index, habits):
+    assert len(index) == len(habits)
+    for weekday in WEEKDAYS:
+        assert index.due(weekday) == scan(habits, weekday)
+        for time_of_day in TIMES:
+            assert index.due(weekday, [time_of_day]) == scan(habits, weekday, [time_of_day])
+        assert index.due(weekday, ['morning', 'anytime']) == \
+            scan(habits, weekday, ['morning', 'anytime'])
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_index_follows_adds_changes_and_removals(seed):
+    rng = random.Random(seed)
+    habits = {i: random_habit(rng, i) for i in range(1, 30)}
+    index = HabitIndex(habits.values())
+    assert_matches(index, habits)
+    for _ in range(200):
+        habit_id = rng.randrange(1, 40)
+        if rng.random() < 0.3:
+            habits.pop(habit_id, None)
+            index.remove(habit_id)
+        else:
+            habits[habit_id] = random_habit(rng, habit_id)
+            index.add(habits[habit_id])
+    assert_matches(index, habits)
+    index.rebuild(habits.values())
+    assert_matches(index, habits)
+
+
+def test_weekday_mask():
+    assert weekday_mask('daily', []) == 0b1111111
+    assert weekday_mask('weekly', ['Monday', 'sunday', 'Someday']) == 0b1000001
+    assert weekday_mask('monthly', ['Monday']) == 0
+
+
+def test_manager_keeps_its_index_current(tmp_path):
+    manager = TodoManager(str(tmp_path / 'todo.json'), clock=FakeClock())
+    manager.add_habit('Walk', 'daily')
+    manager.add_habit('Gym', 'weekly', ['Monday', 'Thursday'], 'evening')
+    manager.add_habit('Read', 'weekly', ['Tuesday'], 'morning')
+    manager.update_habit(2, new_days=['Friday'])
+    manager.update_habit(3, new_frequency='daily', new_time_of_day='afternoon')
+    manager.remove_habit(1)
+    manager.add_habit('Swim', 'weekly', ['Saturday'])
+    assert_matches(manager._schedule, manager.habits)
+    manager.close()
@@ -0,0 +1,73 @@
+"""
+Binary snapshots: the current format, and reading the older marshal ones
+"""
+
+import marshal
+
+import pytest
+
+from src import snapshot
+from src.completions import Completions
+from src.storage import JsonStorage
+
+DATA = {
+    'schema_version': 4,
+    'tasks': [{'id': 1, 'description': 'Café ☕', 'completed': False,
+               'created_at': '2025-01-01T09:00:00', 'uid': 'a1', 'versions': {'a1': 2}},
+              {'id': 2, 'description': 'Done', 'completed': True,
+               'created_at': '2025-01-01T09:00:00', 'completed_at': '2025-01-02T09:00:00'}],
+    'habits': [{'id': 1, 'description': 'Walk', 'frequency': 'daily', 'days': [],
+                'time_of_day': None, 'created_at': '2025-01-01T09:00:00',
+                'completions': Completions(['2025-01-01', '2025-01-03'])},
+               {'id': 2, 'description': 'Gym', 'frequency': 'weekly', 'days': ['Monday'],
+                'time_of_day': 'morning', 'created_at': '2025-01-01T09:00:00',
+                'completions': Completions()}]
+}
+
+
+def dates(data):
+    return [list(habit['completions']) for habit in data['habits']]
+
+
+def test_round_trip():
+    blob = snapshot.encode(DATA)
+    assert blob.startswith(snapshot.HEADER)
+    # Everything but the completions is plain JSON
+    assert 'Café ☕'.encode('utf-8') in blob
+    data = snapshot.decode(blob)
+    assert data['tasks'] == DATA['tasks']
+    assert [{k: v for k, v in habit.items() if k != 'completions'} for habit in data['habits']] \
+        == [{k: v for k, v in habit.items() if k != 'completions'} for habit in DATA['habits']]
+    assert dates(data) == dates(DATA)
+
+
+def test_marshal_formats_are_still_read():
+    assert dates(snapshot.decode(snapshot.encode(DATA, portable=False))) == dates(DATA)
+    payload = {'schema_version': 4, 'tasks': [],
+               'habits': [{'id': 1, 'completions': '2025-01-01,2025-01-03'},
+                          {'id': 2, 'completions': ''}]}
+    v1 = snapshot.MAGIC + bytes([1]) + marshal.dumps(payload)
+    assert [habit['completions'] for habit in snapshot.decode(v1)['habits']] == \
+        [['2025-01-01', '2025-01-03'], []]
+
+
+@pytest.mark.parametrize('blob', [
+    snapshot.encode(DATA)[:-3],
+    snapshot.encode(DATA) + b'\0',
+    snapshot.MAGIC + bytes([9]),
+    b'{"tasks": []}',
+])
+def test_damaged_snapshots_are_refused(blob):
+    with pytest.raises(ValueError):
+        snapshot.decode(blob)
+
+
+def test_old_snapshot_is_rewritten_in_the_current_format(tmp_path):
+    path = tmp_path / 'todo.json'
+    path.write_bytes(snapshot.encode(DATA, portable=False))
+    storage = JsonStorage(str(path), cache=False)
+    data = storage.load()
+    assert storage.binary
+    storage.save(data['tasks'], data['habits'])
+    assert path.read_bytes().startswith(snapshot.HEADER)
+    assert dates(storage.load()) == dates(DATA)
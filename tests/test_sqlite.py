@@ -0,0 +1,84 @@
+"""
+SQLite stores read lazily, through their indexes
+"""
+
+import pytest
+
+from src.clock import FakeClock
+from src.manager import TodoManager
+from src.storage import SQLiteStorage
+
+
+def seed(path, clock):
+    manager = TodoManager(path, clock=clock)
+    with manager.batch():
+        for description in ('open', 'done', 'later'):
+            manager.add_task(description)
+        manager.add_habit('Walk', 'daily')
+        manager.add_habit('Gym', 'weekly', ['Monday'])
+        manager.add_habit('Swim', 'weekly', ['Tuesday'])
+        manager.add_habit('Read', 'daily')
+    manager.complete_task(2)
+    manager.complete_habit_today(4)
+    manager.remove_task(3)
+    manager.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    # A Monday
+    clock = FakeClock()
+    path = str(tmp_path / 'todo.db')
+    seed(path, clock)
+    return path, clock
+
+
+def agenda(manager):
+    return [(item['type'], item['id']) for item in manager.get_agenda()]
+
+
+def test_agenda_comes_from_queries(store, monkeypatch):
+    path, clock = store
+    expected = agenda(TodoManager(path, clock=clock))
+
+    def no_full_load(self):
+        raise AssertionError("loaded the whole store")
+
+    monkeypatch.setattr(SQLiteStorage, 'load', no_full_load)
+    manager = TodoManager(path, clock=clock, lazy=True)
+    assert agenda(manager) == expected == [('task', 1), ('habit', 1), ('habit', 2)]
+    assert manager.complete_task(1)
+    assert not manager.complete_task(3)
+    assert manager.get_habit(3).description == 'Swim'
+    assert manager.add_task('new') == 4
+    assert agenda(manager) == [('task', 4), ('habit', 1), ('habit', 2)]
+    manager.close()
+
+
+def test_full_load_keeps_unwritten_changes(store):
+    path, clock = store
+    manager = TodoManager(path, clock=clock, lazy=True, write_behind=60_000)
+    manager.update_task(1, 'renamed')
+    manager.add_task('queued')
+    manager.remove_habit(2)
+    assert [task.description for task in manager.get_tasks(show_completed=True)] == \
+        ['renamed', 'done', 'queued']
+    assert [habit.id for habit in manager.get_habits()] == [1, 3, 4]
+    manager.close()
+    fresh = TodoManager(path, clock=clock)
+    assert [task.description for task in fresh.tasks.values()] == ['renamed', 'done', 'queued']
+    assert sorted(fresh.tombstones['habit']) == [2]
+
+
+def test_outside_changes_are_read_again(store):
+    path, clock = store
+    manager = TodoManager(path, clock=clock, lazy=True)
+    assert agenda(manager)[0] == ('task', 1)
+    other = TodoManager(path, clock=clock)
+    other.complete_task(1)
+    assert other.add_task('elsewhere') == 4
+    other.close()
+    assert manager.refresh()
+    assert agenda(manager)[0] == ('task', 4)
+    assert manager.add_task('mine') == 5
+    manager.close()
@@ -0,0 +1,63 @@
+"""
+Storage helpers
+"""
+
+import os
+import stat
+
+import pytest
+
+from src.manager import TodoManager
+from src.storage import atomic_write
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.mark.parametrize('mode', [0o644, 0o664, 0o600])
+def test_atomic_write_keeps_file_mode(tmp_path, mode):
+    path = tmp_path / 'todo.json'
+    path.write_text('{}')
+    os.chmod(path, mode)
+    atomic_write(str(path), '{"tasks": []}')
+    assert mode_of(path) == mode
+    assert path.read_text() == '{"tasks": []}'
+
+
+def test_atomic_write_new_file_follows_umask(tmp_path):
+    path = tmp_path / 'todo.bin'
+    umask = os.umask(0o027)
+    try:
+        atomic_write(str(path), b'data')
+    finally:
+        os.umask(umask)
+    assert mode_of(path) == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ['todo.bin']
+
+
+def test_side_files_get_the_data_file_mode(tmp_path):
+    path = tmp_path / 'todo.json'
+    TodoManager(str(path)).add_task('secret')
+    os.chmod(path, 0o600)
+    manager = TodoManager(str(path), journal=True)
+    manager.add_task('more')
+    manager.save_data(force=True)
+    manager.complete_task(1)
+    manager.sync(str(tmp_path / 'shared'))
+    manager.close()
+    side_files = [path.with_name('todo.json.journal'), path.with_name('.todo.json.cache')]
+    side_files += (tmp_path / 'shared').glob('*/*')
+    assert len(side_files) == 4
+    assert {str(p): mode_of(p) for p in side_files} == {str(p): 0o600 for p in side_files}
+
+
+def test_save_refreshes_the_cache(tmp_path):
+    path = tmp_path / 'todo.json'
+    manager = TodoManager(str(path))
+    manager.add_task('cached')
+    cache = path.with_name('.todo.json.cache')
+    before = os.stat(cache)
+    assert [task.description for task in TodoManager(str(path)).tasks.values()] == ['cached']
+    after = os.stat(cache)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
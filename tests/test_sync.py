@@ -0,0 +1,119 @@
+"""
+Merging copies of the store and delta sync (``src/sync.py``)
+"""
+
+import json
+
+from src import sync
+from src.clock import FakeClock
+from src.manager import TodoManager
+
+
+def open_copy(tmp_path, name):
+    return TodoManager(str(tmp_path / f'{name}.json'), clock=FakeClock())
+
+
+def descriptions(manager):
+    return sorted(task.description for task in manager.tasks.values())
+
+
+def test_new_records_get_random_uids(tmp_path):
+    manager = open_copy(tmp_path, 'a')
+    manager.add_task('one')
+    manager.add_habit('Read', 'daily')
+    task, habit = manager.tasks[1], manager.habits[1]
+    assert task.uid and habit.uid and task.uid != habit.uid
+    assert sync.uid_of(task.to_dict()) == task.uid
+
+
+def test_legacy_records_fall_back_to_derived_uid():
+    record = {'id': 3, 'description': 'old', 'created_at': '2024-01-01T09:00:00'}
+    assert sync.uid_of(record) == sync.derive_uid(3, '2024-01-01T09:00:00')
+
+
+def test_same_id_in_the_same_second_stays_two_records(tmp_path):
+    # Both clocks read the same moment, so both tasks are "1 at 09:00"
+    first, second = open_copy(tmp_path, 'a'), open_copy(tmp_path, 'b')
+    first.add_task('from a')
+    second.add_task('from b')
+    counts = first.merge_file(str(tmp_path / 'b.json'))
+    assert counts['added'] == 1
+    assert descriptions(first) == ['from a', 'from b']
+    assert sorted(first.tasks) == [1, 2]
+
+
+def test_sync_exchanges_changes(tmp_path):
+    directory = str(tmp_path / 'shared')
+    first, second = open_copy(tmp_path, 'a'), open_copy(tmp_path, 'b')
+    first.add_task('from a')
+    second.add_task('from b')
+    assert first.sync(directory)['sent'] == 1
+    assert second.sync(directory)['added'] == 1
+    assert first.sync(directory)['added'] == 1
+    assert descriptions(first) == descriptions(second) == ['from a', 'from b']
+
+    first.clock.advance(minutes=5)
+    first.complete_task(1)
+    assert first.sync(directory)['sent'] == 1
+    second.clock.advance(minutes=10)
+    assert second.sync(directory)['updated'] == 1
+    # Nothing new either way, and what came in is not sent back
+    assert first.sync(directory)['sent'] == 0
+    assert second.sync(directory)['sent'] == 0
+
+
+def test_delta_includes_old_records_imported_or_merged_here(tmp_path):
+    directory = str(tmp_path / 'shared')
+    first, second = open_copy(tmp_path, 'a'), open_copy(tmp_path, 'b')
+    first.sync(directory)
+    second.sync(directory)
+
+    first.clock.advance(hours=1)
+    line = json.dumps({'type': 'task', 'description': 'imported',
+                       'created_at': '2020-01-01T00:00:00'})
+    first.import_records([line])
+    assert first.sync(directory)['sent'] == 1
+
+    third = open_copy(tmp_path, 'c')
+    third.import_records([json.dumps({'type': 'task', 'description': 'merged',
+                                      'created_at': '2019-06-01T00:00:00'})])
+    second.clock.advance(hours=1)
+    second.merge_file(str(tmp_path / 'c.json'))
+    assert second.sync(directory) == {'sent': 1, 'added': 1, 'updated': 0, 'removed': 0}
+    assert first.sync(directory)['added'] == 1
+    assert descriptions(first) == descriptions(second) == ['imported', 'merged']
+
+
+def test_local_stamp_does_not_revive_removed_records():
+    mine = {'id': 1, 'description': 'gone', 'created_at': '2024-01-01T09:00:00',
+            'uid': 'x', 'deleted': '2024-01-02T09:00:00'}
+    theirs = {key: value for key, value in mine.items() if key != 'deleted'}
+    theirs['versions'] = {sync.LOCAL: '2024-03-01T09:00:00'}
+    merged, change = sync.merge_record('task', mine, theirs)
+    assert 'deleted' in merged and change is None
+    assert sync.LOCAL not in (merged.get('versions') or {})
+
+
+def test_failed_save_is_reported_and_changes_nothing(tmp_path, monkeypatch, capsys):
+    from src.cli import TodoCLI
+
+    first, second = open_copy(tmp_path, 'a'), open_copy(tmp_path, 'b')
+    first.add_task('here')
+    second.add_task('there')
+    second.sync(str(tmp_path / 'shared'))
+
+    def full_disk(tasks, habits):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(first.storage, 'save', full_disk)
+    cli = TodoCLI(first, cwd=str(tmp_path))
+    cli.onecmd('merge b.json')
+    cli.onecmd('sync shared')
+    out = capsys.readouterr().out
+    assert out.count('No space left on device') == 2 and '✅' not in out
+    assert cli.last_error
+    assert descriptions(first) == ['here']
+
+    monkeypatch.undo()
+    assert first.sync(str(tmp_path / 'shared'))['added'] == 1
+    assert descriptions(open_copy(tmp_path, 'a')) == ['here', 'there']
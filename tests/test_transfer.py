@@ -0,0 +1,95 @@
+"""
+NDJSON/CSV export and import
+"""
+
+import io
+import json
+
+import pytest
+
+from src.cli import TodoCLI
+from src.clock import FakeClock
+from src.manager import TodoManager
+from src.transfer import iter_import
+
+
+def filled(path):
+    manager = TodoManager(str(path), clock=FakeClock())
+    manager.add_task('Buy milk')
+    manager.add_task('Done, with "quotes"')
+    manager.complete_task(2)
+    manager.add_habit('Stretch', 'weekly', ['Monday', 'Friday'], 'morning')
+    manager.complete_habit_today(1)
+    manager.clock.advance(days=1)
+    manager.complete_habit_today(1)
+    return manager
+
+
+def summary(manager):
+    return ([(task.description, task.completed) for task in manager.tasks.values()],
+            [(habit.description, habit.frequency, habit.days, habit.time_of_day,
+              list(habit.completions)) for habit in manager.habits.values()])
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'csv'])
+def test_round_trip(tmp_path, fmt):
+    source = filled(tmp_path / 'source.json')
+    lines = list(source.export_records(fmt))
+    target = TodoManager(str(tmp_path / 'target.json'))
+    result = target.import_records(lines, fmt)
+    assert result == {'tasks': 2, 'habits': 1, 'skipped': 0, 'errors': []}
+    assert summary(target) == summary(source)
+    assert summary(TodoManager(str(tmp_path / 'target.json'))) == summary(source)
+
+
+def test_invalid_rows_are_skipped_and_reported():
+    lines = ['{"description": "ok"}\n', 'not json\n', '\n',
+             '{"type": "habit", "description": "x", "frequency": "hourly"}\n',
+             '{"type": "note", "description": "x"}\n', '{"description": " "}\n']
+    items = list(iter_import(lines))
+    assert [item['type'] for item in items] == ['task', 'error', 'error', 'error', 'error']
+    assert [item['line'] for item in items[1:]] == [2, 4, 5, 6]
+    assert "invalid frequency" in items[2]['error']
+
+
+def test_csv_error_rows_carry_line_numbers():
+    lines = ['type,description,frequency\n', 'task,Milk,\n', 'habit,Run,yearly\n']
+    items = list(iter_import(lines, 'csv'))
+    assert items[0]['record']['description'] == 'Milk'
+    assert items[1] == {'type': 'error', 'line': 3, 'error': "invalid frequency 'yearly'"}
+
+
+def test_import_failing_midway_changes_nothing(tmp_path):
+    path = str(tmp_path / 'todo.json')
+    manager = TodoManager(path)
+    manager.add_task('before')
+    raw = ''.join(json.dumps({'description': f'Task {n}'}) + '\n' for n in range(1500))
+    stream = io.TextIOWrapper(io.BytesIO(raw.encode() + b'\xff\xfe bad\n'), encoding='utf-8')
+    with pytest.raises(UnicodeDecodeError):
+        manager.import_records(stream)
+    assert list(manager.tasks) == [1]
+    # The ids it reserved are left unused, like those of removed tasks
+    assert manager.add_task('after') == 1002
+    manager.close()
+    assert [task.description for task in TodoManager(path).tasks.values()] == ['before', 'after']
+
+
+def test_cli_reports_unreadable_import(tmp_path, capsys):
+    (tmp_path / 'data.bin').write_bytes(b'\x80\x81\x82\n')
+    cli = TodoCLI(TodoManager(str(tmp_path / 'todo.json')), cwd=str(tmp_path))
+    cli.onecmd('import data.bin')
+    assert cli.last_error
+    assert 'Cannot import data.bin' in capsys.readouterr().out
+
+
+def test_view_json_lists_only_the_public_fields(tmp_path, capsys):
+    manager = TodoManager(str(tmp_path / 'todo.json'), clock=FakeClock())
+    manager.add_task('Buy milk')
+    manager.complete_task(1)
+    cli = TodoCLI(manager)
+    capsys.readouterr()
+    cli.onecmd('view tasks all --format json')
+    [task] = json.loads(capsys.readouterr().out)
+    assert sorted(task) == ['completed', 'completed_at', 'created_at', 'description',
+                            'id', 'type', 'updated_at']
+    assert (task['type'], task['id'], task['completed']) == ('task', 1, True)
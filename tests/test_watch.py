@@ -0,0 +1,115 @@
+"""
+Watching the store's files, and refresh() picking up other processes' changes
+"""
+
+import os
+import sys
+
+import pytest
+
+from src.manager import TodoManager
+from src.storage import JsonStorage
+from src.watch import InotifyWatcher, NullWatcher, StatWatcher, watch
+
+WATCHERS = [StatWatcher]
+if sys.platform.startswith('linux'):
+    WATCHERS.append(InotifyWatcher)
+
+
+@pytest.mark.parametrize('watcher_class', WATCHERS)
+def test_watcher_sees_writes_replacements_and_removals(tmp_path, watcher_class):
+    path = tmp_path / 'todo.json'
+    path.write_text('{}')
+    watcher = watcher_class([str(path)])
+    assert not watcher.changed()
+    (tmp_path / 'unrelated.txt').write_text('x')
+    assert not watcher.changed()
+    with open(path, 'a') as f:
+        f.write(' ')
+    assert watcher.changed()
+    assert not watcher.changed()
+    (tmp_path / 'new.json').write_text('{"tasks": []}')
+    os.replace(tmp_path / 'new.json', path)
+    assert watcher.changed()
+    path.unlink()
+    assert watcher.changed()
+    assert not watcher.changed()
+    watcher.close()
+
+
+def test_no_paths_means_no_watching():
+    assert isinstance(watch([]), NullWatcher)
+    assert not watch([]).changed()
+
+
+def test_refresh_picks_up_other_writers(open_store):
+    reader, writer = open_store(), open_store()
+    assert not reader.has_outside_changes()
+    assert not reader.refresh()
+    writer.add_task('From elsewhere')
+    writer.add_habit('Walk', 'daily')
+    assert reader.has_outside_changes()
+    # Asking again doesn't lose the change
+    assert reader.has_outside_changes()
+    assert reader.refresh()
+    assert [task.description for task in reader.tasks.values()] == ['From elsewhere']
+    assert [item['id'] for item in reader.get_agenda()] == [1, 1]
+    assert not reader.refresh()
+
+
+def test_own_saves_are_not_outside_changes(open_store):
+    manager = open_store()
+    manager.refresh()
+    manager.add_task('Mine')
+    manager.complete_task(1)
+    assert not manager.has_outside_changes()
+    assert not manager.refresh()
+
+
+def test_journal_entries_are_applied_without_a_full_load(tmp_path, monkeypatch):
+    path = str(tmp_path / 'todo.json')
+    reader = TodoManager(path, journal=True)
+    writer = TodoManager(path, journal=True)
+    writer.add_task('Buy milk')
+    reader.refresh()
+
+    def no_full_load(self):
+        raise AssertionError("reloaded the whole store")
+
+    monkeypatch.setattr(JsonStorage, 'load', no_full_load)
+    writer.complete_task(1)
+    writer.add_task('Call mum')
+    assert reader.refresh()
+    assert [(task.description, task.completed) for task in reader.tasks.values()] == \
+        [('Buy milk', True), ('Call mum', False)]
+    assert [item['id'] for item in reader.get_agenda()] == [2]
+    reader.close()
+    writer.close()
+
+
+def test_unsaved_changes_are_not_reloaded_over(tmp_path):
+    path = str(tmp_path / 'todo.json')
+    reader = TodoManager(path, write_behind=60_000)
+    writer = TodoManager(path)
+    reader.add_task('Queued')
+    writer.add_task('Written')
+    assert not reader.refresh()
+    reader.flush()
+    assert sorted(task.description for task in TodoManager(path).tasks.values()) == \
+        ['Queued', 'Written']
+    reader.close()
+    writer.close()
+
+
+def test_read_only_manager_loads_once_the_file_is_fixed(tmp_path):
+    path = tmp_path / 'todo.json'
+    path.write_text('not json')
+    manager = TodoManager(str(path))
+    assert manager.read_only
+    assert not manager.refresh()
+    TodoManager(str(tmp_path / 'good.json')).add_task('Recovered')
+    os.replace(tmp_path / 'good.json', path)
+    assert manager.refresh()
+    assert not manager.read_only
+    assert [task.description for task in manager.tasks.values()] == ['Recovered']
+    manager.close()
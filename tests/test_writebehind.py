@@ -0,0 +1,38 @@
+"""
+Write-behind mode and the ids it hands out
+"""
+
+
+def descriptions(manager):
+    return {task.id: task.description for task in manager.tasks.values()}
+
+
+def test_ids_from_batch_and_write_behind_are_final(open_store):
+    first, second = open_store(), open_store(write_behind=50)
+    first.add_task('first')
+    assert second.add_task('behind') == 2
+    other = open_store()
+    with other.batch():
+        ids = [other.add_task('batched'), other.add_task('batched')]
+    second.flush()
+    assert ids == [3, 4]
+    assert descriptions(open_store()) == {1: 'first', 2: 'behind', 3: 'batched', 4: 'batched'}
+
+
+def test_write_behind_add_is_not_written_at_once(open_store):
+    behind = open_store(write_behind=60_000)
+    assert behind.add_task('queued') == 1
+    assert descriptions(open_store()) == {}
+    assert open_store().add_task('elsewhere') == 2
+    behind.flush()
+    assert descriptions(open_store()) == {1: 'queued', 2: 'elsewhere'}
+
+
+def test_merge_skips_reserved_ids(open_store):
+    behind = open_store(write_behind=60_000)
+    behind.add_task('queued')
+    theirs = {'id': 1, 'uid': 'a' * 32, 'description': 'theirs', 'completed': False,
+              'created_at': '2025-01-01T09:00:00'}
+    open_store().merge_records([theirs], [])
+    behind.flush()
+    assert descriptions(open_store()) == {1: 'queued', 2: 'theirs'}
@@ -2,6 +2,28 @@
 """
 Todo List Command Line Tool
 A simple CLI tool for managing tasks and time-aware habits
+
+Run without arguments for the interactive shell, or pass a single command
+to run it and exit:
+    todo today
+    todo done 3
+    todo add Buy milk
+
+Run many commands with a single save at the end (use '-' for stdin):
+    todo --batch cmds.txt [--stop-on-error]
+
+Keep the data loaded in a background daemon; one-shot commands are then
+sent to it over a Unix socket (todo_data.json.sock, or $TODO_SOCKET) and
+fall back to running locally when no daemon is listening:
+    todo serve [--socket PATH]
+
+Serve tasks, habits and the agenda as JSON over HTTP (see src/api.py):
+    todo api [--host 127.0.0.1] [--port 8765]
+
+Choose the data file and storage with $TODO_DATA and $TODO_STORAGE (see
+src/config.py):
+    TODO_DATA=~/todo.db todo today
+    TODO_STORAGE=journal,binary todo serve
 """
 
 # Add src directory to path
@@ -9,7 +31,83 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.cli import TodoCLI
+
+def run_batch(args):
+    """Run `--batch <file|-> [--stop-on-error]` and return the exit status"""
+    stop_on_error = '--stop-on-error' in args
+    paths = [a for a in args if a != '--stop-on-error']
+    path = paths[0] if paths else '-'
+    from src.cli import TodoCLI
+    if path == '-':
+        return 1 if TodoCLI().run_batch(sys.stdin, stop_on_error) else 0
+    try:
+        with open(path, 'r') as f:
+            return 1 if TodoCLI().run_batch(f, stop_on_error) else 0
+    except OSError as e:
+        print(f"❌ Cannot read {path}: {e}")
+        return 2
+
+
+def run_serve(args):
+    """Run `serve [--socket PATH]` and return the exit status"""
+    from src.daemon import serve
+    path = args[1] if args[:1] == ['--socket'] and len(args) > 1 else None
+    return serve(path=path)
+
+
+def run_api(args):
+    """Run `api [--host HOST] [--port PORT]` and return the exit status"""
+    from src.api import serve
+    options = dict(zip(args[::2], args[1::2]))
+    try:
+        port = int(options.get('--port', 8765))
+    except ValueError:
+        print("❌ --port must be a number")
+        return 2
+    return serve(host=options.get('--host', '127.0.0.1'), port=port)
+
+
+def run_one(line):
+    """Run a single command, through the daemon if one is listening"""
+    parts = line.split()
+    if not parts:
+        # `todo ""`: nothing to run
+        return 0
+    # The daemon can't read our stdin
+    if not (parts[0] == 'import' and '-' in parts[1:]):
+        from src.client import request
+        try:
+            reply = request(line)
+        except OSError as e:
+            print(f"❌ Lost connection to the todo daemon: {e}")
+            return 1
+        if reply is not None:
+            sys.stdout.write(reply['output'])
+            return 1 if reply['error'] else 0
+    
+    # No banner, no readline setup
+    from src.cli import TodoCLI
+    cli = TodoCLI()
+    cli.onecmd(line)
+    return 1 if cli.last_error else 0
+
 
 if __name__ == '__main__':
-    TodoCLI().cmdloop()
+    from src.config import ConfigError, manager_options
+    try:
+        manager_options()
+    except ConfigError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    if sys.argv[1:2] == ['--batch']:
+        sys.exit(run_batch(sys.argv[2:]))
+    elif sys.argv[1:2] == ['serve']:
+        sys.exit(run_serve(sys.argv[2:]))
+    elif sys.argv[1:2] == ['api']:
+        sys.exit(run_api(sys.argv[2:]))
+    elif len(sys.argv) > 1:
+        sys.exit(run_one(' '.join(sys.argv[1:])))
+    else:
+        from src.cli import TodoCLI
+        # Saves run in the background, at most this many ms after a change
+        TodoCLI(write_behind=200).cmdloop()